@@ -2,13 +2,37 @@
 Chat router
 Handles conversational AI interface for learning assistance with integrated RAG and generation
 """
-from fastapi import APIRouter, status, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, status, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
+from uuid import uuid4
+import asyncio
+import logging
 import random
 import re
 
+from app.chat.connection import ChatContext, FrameOutbox, OutboxClosedError, SlowConsumerError, get_connection_stats
+from app.chat.intents import IntentMatch, IntentMatcher, load_rules
+from app.chat.sessions import SessionHistory, get_session_store
+from app.chat.stages import ChatStages
+from app.config import get_settings
+from app.generation.cache import active_generation_cache, normalize_prompt
+from app.generation.coalesce import get_single_flight
+from app.generation.lab_code_generator import generate_lab_code
+from app.generation.prefetch import active_prefetcher
+from app.generation.provider import LLMProvider, ProviderError, get_provider
+from app.generation.theory_generator import generate_theory
+from app.generation.tool_controller import ToolCall
+from app.rag.records import SearchHit
+from app.sse import sse_event, sse_response
+
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -21,9 +45,10 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     """Request model for chat"""
-    messages: List[ChatMessage]
+    messages: List[ChatMessage] = []  # Not needed with a session_id; the server keeps the history
     message: str
     session_id: Optional[str] = None
+    new_session: bool = False  # Start a server-side session when no session_id is sent
     enable_search: bool = True
     enable_generation: bool = True
 
@@ -35,6 +60,8 @@ class ChatResponse(BaseModel):
     search_results: Optional[List[dict]] = None
     generated_content: Optional[str] = None
     action_taken: Optional[str] = None
+    matched_rule: Optional[str] = None  # Intent rule that classified the message
+    session_id: Optional[str] = None  # Send back with the next message instead of the history
 
 
 # Knowledge base for generating responses
@@ -83,101 +110,139 @@ FALLBACK_RESPONSES = [
     "I'd be happy to help! This topic has several aspects to consider. What would you like to focus on first?"
 ]
 
+# Topic of a generation request: whatever follows "about", "on" or "for"
+GENERATION_TOPIC = re.compile(r"(about|on|for)\s+(.+)")
 
-def find_topic(message: str) -> Optional[str]:
-    """Find relevant topic from the message"""
-    message_lower = message.lower()
-    for topic in TOPIC_RESPONSES.keys():
-        if topic in message_lower:
-            return topic
-    return None
 
+@lru_cache()
+def get_intent_matcher() -> IntentMatcher:
+    """Intent rules from app/chat/intents.json plus the knowledge-base topics, compiled once"""
+    return IntentMatcher(load_rules(), topics=list(TOPIC_RESPONSES))
 
-def detect_intent(message: str) -> tuple[str, Optional[str]]:
-    """
-    Detect user intent from message
-    Returns (intent_type, extracted_query)
-    """
-    message_lower = message.lower()
-    
-    # Search intents
-    search_patterns = [
-        r"search (for|about)?\s*(.+)",
-        r"find (me)?\s*(.+)",
-        r"show me (materials?|content|notes|slides|code)\s*(about|on|for)?\s*(.+)",
-        r"where can i find (.+)",
-        r"do you have (.+)",
-        r"looking for (.+)"
-    ]
-    
-    for pattern in search_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            query = match.groups()[-1] if match.groups() else None
-            return ("search", query)
-    
-    # Generation intents
-    generation_patterns = [
-        r"generate (notes|slides|code|summary|explanation)\s*(about|on|for)?\s*(.+)",
-        r"create (notes|slides|code)\s*(about|on|for)?\s*(.+)",
-        r"make (me)?\s*(notes|slides|code)\s*(about|on|for)?\s*(.+)",
-        r"write (notes|code)\s*(about|on|for)?\s*(.+)",
-        r"can you (generate|create|make|write) (.+)"
-    ]
-    
-    for pattern in generation_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            return ("generation", message)
-    
-    # Explanation intents
-    explanation_patterns = [
-        r"(explain|what is|what are|tell me about|describe) (.+)",
-        r"how (does|do) (.+) work",
-        r"why (.+)"
-    ]
+
+# (index, record count, query) -> (hits, sources); the count changes when materials are uploaded
+SEARCH_CACHE: "OrderedDict[tuple, tuple[List[SearchHit], List[str]]]" = OrderedDict()
+SEARCH_CACHE_SIZE = 256
+
+
+async def perform_search(query: str) -> tuple[List[SearchHit], List[str]]:
+    """Perform search and return hits and sources, reusing recent results for the same query"""
+    # Import here to avoid circular dependency
+    from app.api.search import MATERIAL_INDEX
     
-    for pattern in explanation_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            return ("explanation", message)
+    key = (id(MATERIAL_INDEX), len(MATERIAL_INDEX.records), query.strip().lower())
+    cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        SEARCH_CACHE.move_to_end(key)
+        return cached
     
-    # Summary intents
-    if any(word in message_lower for word in ["summarize", "summary", "recap", "overview"]):
-        return ("summary", message)
+    # Only include relevant results; the index runs off the event loop so stage deadlines and overlap apply
+    hits = await asyncio.to_thread(lambda: MATERIAL_INDEX.search(query, 5, min_score=0.2).top(5))
+    sources = []
+    for hit in hits:
+        if hit.record.source not in sources:
+            sources.append(hit.record.source)
     
-    # Default to conversation
-    return ("conversation", None)
+    SEARCH_CACHE[key] = (hits, sources[:3])
+    if len(SEARCH_CACHE) > SEARCH_CACHE_SIZE:
+        SEARCH_CACHE.popitem(last=False)
+    return hits, sources[:3]
+
+
+# (index, record count, topic) -> (id, score) of the material that best matches it; resolved again after uploads
+TOPIC_ANCHORS: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
 
 
-async def perform_search(query: str) -> tuple[List[dict], List[str]]:
-    """Perform search and return results and sources"""
+async def related_materials(topic: str, limit: int = 3) -> tuple[List[SearchHit], List[str]]:
+    """
+    The material that best matches a topic plus its nearest neighbours
+    After the first call per topic this is a neighbour-list lookup rather than a search
+    """
     # Import here to avoid circular dependency
-    from app.api.search import MOCK_MATERIALS, calculate_relevance
+    from app.api.search import MATERIAL_INDEX
+    
+    key = (id(MATERIAL_INDEX), len(MATERIAL_INDEX.records), topic)
+    anchor_id, score = TOPIC_ANCHORS.get(key, (None, 0.0))
+    anchor = MATERIAL_INDEX.get(anchor_id) if anchor_id else None
+    
+    def lookup() -> List[SearchHit]:
+        # Runs in a worker thread, so the stage deadline can drop a slow lookup
+        if anchor is None:
+            hits = MATERIAL_INDEX.search(topic, 1, min_score=0.2).top(1)
+            if not hits:
+                return []
+        else:
+            hits = [SearchHit(anchor, score)]
+        # similar() treats a limit of 0 as every neighbour
+        if limit <= 1:
+            return hits[:limit]
+        return hits + MATERIAL_INDEX.similar(hits[0].record.id, limit - 1)
+    
+    hits = await asyncio.to_thread(lookup)
+    if not hits:
+        return [], []
+    if anchor is None:
+        TOPIC_ANCHORS[key] = (hits[0].record.id, hits[0].score)
+        if len(TOPIC_ANCHORS) > SEARCH_CACHE_SIZE:
+            TOPIC_ANCHORS.popitem(last=False)
+    else:
+        TOPIC_ANCHORS.move_to_end(key)
     
-    results = []
     sources = []
+    for hit in hits:
+        if hit.record.source not in sources:
+            sources.append(hit.record.source)
+    return hits, sources[:3]
+
+
+async def generate_with_provider(provider: LLMProvider, content_type: str, topic: str) -> str:
+    """Provider content for a chat turn, through the generation cache and request coalescing"""
+    style = "code" if "code" in content_type.lower() else "notes" if "note" in content_type.lower() else "explanation"
+    bucket = ("chat", style)
+    cache = active_generation_cache()
+    cached = cache.get(bucket, topic) if cache is not None else None
+    if cached is not None:
+        return cached
     
-    for material in MOCK_MATERIALS:
-        score, matched_keywords = calculate_relevance(query, material)
-        if score > 0.2:  # Only include relevant results
-            results.append({
-                "id": material["id"],
-                "title": material["title"],
-                "type": material["type"],
-                "excerpt": material["excerpt"],
-                "source": material["source"],
-                "score": round(score, 2)
-            })
-            if material["source"] not in sources:
-                sources.append(material["source"])
+    async def produce() -> str:
+        if style == "code":
+            content = f"# Code Example: {topic}\n\n```python\n{await generate_lab_code(provider, topic)}```\n"
+        else:
+            content = await generate_theory(provider, topic, style)
+        if cache is not None:
+            cache.put(bucket, topic, content)
+        return content
     
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:5], sources[:3]
+    return await get_single_flight().do((bucket, normalize_prompt(topic)), produce)
+
+
+def prefetch_followups(topic: str) -> None:
+    """
+    Warm the caches for the usual next turns after an explanation: a search
+    for the topic and, with a provider, notes and code on it
+    """
+    prefetcher = active_prefetcher()
+    if prefetcher is None:
+        return
+    prefetcher.schedule(("search", topic), lambda: perform_search(topic))
+    if get_provider() is not None:
+        for content_type in ("notes", "code"):
+            prefetcher.schedule((content_type, topic), lambda content_type=content_type: generate_content(content_type, topic))
 
 
 async def generate_content(content_type: str, topic: str) -> str:
-    """Generate content based on type and topic"""
+    """Generate content based on type and topic, with the LLM provider when one is configured"""
+    provider = get_provider()
+    if provider is not None:
+        try:
+            return await generate_with_provider(provider, content_type, topic)
+        except ProviderError as exc:
+            logger.warning(f"Serving {content_type} template, provider failed: {exc}")
+    return template_content(content_type, topic)
+
+
+def template_content(content_type: str, topic: str) -> str:
+    """Template content for a type and topic, served without a provider"""
     if "note" in content_type.lower():
         return f"""# Notes on {topic}
 
@@ -213,30 +278,7 @@ example_{topic.lower().replace(' ', '_')}()
         return f"Generated content about {topic} would appear here with proper formatting and structure."
 
 
-async def generate_response(message: str, history: List[ChatMessage], enable_search: bool = True, enable_generation: bool = True) -> tuple[str, List[str], Optional[List[dict]], Optional[str], str]:
-    """
-    Generate a response based on the message and history with integrated RAG and generation
-    Returns: (response_text, sources, search_results, generated_content, action_taken)
-    """
-    message_lower = message.lower()
-    sources = []
-    search_results = None
-    generated_content = None
-    action_taken = "conversation"
-    
-    # Check for greetings
-    greetings = ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]
-    if any(g in message_lower for g in greetings) and len(message_lower) < 30:
-        response = random.choice(GREETING_RESPONSES)
-        return response, [], None, None, "greeting"
-    
-    # Check for thanks
-    if any(t in message_lower for t in ["thank", "thanks", "appreciate"]):
-        return "You're welcome! Feel free to ask if you have more questions. I'm here to help you learn! 📚", [], None, None, "acknowledgment"
-    
-    # Check for help request
-    if "help" in message_lower and len(message_lower) < 20:
-        help_response = """I can help you with various topics! Here's what I can assist with:
+HELP_RESPONSE = """I can help you with various topics! Here's what I can assist with:
 
 📚 **Search Course Materials**
 - Ask me to "find materials about sorting algorithms"
@@ -259,85 +301,202 @@ async def generate_response(message: str, history: List[ChatMessage], enable_sea
 - "Why use Big O notation?"
 
 What would you like to explore?"""
-        return help_response, ["Course Syllabus", "Topic Index", "Help Documentation"], None, None, "help"
+
+
+def open_session(request: ChatRequest) -> Tuple[Optional[str], Sequence]:
+    """
+    Session id and history for a turn; with the session store running, a
+    session is kept only for clients that send a session_id or new_session,
+    and its history is read only if used. Other requests stay stateless
+    """
+    store = get_session_store()
+    if store is None or (request.session_id is None and not request.new_session):
+        return request.session_id, request.messages
+    session_id = request.session_id or uuid4().hex
+    # Clients that still send their history seed a session the store does not know yet
+    if request.messages and not store.history(session_id):
+        for item in request.messages:
+            store.append(session_id, item.role, item.content)
+    return session_id, SessionHistory(store, session_id)
+
+
+def record_turn(session_id: Optional[str], message: str, response: str) -> None:
+    """Add a finished turn to its session"""
+    store = get_session_store()
+    if store is not None and session_id is not None:
+        store.append(session_id, "user", message)
+        store.append(session_id, "assistant", response)
+
+
+async def response_stages(
+    message: str,
+    history: Sequence,
+    enable_search: bool = True,
+    enable_generation: bool = True,
+    match: Optional[IntentMatch] = None,
+    context: Optional[ChatContext] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    The chat pipeline as (stage, value) pairs in the order they finish:
+    "search" (hits, sources) as soon as a search returns, "text" pieces of
+    the response, "generated" content, then "done" (sources, action_taken)
+    A connection's context reuses its recent retrieval results
+    """
+    message_lower = message.lower()
+    if match is None:
+        match = get_intent_matcher().classify(message)
+    intent = match.intent
+    
+    # Check for greetings
+    if intent == "greeting":
+        yield "text", random.choice(GREETING_RESPONSES)
+        yield "done", ([], "greeting")
+        return
+    
+    # Check for thanks
+    if intent == "acknowledgment":
+        yield "text", "You're welcome! Feel free to ask if you have more questions. I'm here to help you learn! 📚"
+        yield "done", ([], "acknowledgment")
+        return
+    
+    # Check for help request
+    if intent == "help":
+        yield "text", HELP_RESPONSE
+        yield "done", (["Course Syllabus", "Topic Index", "Help Documentation"], "help")
+        return
+    
+    # Independent work for the turn starts now; each stage is read with a deadline
+    settings = get_settings()
+    search = context.cached("search", perform_search) if context is not None else perform_search
+    related = context.cached("related", related_materials) if context is not None else related_materials
+    calls: List[ToolCall] = []
+    content_type = topic = None
+    if intent == "search" and enable_search:
+        calls.append(ToolCall("search", search, {"query": match.query or message}))
+    elif intent == "generation" and enable_generation:
+        # Extract what to generate
+        content_type = "notes"  # default
+        if "code" in message_lower:
+            content_type = "code"
+        elif "slide" in message_lower:
+            content_type = "slides"
+        
+        # Extract topic
+        topic_match = GENERATION_TOPIC.search(message_lower)
+        topic = topic_match.group(2) if topic_match else "the requested topic"
+        calls.append(ToolCall(
+            "generate", generate_content, {"content_type": content_type, "topic": topic},
+            timeout=settings.chat_generation_timeout,
+        ))
+        if topic_match and enable_search:
+            calls.append(ToolCall("related", related, {"topic": topic}))
+    elif intent == "explanation":
+        if match.topic:
+            calls.append(ToolCall("related", related, {"topic": match.topic}))
+    elif intent == "summary":
+        query = message.replace("summarize", "").replace("summary", "").strip()
+        calls.append(ToolCall("search", search, {"query": query}))
+    elif intent == "question" or "question" in match.fired:
+        calls.append(ToolCall("search", search, {"query": message}))
     
-    # Detect intent
-    intent, extracted_query = detect_intent(message)
-    action_taken = intent
+    async with ChatStages(calls, settings.chat_stage_timeout) as stages:
+        async for item in _compose_response(message, match, stages, enable_search, enable_generation, content_type, topic):
+            yield item
+
+
+async def _compose_response(
+    message: str,
+    match: IntentMatch,
+    stages: ChatStages,
+    enable_search: bool,
+    enable_generation: bool,
+    content_type: Optional[str],
+    topic: Optional[str],
+) -> AsyncIterator[Tuple[str, Any]]:
+    """The reply for an intent, reading stage results only where it needs them"""
+    intent = match.intent
     
     # Handle search intent
     if intent == "search" and enable_search:
-        query = extracted_query or message
-        search_results, sources = await perform_search(query)
+        query = match.query or message
+        search_results, sources = await stages.result("search", ([], []))
+        yield "search", (search_results, sources)
         
         if search_results:
-            response = f"📚 **Search Results for '{query}'**\n\n"
-            response += f"I found {len(search_results)} relevant materials:\n\n"
+            yield "text", f"📚 **Search Results for '{query}'**\n\n"
+            yield "text", f"I found {len(search_results)} relevant materials:\n\n"
             
             for i, result in enumerate(search_results[:3], 1):
-                response += f"**{i}. {result['title']}** ({result['type'].title()})\n"
-                response += f"   {result['excerpt'][:150]}...\n"
-                response += f"   📍 Source: {result['source']} | Relevance: {int(result['score']*100)}%\n\n"
+                text = f"**{i}. {result.record.title}** ({result.record.type.title()})\n"
+                text += f"   {result.record.excerpt[:150]}...\n"
+                text += f"   📍 Source: {result.record.source} | Relevance: {int(result.score*100)}%\n\n"
+                yield "text", text
             
             if len(search_results) > 3:
-                response += f"_...and {len(search_results) - 3} more results available_\n\n"
+                yield "text", f"_...and {len(search_results) - 3} more results available_\n\n"
             
-            response += "Would you like me to explain any of these topics in more detail?"
+            yield "text", "Would you like me to explain any of these topics in more detail?"
         else:
-            response = f"I searched for '{query}' but couldn't find specific materials. However, I can help explain this topic if you'd like!"
+            yield "text", f"I searched for '{query}' but couldn't find specific materials. However, I can help explain this topic if you'd like!"
             sources = ["Course Materials"]
         
-        return response, sources, search_results, None, "search"
+        yield "done", (sources, "search")
+        return
     
     # Handle generation intent
     if intent == "generation" and enable_generation:
-        # Extract what to generate
-        content_type = "notes"  # default
-        if "code" in message_lower:
-            content_type = "code"
-        elif "slide" in message_lower:
-            content_type = "slides"
-        
-        # Extract topic
-        topic_match = re.search(r"(about|on|for)\s+(.+)", message_lower)
-        topic = topic_match.group(2) if topic_match else "the requested topic"
-        
-        generated_content = await generate_content(content_type, topic)
-        
-        response = f"✨ **Generated {content_type.title()} on '{topic}'**\n\n"
-        response += f"I've created {content_type} content for you. Here's a preview:\n\n"
-        response += generated_content[:300] + "...\n\n"
-        response += f"💡 _This content is AI-generated and should be reviewed with course materials._\n\n"
-        response += "Would you like me to expand on any particular section?"
-        
+        yield "text", f"✨ **Generated {content_type.title()} on '{topic}'**\n\n"
+        # A generation past its deadline is replaced by the template rather than holding the reply
+        generated_content = await stages.result("generate")
+        if generated_content is None:
+            generated_content = template_content(content_type, topic)
         sources = ["AI-Generated Content", "Course Context"]
-        return response, sources, None, generated_content, "generation"
+        
+        text = f"I've created {content_type} content for you. Here's a preview:\n\n"
+        text += generated_content[:300] + "...\n\n"
+        text += f"💡 _This content is AI-generated and should be reviewed with course materials._\n\n"
+        related, related_sources = await stages.result("related", ([], []))
+        if related:
+            yield "search", (related, related_sources)
+            text += "📚 **Related Materials:**\n"
+            for result in related[:2]:
+                text += f"- {result.record.title} ({result.record.source})\n"
+            text += "\n"
+            sources += [source for source in related_sources if source not in sources]
+        text += "Would you like me to expand on any particular section?"
+        yield "text", text
+        yield "generated", generated_content
+        yield "done", (sources, "generation")
+        return
     
     # Handle explanation intent
     if intent == "explanation":
-        topic = find_topic(message)
+        topic = match.topic
         
         if topic:
             topic_info = TOPIC_RESPONSES[topic]
             
             # Build comprehensive explanation
-            response = f"**{topic.title()}**\n\n"
-            response += f"📖 **Overview**\n{topic_info['intro']}\n\n"
-            response += f"📋 **Details**\n{topic_info['details']}\n\n"
-            response += f"💡 **Tips**\n{topic_info['tips']}\n\n"
+            yield "text", f"**{topic.title()}**\n\n"
+            yield "text", f"📖 **Overview**\n{topic_info['intro']}\n\n"
+            yield "text", f"📋 **Details**\n{topic_info['details']}\n\n"
+            yield "text", f"💡 **Tips**\n{topic_info['tips']}\n\n"
             
-            # Try to find related materials
-            search_results, search_sources = await perform_search(topic)
+            # Related materials were looked up while the text above was written
+            search_results, search_sources = await stages.result("related", ([], []))
+            yield "search", (search_results, search_sources)
             if search_results:
-                response += f"\n📚 **Related Materials:**\n"
+                text = f"\n📚 **Related Materials:**\n"
                 for result in search_results[:2]:
-                    response += f"- {result['title']} ({result['source']})\n"
+                    text += f"- {result.record.title} ({result.record.source})\n"
+                yield "text", text
                 sources = search_sources
             else:
                 sources = [f"Course Materials - {topic.title()}"]
             
-            response += "\n\nWould you like me to dive deeper into any specific aspect?"
-            return response, sources, search_results, None, "explanation"
+            yield "text", "\n\nWould you like me to dive deeper into any specific aspect?"
+            prefetch_followups(topic)
+            yield "done", (sources, "explanation")
         else:
             # Generic explanation without specific topic
             response = "I'd be happy to explain that concept! "
@@ -346,43 +505,78 @@ What would you like to explore?"""
             response += "- Specific algorithms or data structures\n"
             response += "- Programming concepts\n"
             response += "- Problem-solving techniques"
-            return response, ["General Help"], None, None, "explanation"
+            yield "text", response
+            yield "done", (["General Help"], "explanation")
+        return
     
     # Handle summary intent  
     if intent == "summary":
         # Try to search for relevant content to summarize
-        search_results, sources = await perform_search(message.replace("summarize", "").replace("summary", "").strip())
+        search_results, sources = await stages.result("search", ([], []))
+        yield "search", (search_results, sources)
         
         if search_results:
-            response = "📝 **Summary**\n\n"
-            response += "Based on available course materials:\n\n"
+            yield "text", "📝 **Summary**\n\n"
+            yield "text", "Based on available course materials:\n\n"
             for result in search_results[:3]:
-                response += f"**{result['title']}**\n{result['excerpt']}\n\n"
-            response += "\nThis summary is based on course content. Would you like more details on any topic?"
+                yield "text", f"**{result.record.title}**\n{result.record.excerpt}\n\n"
+            yield "text", "\nThis summary is based on course content. Would you like more details on any topic?"
         else:
-            response = "I'd be happy to provide a summary! What topic would you like me to summarize?"
+            yield "text", "I'd be happy to provide a summary! What topic would you like me to summarize?"
         
-        return response, sources, search_results, None, "summary"
+        yield "done", (sources, "summary")
+        return
     
     # Default conversation - try to be helpful
     # Check if question is about coursework
-    if any(word in message_lower for word in ["how", "what", "why", "when", "where", "explain"]):
+    if intent == "question" or "question" in match.fired:
         # Search for relevant materials
-        search_results, sources = await perform_search(message)
+        search_results, sources = await stages.result("search", ([], []))
+        yield "search", (search_results, sources)
         
         if search_results:
-            response = "Let me help you with that! Based on course materials:\n\n"
-            response += f"{search_results[0]['excerpt']}\n\n"
-            response += f"📚 You can find more information in: {search_results[0]['source']}\n\n"
-            response += "Would you like me to explain this in more detail or search for related topics?"
+            yield "text", "Let me help you with that! Based on course materials:\n\n"
+            yield "text", f"{search_results[0].record.excerpt}\n\n"
+            yield "text", f"📚 You can find more information in: {search_results[0].record.source}\n\n"
+            yield "text", "Would you like me to explain this in more detail or search for related topics?"
         else:
-            response = random.choice(FALLBACK_RESPONSES)
+            yield "text", random.choice(FALLBACK_RESPONSES)
             sources = ["Course Materials"]
         
-        return response, sources, search_results, None, "conversation"
+        yield "done", (sources, "conversation")
+        return
     
     # Final fallback
-    return random.choice(FALLBACK_RESPONSES), ["Course Materials"], None, None, "conversation"
+    yield "text", random.choice(FALLBACK_RESPONSES)
+    yield "done", (["Course Materials"], "conversation")
+
+
+async def generate_response(
+    message: str,
+    history: Sequence,
+    enable_search: bool = True,
+    enable_generation: bool = True,
+    match: Optional[IntentMatch] = None,
+) -> tuple[str, List[str], Optional[List[SearchHit]], Optional[str], str]:
+    """
+    Generate a response based on the message and history with integrated RAG and generation
+    Returns: (response_text, sources, search_results, generated_content, action_taken)
+    """
+    parts: List[str] = []
+    search_results = None
+    generated_content = None
+    sources: List[str] = []
+    action_taken = "conversation"
+    async for stage, value in response_stages(message, history, enable_search, enable_generation, match):
+        if stage == "text":
+            parts.append(value)
+        elif stage == "search":
+            search_results = value[0]
+        elif stage == "generated":
+            generated_content = value
+        elif stage == "done":
+            sources, action_taken = value
+    return "".join(parts), sources, search_results, generated_content, action_taken
 
 
 @router.post(
@@ -398,22 +592,154 @@ async def chat(request: ChatRequest) -> ChatResponse:
     Uses conversation history for context
     Integrates search and generation capabilities
     """
-    response, sources, search_results, generated_content, action_taken = await generate_response(
-        request.message, 
-        request.messages,
-        request.enable_search,
-        request.enable_generation
-    )
+    prefetcher = active_prefetcher()
+    match = get_intent_matcher().classify(request.message)
+    session_id, history = open_session(request)
+    with prefetcher.foreground_request() if prefetcher is not None else nullcontext():
+        response, sources, search_results, generated_content, action_taken = await generate_response(
+            request.message, 
+            history,
+            request.enable_search,
+            request.enable_generation,
+            match
+        )
+    record_turn(session_id, request.message, response)
     
     return ChatResponse(
         response=response,
         sources=sources if sources else None,
-        search_results=search_results,
+        search_results=[hit.to_dict() for hit in search_results] if search_results is not None else None,
         generated_content=generated_content,
-        action_taken=action_taken
+        action_taken=action_taken,
+        matched_rule=match.rule,
+        session_id=session_id
     )
 
 
+async def chat_events(request: ChatRequest, context: Optional[ChatContext] = None) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    (event, data) for one chat turn: intent first, then search_results, text,
+    generated_content as their stages finish, and done with sources and the action taken
+    With a connection context, an explanation that names no topic continues the last one
+    """
+    match = get_intent_matcher().classify(request.message)
+    if context is not None:
+        if match.intent == "explanation" and match.topic is None and context.topic:
+            match = IntentMatch(match.intent, match.rule, match.query, match.keyword, context.topic, match.fired)
+        context.topic = match.topic or context.topic
+    yield "intent", {"intent": match.intent, "rule": match.rule, "topic": match.topic}
+    session_id, history = open_session(request)
+    if context is not None and get_session_store() is None:
+        history = context.history
+    parts: List[str] = []
+    prefetcher = active_prefetcher()
+    with prefetcher.foreground_request() if prefetcher is not None else nullcontext():
+        stages = response_stages(request.message, history, request.enable_search, request.enable_generation, match, context)
+        async for stage, value in stages:
+            if stage == "search":
+                hits, sources = value
+                yield "search_results", {"results": [hit.to_dict() for hit in hits], "sources": sources}
+            elif stage == "text":
+                parts.append(value)
+                yield "text", {"text": value}
+            elif stage == "generated":
+                yield "generated_content", {"content": value}
+            elif stage == "done":
+                sources, action_taken = value
+                record_turn(session_id, request.message, "".join(parts))
+                if context is not None:
+                    context.record(request.message, "".join(parts))
+                yield "done", {
+                    "sources": sources or None,
+                    "action_taken": action_taken,
+                    "matched_rule": match.rule,
+                    "session_id": session_id,
+                }
+
+
+async def stream_chat(request: ChatRequest) -> AsyncIterator[str]:
+    """SSE frames for one chat turn"""
+    async for event, data in chat_events(request):
+        yield sse_event(event, data)
+
+
+@router.post(
+    "/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Stream Chat Response",
+    description="Chat over server-sent events: intent, search_results, text, generated_content and done as each stage finishes"
+)
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Stream a chat turn over SSE
+    The intent event is sent before any work starts, search results as soon
+    as the search returns, and response text a piece at a time
+    """
+    return sse_response(stream_chat(request))
+
+
+@router.websocket("/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None) -> None:
+    """
+    Chat over one WebSocket
+    The client sends {"message": ...} per turn and receives the same events
+    as /chat/stream as {"type": event, ...} frames. The connection keeps its
+    session, topic and recent retrieval results between turns; a client
+    that reads too slowly pauses its turn, then is disconnected
+    """
+    settings = get_settings()
+    stats = get_connection_stats()
+    await websocket.accept()
+    stats.opened()
+    store = get_session_store()
+    if store is not None:
+        session_id = session_id or uuid4().hex
+    context = ChatContext(
+        settings.chat_ws_context_size, settings.chat_ws_context_ttl, settings.chat_session_max_messages
+    )
+    outbox = FrameOutbox(websocket.send_json, settings.chat_ws_send_queue, settings.chat_ws_send_timeout, stats).start()
+    try:
+        await outbox.put({"type": "session", "session_id": session_id})
+        while True:
+            try:
+                payload = await websocket.receive_json()
+            except ValueError as exc:
+                stats.message()
+                await outbox.put({"type": "error", "detail": f"Message is not valid JSON: {exc}"})
+                continue
+            stats.message()
+            try:
+                request = ChatRequest(**{**payload, "session_id": session_id, "messages": []})
+            except (TypeError, ValidationError) as exc:
+                await outbox.put({"type": "error", "detail": str(exc)})
+                continue
+            async for event, data in chat_events(request, context):
+                await outbox.put({"type": event, **data})
+    except (WebSocketDisconnect, OutboxClosedError):
+        pass
+    except SlowConsumerError as exc:
+        logger.info(f"Closing chat connection: {exc}")
+        try:
+            await websocket.close(code=1008, reason="Client too slow")
+        except Exception as close_exc:
+            # The writer may already have failed on a socket the client dropped
+            logger.debug(f"Chat connection already closed: {close_exc}")
+    finally:
+        await outbox.close()
+        stats.closed()
+
+
+CHAT_SUGGESTIONS = [
+    "What is a binary search tree?",
+    "Explain recursion with an example",
+    "How do I choose the right data structure?",
+    "What's the difference between BFS and DFS?",
+    "Help me understand Big O notation",
+    "Give me tips for solving algorithm problems"
+]
+
+
 @router.get(
     "/suggestions",
     status_code=status.HTTP_200_OK,
@@ -424,13 +750,4 @@ async def get_chat_suggestions() -> dict:
     """
     Get suggested questions for the chat
     """
-    return {
-        "suggestions": [
-            "What is a binary search tree?",
-            "Explain recursion with an example",
-            "How do I choose the right data structure?",
-            "What's the difference between BFS and DFS?",
-            "Help me understand Big O notation",
-            "Give me tips for solving algorithm problems"
-        ]
-    }
+    return {"suggestions": CHAT_SUGGESTIONS}
@@ -2,10 +2,31 @@
 Generate router
 Handles AI content generation for notes, slides, code, summaries, and explanations
 """
-from fastapi import APIRouter, status
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Path, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Optional, List, Union
+from contextlib import nullcontext
 from enum import Enum
+import asyncio
+import logging
+import re
+
+from app.api.validate import validate_grounding, validate_rubric, validate_syntax
+from app.config import get_settings
+from app.generation.artifacts import active_artifact_store, request_key
+from app.generation.cache import active_generation_cache, normalize_prompt
+from app.generation.coalesce import get_single_flight
+from app.generation.lab_code_generator import generate_lab_code, stream_lab_code
+from app.generation.outline import OutlineDocument, get_outline_store, parse_outline, split_sections
+from app.generation.prefetch import active_prefetcher
+from app.generation.provider import LLMProvider, ProviderError, get_provider
+from app.generation.templates import get_prompt_registry
+from app.generation.theory_generator import generate_outline, generate_section, generate_theory, stream_theory
+from app.sse import sse_event, sse_response
+
+
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/generate", tags=["Generate"])
@@ -20,6 +41,16 @@ class GenerateType(str, Enum):
     EXPLANATION = "explanation"
 
 
+# Reference material cited for each type of content
+SOURCES = {
+    GenerateType.NOTES: ["Course Materials - Week 1", "Reference Textbook Ch. 3", "Online Documentation"],
+    GenerateType.SLIDES: ["Lecture Notes - Module 2", "Presentation Templates"],
+    GenerateType.CODE: ["Code Examples - Lab 3", "Reference Implementation"],
+    GenerateType.SUMMARY: ["Course Summary - Module 1", "Study Guide"],
+    GenerateType.EXPLANATION: ["Explanation Guide", "Concept Tutorials - Week 1"],
+}
+
+
 class GenerateRequest(BaseModel):
     """Request model for generation"""
     type: GenerateType
@@ -35,6 +66,111 @@ class GenerateResponse(BaseModel):
     sources: Optional[List[str]] = None
 
 
+class OutlineSection(BaseModel):
+    """A section title in an outline; ready once its content exists"""
+    number: int
+    title: str
+    ready: bool
+
+
+class OutlineResponse(BaseModel):
+    """Response model for an outline; sections are fetched one at a time by number"""
+    doc_id: str
+    type: str
+    topic: str
+    source: str  # provider or template
+    sections: List[OutlineSection]
+    sources: Optional[List[str]] = None
+
+
+class SectionResponse(BaseModel):
+    """Response model for one section of an outlined document"""
+    doc_id: str
+    number: int
+    total: int
+    title: str
+    content: str
+
+
+class BatchGenerateRequest(BaseModel):
+    """Request model for batch generation"""
+    items: List[GenerateRequest] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1)
+    stream: bool = False
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item; content is set when status is ok, error otherwise"""
+    index: int
+    status: str  # ok or error
+    type: str
+    content: Optional[str] = None
+    sources: Optional[List[str]] = None
+    error: Optional[str] = None
+
+
+class BatchGenerateResponse(BaseModel):
+    """Response model for batch generation, results in request order"""
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
+def request_subject(request: GenerateRequest) -> str:
+    """What the content is about: the prompt, plus the topic when given"""
+    return f"{request.prompt} ({request.topic})" if request.topic else request.prompt
+
+
+def cache_bucket(request: GenerateRequest) -> tuple:
+    """Everything besides the subject that shapes the generated content"""
+    language = (request.language or "python").lower() if request.type == GenerateType.CODE else None
+    return ("generate", request.type.value, language)
+
+
+async def generate_with_provider(provider: LLMProvider, request: GenerateRequest) -> str:
+    """
+    Generate content for a request with the LLM provider
+    Served from the cache when possible; identical concurrent requests share one provider call
+    """
+    subject = request_subject(request)
+    bucket = cache_bucket(request)
+    cache = active_generation_cache()
+    if cache is not None:
+        cached = cache.get(bucket, subject)
+        if cached is not None:
+            return cached
+
+    async def produce() -> str:
+        if request.type == GenerateType.CODE:
+            content = await generate_lab_code(provider, subject, request.language or "python")
+        else:
+            content = await generate_theory(provider, subject, request.type.value)
+        if cache is not None:
+            cache.put(bucket, subject, content)
+        return content
+
+    return await get_single_flight().do((bucket, normalize_prompt(subject)), produce)
+
+
+async def stored_or_generated(request: GenerateRequest) -> Optional[str]:
+    """
+    Content for a request from the materialized artifacts, else from the provider
+    Provider work counts as a foreground request, so chat prefetches yield to
+    it. None when no provider is configured; provider failures raise ProviderError
+    """
+    store = active_artifact_store()
+    if store is not None:
+        content = store.get(cache_bucket(request), request_subject(request))
+        if content is not None:
+            return content
+    provider = get_provider()
+    if provider is None:
+        return None
+    prefetcher = active_prefetcher()
+    with prefetcher.foreground_request() if prefetcher is not None else nullcontext():
+        return await generate_with_provider(provider, request)
+
+
 @router.post(
     "",
     response_model=GenerateResponse,
@@ -45,261 +181,311 @@ class GenerateResponse(BaseModel):
 async def generate_content(request: GenerateRequest) -> GenerateResponse:
     """
     Generate content based on type and prompt
-    Returns AI-generated content with optional sources
+    Returns AI-generated content with optional sources. Materialized
+    artifacts are served first; templates are used when no LLM provider is
+    configured or the provider fails
     """
-    content = ""
-    sources = []
+    try:
+        content = await stored_or_generated(request)
+    except ProviderError as exc:
+        logger.warning(f"Serving {request.type.value} template, provider failed: {exc}")
+        content = None
     
-    if request.type == GenerateType.NOTES:
-        content = f"""# {request.prompt}
-
-## Overview
-{request.prompt} is a fundamental concept in computer science that forms the basis for many algorithms and applications.
+    return GenerateResponse(
+        content=content if content is not None else template_content(request),
+        type=request.type.value,
+        sources=SOURCES[request.type]
+    )
 
-## Key Concepts
 
-### 1. Definition
-- {request.prompt} refers to the systematic organization of data elements
-- It enables efficient access, modification, and storage of information
+def sections(content: str) -> List[str]:
+    """Split content after each blank line, so streamed sections join back to the original"""
+    return [part for part in re.split(r"(?<=\n\n)", content) if part]
 
-### 2. Properties
-- **Time Complexity**: Varies based on operations (O(1) to O(n))
-- **Space Complexity**: Depends on implementation
-- **Applications**: Used extensively in software development
 
-### 3. Common Operations
-1. **Insertion**: Adding new elements
-2. **Deletion**: Removing existing elements
-3. **Search**: Finding specific elements
-4. **Traversal**: Visiting all elements
+def validation_status(request: GenerateRequest, content: str) -> dict:
+    """Validation checks run on finished content: syntax for code, grounding and rubric for text"""
+    if request.type == GenerateType.CODE:
+        results = [validate_syntax(content, "code", request.language or "python")]
+    else:
+        results = [validate_grounding(content, "text"), validate_rubric(content, "text")]
+    statuses = {result.status for result in results}
+    overall = "fail" if "fail" in statuses else "warning" if "warning" in statuses else "pass"
+    return {
+        "status": overall,
+        "score": round(sum(result.score or 0 for result in results) / len(results), 2),
+        "checks": [result.model_dump(exclude_none=True) for result in results],
+    }
 
-## Best Practices
-- Choose the right data structure for your use case
-- Consider time-space trade-offs
-- Implement error handling for edge cases
 
-## Summary
-Understanding {request.prompt} is crucial for writing efficient code and solving complex problems effectively.
-"""
-        sources = ["Course Materials - Week 1", "Reference Textbook Ch. 3", "Online Documentation"]
-    
-    elif request.type == GenerateType.SLIDES:
-        content = f"""# Slide Deck: {request.prompt}
-
----
-
-## Slide 1: Title
-# {request.prompt}
-### An Introduction to Key Concepts
+async def stream_events(request: GenerateRequest) -> AsyncIterator[str]:
+    """
+    SSE events for one generation: start, a delta per token or section, then done
+    Provider output is streamed token by token; cached and template content is
+    sent a section at a time. Streams are not coalesced, every client gets its own tokens
+    """
+    yield sse_event("start", {"type": request.type.value})
+    provider = get_provider()
+    subject = request_subject(request)
+    bucket = cache_bucket(request)
+    cache = active_generation_cache() if provider is not None else None
+    parts: List[str] = []
+    source = "template"
+    complete = True
+
+    cached = cache.get(bucket, subject) if cache is not None else None
+    if cached is not None:
+        source = "cache"
+        parts = sections(cached)
+        for part in parts:
+            yield sse_event("delta", {"text": part})
+    elif provider is not None:
+        if request.type == GenerateType.CODE:
+            deltas = stream_lab_code(provider, subject, request.language or "python")
+        else:
+            deltas = stream_theory(provider, subject, request.type.value)
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield sse_event("delta", {"text": delta})
+            source = "provider"
+        except ProviderError as exc:
+            logger.warning(f"Streaming {request.type.value} failed after {len(parts)} deltas: {exc}")
+            if parts:
+                complete = False
+                yield sse_event("error", {"message": "Generation was interrupted"})
+
+    if not parts:
+        parts = sections(template_content(request))
+        for part in parts:
+            yield sse_event("delta", {"text": part})
+
+    content = "".join(parts)
+    if source == "provider" and cache is not None:
+        # Code deltas are already extracted from their fences, as cached and template code is
+        cache.put(bucket, subject, content if request.type == GenerateType.CODE else content.strip())
+    yield sse_event("done", {
+        "type": request.type.value,
+        "sources": SOURCES[request.type],
+        "source": source,
+        "format": "code" if request.type == GenerateType.CODE else "markdown",
+        "complete": complete,
+        "validation": validation_status(request, content) if complete else None,
+    })
 
----
 
-## Slide 2: Learning Objectives
-By the end of this session, you will:
-- Understand the fundamentals of {request.prompt}
-- Learn implementation strategies
-- Apply concepts to real-world problems
+@router.post(
+    "/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Stream Generated Content",
+    description="Generate content as server-sent events; the final done event carries sources and validation status"
+)
+async def stream_content(request: GenerateRequest) -> StreamingResponse:
+    """
+    Stream generated content over SSE
+    Events: start, delta ({"text"}) as content is produced, an error if the
+    provider fails mid-stream, and done with sources, validation status and
+    format: "code" for bare source without Markdown fences, else "markdown"
+    """
+    return sse_response(stream_events(request))
 
----
 
-## Slide 3: What is {request.prompt}?
-**Definition**: A systematic approach to organizing and managing data
+async def generate_item(index: int, request: GenerateRequest) -> BatchItemResult:
+    """Generate one batch item; provider failures are reported instead of replaced with a template"""
+    result = BatchItemResult(index=index, status="ok", type=request.type.value)
+    try:
+        content = await stored_or_generated(request)
+        result.content = content if content is not None else template_content(request)
+        result.sources = SOURCES[request.type]
+    except ProviderError as exc:
+        result.status, result.error = "error", str(exc)
+    except Exception as exc:
+        logger.exception(f"Batch item {index} failed")
+        result.status, result.error = "error", f"Generation failed: {exc}"
+    return result
 
-**Key Points**:
-• Foundation of computer science
-• Essential for efficient algorithms
-• Used in every software application
 
----
+async def run_batch(items: List[GenerateRequest], concurrency: int) -> AsyncIterator[BatchItemResult]:
+    """
+    Generate every item with at most concurrency in flight, yielding results as they complete
+    Closing the iterator early cancels the items still waiting or running
+    """
+    semaphore = asyncio.Semaphore(concurrency)
 
-## Slide 4: Core Components
-```
-┌─────────────────┐
-│    Element      │
-├─────────────────┤
-│  Operations     │
-├─────────────────┤
-│  Properties     │
-└─────────────────┘
-```
+    async def bounded(index: int, request: GenerateRequest) -> BatchItemResult:
+        async with semaphore:
+            return await generate_item(index, request)
 
----
+    tasks = [asyncio.ensure_future(bounded(index, request)) for index, request in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
 
-## Slide 5: Examples & Applications
-1. **Web Development**: Managing user data
-2. **Database Systems**: Query optimization
-3. **AI/ML**: Data preprocessing
 
----
+async def stream_batch(items: List[GenerateRequest], concurrency: int) -> AsyncIterator[str]:
+    """SSE events: an item event per result in completion order, then done with the totals"""
+    failed = 0
+    async for result in run_batch(items, concurrency):
+        failed += result.status != "ok"
+        yield sse_event("item", result.model_dump())
+    yield sse_event("done", {"succeeded": len(items) - failed, "failed": failed})
 
-## Slide 6: Summary & Next Steps
-✅ Key takeaways from today's session
-📚 Recommended readings
-💻 Practice exercises
-"""
-        sources = ["Lecture Notes - Module 2", "Presentation Templates"]
-    
-    elif request.type == GenerateType.CODE:
-        lang = request.language or "python"
-        if lang.lower() == "python":
-            content = f'''"""
-{request.prompt}
-Implementation in Python
-"""
 
-class Solution:
+@router.post(
+    "/batch",
+    response_model=BatchGenerateResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Batch Generate Content",
+    description="Generate many items with bounded concurrency; results in order, or streamed as SSE with stream=true"
+)
+async def batch_generate(request: BatchGenerateRequest) -> Union[BatchGenerateResponse, StreamingResponse]:
     """
-    Solution class for {request.prompt}
+    Generate a batch of requests against the LLM provider
+    At most GENERATION_BATCH_CONCURRENCY items (or the lower requested
+    concurrency) are generated at once; failures are reported per item
     """
-    
-    def __init__(self):
-        """Initialize the solution"""
-        self.data = []
-    
-    def process(self, input_data):
-        """
-        Process the input data
-        
-        Args:
-            input_data: The data to process
-            
-        Returns:
-            Processed result
-        """
-        result = []
-        
-        for item in input_data:
-            # Process each item
-            processed = self._helper(item)
-            result.append(processed)
-        
-        return result
-    
-    def _helper(self, item):
-        """Helper method for processing"""
-        # Implement processing logic
-        return item * 2
+    settings = get_settings()
+    if len(request.items) > settings.generation_batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch has {len(request.items)} items; the limit is {settings.generation_batch_max_items}"
+        )
+    concurrency = min(request.concurrency or settings.generation_batch_concurrency, settings.generation_batch_concurrency)
+    if request.stream:
+        return sse_response(stream_batch(request.items, concurrency))
 
+    results = [result async for result in run_batch(request.items, concurrency)]
+    results.sort(key=lambda result: result.index)
+    failed = sum(1 for result in results if result.status != "ok")
+    return BatchGenerateResponse(results=results, succeeded=len(results) - failed, failed=failed)
 
-def main():
-    """Main function to demonstrate usage"""
-    solution = Solution()
-    
-    # Example usage
-    test_data = [1, 2, 3, 4, 5]
-    result = solution.process(test_data)
-    
-    print(f"Input: {{test_data}}")
-    print(f"Output: {{result}}")
 
+# Types that can be requested outline-first
+OUTLINE_TYPES = (GenerateType.NOTES, GenerateType.SLIDES)
 
-if __name__ == "__main__":
-    main()
-'''
-        else:
-            content = f'''// {request.prompt}
-// Implementation in {lang}
 
-public class Solution {{
-    
-    private int[] data;
-    
-    public Solution() {{
-        this.data = new int[0];
-    }}
-    
-    public int[] process(int[] inputData) {{
-        int[] result = new int[inputData.length];
-        
-        for (int i = 0; i < inputData.length; i++) {{
-            result[i] = helper(inputData[i]);
-        }}
-        
-        return result;
-    }}
-    
-    private int helper(int item) {{
-        return item * 2;
-    }}
-    
-    public static void main(String[] args) {{
-        Solution solution = new Solution();
-        int[] testData = {{1, 2, 3, 4, 5}};
-        int[] result = solution.process(testData);
-        
-        System.out.println("Result: " + java.util.Arrays.toString(result));
-    }}
-}}
-'''
-        sources = ["Code Examples - Lab 3", "Reference Implementation"]
-    
-    elif request.type == GenerateType.SUMMARY:
-        content = f"""## Summary: {request.prompt}
-
-### Quick Overview
-{request.prompt} is a core concept that every developer should understand. Here's what you need to know:
-
-### Key Points
-1. **Foundation**: Forms the basis for complex algorithms
-2. **Efficiency**: Crucial for optimizing performance  
-3. **Applications**: Used in databases, web apps, AI systems
-
-### Main Takeaways
-- Start with understanding the basic operations
-- Practice implementing from scratch
-- Analyze time and space complexity
-- Apply to real-world problems
-
-### Related Topics
-- Algorithm Analysis
-- System Design
-- Performance Optimization
-
-### Resources
-📖 Chapter 3-5 in course textbook
-🎥 Video lecture series (Week 2)
-💻 Practice problems set A
-"""
-        sources = ["Course Summary - Module 1", "Study Guide"]
-    
-    elif request.type == GenerateType.EXPLANATION:
-        content = f"""## Explanation: {request.prompt}
-
-### What is it?
-{request.prompt} is a concept that addresses how we organize and manipulate data efficiently. Think of it like organizing books in a library - the way you arrange them determines how quickly you can find what you need.
-
-### Why does it matter?
-Understanding {request.prompt} is essential because:
-- It affects how fast your programs run
-- It determines memory usage
-- It's asked in nearly every technical interview
-
-### How does it work?
-Imagine you have a collection of items. {request.prompt} provides rules for:
-1. **Adding items** - Where to put new things
-2. **Finding items** - How to locate what you need
-3. **Removing items** - How to take things away
-4. **Organizing items** - How to keep things in order
-
-### Real-world Analogy
-Think of a playlist on your music app:
-- Adding a song = Insert operation
-- Finding a song = Search operation
-- Removing a song = Delete operation
-- Shuffling = Reorganization
-
-### Common Misconceptions
-❌ "It's only for interviews" - Actually used daily in real code
-❌ "One size fits all" - Different problems need different approaches
-❌ "It's too complex" - Start simple, build understanding gradually
-
-### Try it Yourself
-Start by implementing a basic version, then gradually add features. Practice makes perfect!
-"""
-        sources = ["Explanation Guide", "Concept Tutorials - Week 1"]
-    
-    return GenerateResponse(
+async def build_outline(doc_id: str, request: GenerateRequest) -> OutlineDocument:
+    """
+    Outline for a request: section titles from the provider, or the template
+    split into sections (all ready at once) when there is no provider or it fails
+    """
+    subject = request_subject(request)
+    provider = get_provider()
+    if provider is not None:
+        max_sections = get_settings().generation_outline_max_sections
+        try:
+            text = await get_single_flight().do(
+                ("outline", doc_id), lambda: generate_outline(provider, subject, request.type.value, max_sections)
+            )
+            titles = parse_outline(text, max_sections)
+            if titles:
+                return OutlineDocument(doc_id, request.type.value, subject, titles, source="provider")
+        except ProviderError as exc:
+            logger.warning(f"Serving {request.type.value} outline from template, provider failed: {exc}")
+    sections = split_sections(template_content(request))
+    document = OutlineDocument(doc_id, request.type.value, subject, [title for title, _ in sections], source="template")
+    document.sections = {number: text for number, (_, text) in enumerate(sections, start=1)}
+    return document
+
+
+def outline_response(document: OutlineDocument) -> OutlineResponse:
+    return OutlineResponse(
+        doc_id=document.doc_id,
+        type=document.type,
+        topic=document.topic,
+        source=document.source,
+        sections=[
+            OutlineSection(number=number, title=title, ready=number in document.sections)
+            for number, title in enumerate(document.titles, start=1)
+        ],
+        sources=SOURCES[GenerateType(document.type)],
+    )
+
+
+@router.post(
+    "/outline",
+    response_model=OutlineResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Outline Notes or Slides",
+    description="Return the section outline of notes or a slide deck; sections are generated when first fetched"
+)
+async def create_outline(request: GenerateRequest) -> OutlineResponse:
+    """
+    Outline-first generation for notes and slides
+    The same type and prompt map to the same doc_id, so a repeated request
+    returns the existing outline with the sections generated so far
+    """
+    if request.type not in OUTLINE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Outlines are available for notes and slides, not {request.type.value}"
+        )
+    store = get_outline_store()
+    doc_id = request_key(("outline",) + cache_bucket(request), request_subject(request))[:20]
+    document = store.get(doc_id)
+    if document is None:
+        document = await build_outline(doc_id, request)
+        store.add(document)
+    return outline_response(document)
+
+
+@router.get(
+    "/{doc_id}/sections/{number}",
+    response_model=SectionResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get Outline Section",
+    description="Get one section of an outlined document, generating it on first request"
+)
+async def get_section(doc_id: str, number: int = Path(..., ge=1)) -> SectionResponse:
+    """
+    Get section number (1-based) of a document from POST /generate/outline
+    Generated sections are kept with the document; concurrent requests for a
+    section that is still generating share one provider call
+    """
+    store = get_outline_store()
+    document = store.get(doc_id)
+    if document is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document '{doc_id}' not found; request its outline again")
+    if number > len(document.titles):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document '{doc_id}' has {len(document.titles)} sections"
+        )
+    content = store.section(document, number)
+    if content is None:
+        provider = get_provider()
+        if provider is None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No LLM provider available")
+
+        async def produce() -> str:
+            text = await generate_section(provider, document.topic, document.type, document.titles, number)
+            store.set_section(document, number, text)
+            return text
+
+        try:
+            content = await get_single_flight().do(("section", doc_id, number), produce)
+        except ProviderError as exc:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Section generation failed: {exc}")
+    return SectionResponse(
+        doc_id=doc_id,
+        number=number,
+        total=len(document.titles),
+        title=document.titles[number - 1],
         content=content,
-        type=request.type.value,
-        sources=sources
     )
+
+
+def template_content(request: GenerateRequest) -> str:
+    """Template content for a request, rendered from the generate/ prompt templates"""
+    prompts = get_prompt_registry()
+    if request.type == GenerateType.CODE:
+        language = (request.language or "python").lower()
+        name = f"generate/code_{language}"
+        if not prompts.has(name):
+            name = "generate/code_default"
+        return prompts.render(name, prompt=request.prompt, language=request.language or "python")
+    return prompts.render(f"generate/{request.type.value}", prompt=request.prompt)
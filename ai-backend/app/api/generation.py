@@ -2,10 +2,27 @@
 Generation router
 Handles content generation including theory and lab code
 """
-from fastapi import APIRouter, status
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import Optional, List, Tuple
+from datetime import datetime
 from enum import Enum
+import asyncio
+import hashlib
+import logging
+
+from app.config import get_settings
+from app.generation.cache import active_generation_cache, normalize_prompt
+from app.generation.coalesce import get_single_flight
+from app.generation.jobs import JobQueueError, get_job_queue
+from app.generation.lab_code_generator import generate_lab_code
+from app.generation.provider import ProviderError, get_provider
+from app.generation.theory_generator import generate_theory
+from app.generation.tool_controller import ToolCall, ToolController
+from app.generation.tools import retrieve
+
+
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/generation", tags=["Generation"])
@@ -23,6 +40,7 @@ class GenerationRequest(BaseModel):
     prompt: str
     generation_type: GenerationType
     context: Optional[List[str]] = None
+    topics: Optional[List[str]] = Field(None, max_length=10)  # Retrieved in parallel and added to the context
     max_tokens: int = 1000
 
 
@@ -31,6 +49,51 @@ class GenerationResponse(BaseModel):
     content: str
     generation_type: str
     message: str
+    trace: Optional[dict] = None  # Tool timing, when topics were retrieved
+
+
+class GenerationJobResponse(BaseModel):
+    """State of a generation job; result is set once it completes"""
+    job_id: str
+    status: str  # queued, running, completed or failed
+    result: Optional[GenerationResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    expires_at: Optional[datetime] = None
+
+
+def cache_bucket(request: GenerationRequest) -> tuple:
+    """
+    Everything besides the prompt that shapes the generated content
+    Topics are keyed by name rather than by the excerpts retrieved for them,
+    which vary between searches, so repeated requests share an entry
+    """
+    context = hashlib.sha1("\x1f".join(request.context).encode("utf-8")).hexdigest() if request.context else None
+    topics = tuple(sorted({normalize_prompt(topic) for topic in request.topics})) if request.topics else None
+    return ("generation", request.generation_type.value, context, topics, request.max_tokens)
+
+
+async def gather_context(request: GenerationRequest) -> Tuple[Optional[List[str]], Optional[dict]]:
+    """
+    The request context plus material excerpts for each requested topic
+    Topics are retrieved concurrently by the tool controller; returns the context and its trace
+    """
+    if not request.topics:
+        return request.context, None
+    settings = get_settings()
+    controller = ToolController(settings.generation_tool_timeout, settings.generation_tools_timeout)
+    calls = [ToolCall(f"retrieve:{topic}", retrieve, {"query": topic}) for topic in dict.fromkeys(request.topics)]
+    try:
+        outcome = await controller.run(calls)
+    finally:
+        controller.close()
+    context = list(request.context or [])
+    for call in calls:
+        for hit in outcome.get(call.name, []):
+            if hit["excerpt"] not in context:
+                context.append(hit["excerpt"])
+    return context or None, outcome.trace_dict()
 
 
 @router.post(
@@ -38,13 +101,50 @@ class GenerationResponse(BaseModel):
     response_model=GenerationResponse,
     status_code=status.HTTP_200_OK,
     summary="Generate Content",
-    description="Generate theory, lab code, or explanations (Mock Implementation)"
+    description="Generate theory, lab code, or explanations with the configured LLM provider"
 )
 async def generate_content(request: GenerationRequest) -> GenerationResponse:
     """
     Generate content based on prompt and type
-    Mock implementation for demonstration
+    Falls back to templates when no LLM provider is configured or the provider fails
     """
+    provider = get_provider()
+    if provider is not None:
+        cache = active_generation_cache()
+        # Keyed before retrieval, so a cached answer skips the topic searches
+        bucket = cache_bucket(request)
+        cached = cache.get(bucket, request.prompt) if cache is not None else None
+        if cached is not None:
+            return GenerationResponse(
+                content=cached,
+                generation_type=request.generation_type.value,
+                message="Content served from cache"
+            )
+        context, trace = await gather_context(request)
+        request = request.model_copy(update={"context": context})
+
+        async def produce() -> str:
+            if request.generation_type == GenerationType.LAB_CODE:
+                content = await generate_lab_code(provider, request.prompt, context=request.context, max_tokens=request.max_tokens)
+            else:
+                content = await generate_theory(
+                    provider, request.prompt, request.generation_type.value, request.context, request.max_tokens
+                )
+            if cache is not None:
+                cache.put(bucket, request.prompt, content)
+            return content
+
+        try:
+            content = await get_single_flight().do((bucket, normalize_prompt(request.prompt)), produce)
+            return GenerationResponse(
+                content=content,
+                generation_type=request.generation_type.value,
+                message=f"Content generated with {provider.model}",
+                trace=trace
+            )
+        except ProviderError as exc:
+            logger.warning(f"Serving {request.generation_type.value} template, provider failed: {exc}")
+    
     content = ""
     if request.generation_type == GenerationType.LAB_CODE:
         content = f"""
@@ -77,20 +177,75 @@ if __name__ == "__main__":
     )
 
 
+async def run_job(payload: dict) -> dict:
+    """Job runner used by the worker pool: the same generation as POST /generation/generate"""
+    response = await generate_content(GenerationRequest(**payload))
+    return response.model_dump()
+
+
+@router.post(
+    "/jobs",
+    response_model=GenerationJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit Generation Job",
+    description="Queue a generation and return a job id to poll"
+)
+async def submit_generation_job(request: GenerationRequest) -> GenerationJobResponse:
+    """
+    Queue a generation request for the worker pool
+    Returns immediately; poll GET /generation/jobs/{job_id} for the result
+    """
+    queue = get_job_queue()
+    if queue is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Generation workers are not running")
+    try:
+        job_id = await queue.submit(request.model_dump(mode="json"))
+    except JobQueueError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    return GenerationJobResponse(**await asyncio.to_thread(queue.store.get, job_id))
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=GenerationJobResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get Generation Job",
+    description="Status and, once completed, the result of a generation job"
+)
+async def get_generation_job(job_id: str) -> GenerationJobResponse:
+    """
+    Get a generation job
+    Finished jobs are kept until GENERATION_JOB_TTL expires
+    """
+    queue = get_job_queue()
+    # Workers write the store from threads; reading here would wait on its lock
+    job = await asyncio.to_thread(queue.store.get, job_id) if queue is not None else None
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Generation job '{job_id}' not found")
+    return GenerationJobResponse(**job)
+
+
 @router.get(
     "/status",
     status_code=status.HTTP_200_OK,
     summary="Generation Status",
-    description="Check generation system status"
+    description="Generation backend, job queue depth and worker utilization"
 )
 async def generation_status() -> dict:
     """
     Get generation system status
-    TODO: Add LLM connection check
+    Reports the LLM provider (templates are served without one) and the job worker pool
     """
+    provider = get_provider()
+    queue = get_job_queue()
+    jobs = queue.stats() if queue is not None else {"running": False, "workers": 0, "busy_workers": 0, "utilization": 0.0, "queue_depth": 0}
     return {
-        "status": "not_configured",
-        "message": "Generation system not configured yet",
-        "llm_provider": None,
-        "models": []
+        "status": "ready" if queue is not None else "workers_stopped",
+        "message": "Generation backed by an LLM provider" if provider is not None else "Generation served from templates; no LLM provider configured",
+        "llm_provider": provider.name if provider is not None else None,
+        "models": [provider.model] if provider is not None else [],
+        "queue_depth": jobs["queue_depth"],
+        "workers": jobs["workers"],
+        "busy_workers": jobs["busy_workers"],
+        "utilization": jobs["utilization"],
     }
@@ -5,8 +5,11 @@ Provides health check and readiness endpoints
 from fastapi import APIRouter, status
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Dict
 import sys
 
+from app.metrics import collect_metrics
+
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
@@ -20,6 +23,12 @@ class HealthResponse(BaseModel):
     python_version: str
 
 
+class MetricsResponse(BaseModel):
+    """Metrics snapshot response model"""
+    timestamp: datetime
+    metrics: Dict[str, dict]
+
+
 class ReadinessResponse(BaseModel):
     """Readiness check response model"""
     ready: bool
@@ -66,3 +75,21 @@ async def readiness_check() -> ReadinessResponse:
         message="Service is ready to accept requests",
         timestamp=datetime.utcnow()
     )
+
+
+@router.get(
+    "/metrics",
+    response_model=MetricsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Service Metrics",
+    description="Counters reported by caches, queues and provider clients"
+)
+async def metrics() -> MetricsResponse:
+    """
+    Metrics endpoint
+    Returns a snapshot of every registered metrics source
+    """
+    return MetricsResponse(
+        timestamp=datetime.utcnow(),
+        metrics=collect_metrics()
+    )
@@ -2,52 +2,215 @@
 RAG (Retrieval Augmented Generation) router
 Handles document retrieval and context augmentation
 """
-from fastapi import APIRouter, status
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from datetime import datetime
+from enum import Enum
+
+from app.config import get_settings
+from app.rag.documents import DocumentStore
+from app.rag.ingestion import MultipartIngestError, get_ingestion_jobs, ingest_multipart
+from app.rag.vector_store import get_segment_store
 
 
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
 
+class RetrievalMode(str, Enum):
+    """What each retrieved document carries"""
+    FULL = "full"  # Metadata and content
+    IDS = "ids"  # Ids, scores and offsets only
+
+
 class RetrievalRequest(BaseModel):
     """Request model for document retrieval"""
     query: str
     top_k: int = 5
     filters: Optional[dict] = None
+    mode: RetrievalMode = RetrievalMode.FULL
 
 
 class RetrievalResponse(BaseModel):
     """Response model for document retrieval"""
     query: str
+    mode: RetrievalMode = RetrievalMode.FULL
     documents: List[dict] = []
     message: str
 
 
+class BatchGetRequest(BaseModel):
+    """Request model for fetching documents or chunks by id"""
+    ids: List[str] = Field(..., min_length=1, max_length=100)
+    include_content: bool = True
+
+
+class BatchGetResponse(BaseModel):
+    """Response model for fetching documents or chunks by id"""
+    documents: List[dict] = []
+    missing: List[str] = []
+
+
+def get_document_store() -> DocumentStore:
+    """Document store over the shared material index and segment store"""
+    # Import here to avoid circular dependency
+    from app.api.search import MATERIAL_INDEX
+    return DocumentStore(MATERIAL_INDEX, get_segment_store())
+
+
+class IngestionJobResponse(BaseModel):
+    """Progress of an ingestion job"""
+    job_id: str
+    status: str  # pending, receiving, completed, failed
+    bytes_received: int
+    documents: int
+    chunks: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
 @router.post(
     "/retrieve",
     response_model=RetrievalResponse,
     status_code=status.HTTP_200_OK,
     summary="Retrieve Documents",
-    description="Retrieve relevant documents for a given query (Mock Implementation)"
+    description="Retrieve relevant documents for a given query; mode=ids returns only ids, scores and offsets"
 )
 async def retrieve_documents(request: RetrievalRequest) -> RetrievalResponse:
     """
-    Retrieve relevant documents from vector store
-    Mock implementation for demonstration
+    Retrieve relevant documents from the material index
+    Content is read from storage only in full mode and only for the returned hits;
+    fetch it later with documents:batchGet when using mode=ids
     """
-    mock_docs = [
-        {"id": "doc1", "title": "Introduction to Course", "content": f"Relevant content for {request.query} found in Intro."},
-        {"id": "doc2", "title": "Advanced Topics", "content": f"More details about {request.query} in Advanced Topics."}
-    ]
+    store = get_document_store()
+    hits = store.index.search(request.query, request.top_k).top(request.top_k)
+    
+    if request.mode == RetrievalMode.IDS:
+        documents = store.locate_hits(hits)
+    else:
+        documents = store.hydrate_hits(hits)
     
     return RetrievalResponse(
         query=request.query,
-        documents=mock_docs,
-        message="Documents retrieved successfully (Mock)"
+        mode=request.mode,
+        documents=documents,
+        message=f"Retrieved {len(documents)} documents"
     )
 
 
+@router.post(
+    "/documents:batchGet",
+    response_model=BatchGetResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Batch Get Documents",
+    description="Fetch up to 100 materials, uploaded documents or chunks by id in one call"
+)
+async def batch_get_documents(request: BatchGetRequest) -> BatchGetResponse:
+    """
+    Fetch documents or chunks by id
+    Results keep request order; unknown ids are listed in missing
+    """
+    documents, missing = get_document_store().get_many(request.ids, request.include_content)
+    return BatchGetResponse(documents=documents, missing=missing)
+
+
+@router.post(
+    "/ingest/jobs",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create Ingestion Job",
+    description="Reserve a job id to poll while its upload is sent with ?job_id="
+)
+async def create_ingestion_job() -> IngestionJobResponse:
+    """
+    Create a pending ingestion job
+    The upload only returns once the body is ingested, so clients that want
+    progress while it streams create the job first and poll it
+    """
+    return IngestionJobResponse(**get_ingestion_jobs().create(status="pending").to_dict())
+
+
+@router.post(
+    "/ingest/upload",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Upload Documents",
+    description="Stream multipart file uploads (text, code or ZIP bundles) into the chunker, embedder and segment store"
+)
+async def upload_documents(
+    request: Request,
+    material_type: Optional[str] = Query(None, alias="type"),
+    source: Optional[str] = None,
+    job_id: Optional[str] = None
+) -> IngestionJobResponse:
+    """
+    Ingest uploaded files without buffering them
+    The body is read as a stream and the response is the finished job; pass
+    the id of a job from POST /ingest/jobs to poll its progress while the
+    upload runs
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected a multipart/form-data body"
+        )
+    
+    settings = get_settings()
+    if job_id is None:
+        job = get_ingestion_jobs().create()
+    else:
+        job = get_ingestion_jobs().get(job_id)
+        if job is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingestion job '{job_id}' not found")
+        if job.status != "pending":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Ingestion job '{job_id}' already has an upload")
+        job.start()
+    # Import here to avoid circular dependency
+    from app.api.search import MATERIAL_INDEX
+    
+    try:
+        await ingest_multipart(
+            request.stream(),
+            content_type,
+            job,
+            store=get_segment_store(),
+            index=MATERIAL_INDEX,
+            material_type=material_type,
+            source=source,
+            chunk_size=settings.rag_chunk_size,
+            overlap=settings.rag_chunk_overlap
+        )
+    except MultipartIngestError as exc:
+        job.fail(str(exc))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except Exception as exc:
+        # Pollers must not see a job stuck in receiving after a disconnect or storage error
+        job.fail(str(exc) or type(exc).__name__)
+        raise
+    
+    job.complete()
+    return IngestionJobResponse(**job.to_dict())
+
+
+@router.get(
+    "/ingest/jobs/{job_id}",
+    response_model=IngestionJobResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Ingestion Job Status",
+    description="Poll the progress of an upload"
+)
+async def get_ingestion_job(job_id: str) -> IngestionJobResponse:
+    """
+    Get progress counters for an ingestion job
+    """
+    job = get_ingestion_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Ingestion job '{job_id}' not found")
+    return IngestionJobResponse(**job.to_dict())
+
+
 @router.get(
     "/status",
     status_code=status.HTTP_200_OK,
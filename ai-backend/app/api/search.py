@@ -2,11 +2,14 @@
 Search router
 Handles intelligent search functionality using RAG
 """
-from fastapi import APIRouter, status
+from fastapi import APIRouter, HTTPException, Query, status
 from pydantic import BaseModel
 from typing import List, Optional
 import random
 
+from app.rag.records import MaterialRecord, SearchHit, load_records
+from app.rag.retriever import MaterialIndex, score_record
+
 
 router = APIRouter(prefix="/search", tags=["Search"])
 
@@ -35,6 +38,32 @@ class SearchResponse(BaseModel):
     message: str
 
 
+class SimilarResponse(BaseModel):
+    """Response model for similar materials"""
+    id: str
+    results: List[SearchResult]
+
+
+class SymbolDefinition(BaseModel):
+    """Where a code symbol is defined"""
+    name: str
+    kind: str  # function, method, class, variable
+    chunk_id: str
+    doc_id: str
+    line: int
+    scope: Optional[str] = None
+    title: Optional[str] = None
+
+
+class SymbolResponse(BaseModel):
+    """Response model for symbol lookup"""
+    name: str
+    definitions: List[SymbolDefinition]
+    callers: List[str]
+    callees: List[str]
+    call_sites: List[str]
+
+
 # Mock data for search results
 MOCK_MATERIALS = [
     {
@@ -112,34 +141,31 @@ MOCK_MATERIALS = [
 ]
 
 
-def calculate_relevance(query: str, material: dict) -> tuple[float, List[str]]:
+# Compact records built once at import; requests score these instead of the dicts
+MATERIAL_RECORDS: List[MaterialRecord] = load_records(MOCK_MATERIALS)
+
+# Keyword index used for top-k retrieval over the records
+MATERIAL_INDEX = MaterialIndex(MATERIAL_RECORDS)
+
+
+def calculate_relevance(query: str, material: MaterialRecord) -> tuple[float, List[str]]:
     """Calculate relevance score and matched keywords"""
-    query_lower = query.lower()
-    query_words = set(query_lower.split())
-    
-    matched = []
-    score = 0.0
-    
-    # Check title
-    if query_lower in material["title"].lower():
-        score += 0.4
-        matched.append(query)
-    
-    # Check keywords
-    for keyword in material["keywords"]:
-        if keyword.lower() in query_lower or any(w in keyword.lower() for w in query_words):
-            score += 0.15
-            if keyword not in matched:
-                matched.append(keyword)
-    
-    # Check excerpt
-    if query_lower in material["excerpt"].lower():
-        score += 0.2
-    
-    # Add some randomness to simulate real search variance
-    score = min(1.0, score + random.uniform(0, 0.1))
-    
-    return score, matched[:5]  # Return max 5 matched keywords
+    return score_record(query, material)
+
+
+def to_search_result(hit: SearchHit, query: str) -> SearchResult:
+    """Convert an internal hit to the API model"""
+    record = hit.record
+    return SearchResult(
+        id=record.id,
+        title=record.title,
+        type=record.type,
+        relevanceScore=hit.score,
+        excerpt=record.excerpt,
+        source=record.source,
+        matchedKeywords=list(hit.matched) if hit.matched else [query],
+        week=record.week
+    )
 
 
 @router.post(
@@ -154,47 +180,92 @@ async def search_materials(request: SearchRequest) -> SearchResponse:
     Search materials based on query
     Returns relevant results with scores and matched keywords
     """
-    results = []
-    
-    for material in MOCK_MATERIALS:
-        score, matched_keywords = calculate_relevance(request.query, material)
-        
-        if score > 0.1 or len(matched_keywords) > 0:  # Include if somewhat relevant
-            results.append(SearchResult(
-                id=material["id"],
-                title=material["title"],
-                type=material["type"],
-                relevanceScore=round(score, 2),
-                excerpt=material["excerpt"],
-                source=material["source"],
-                matchedKeywords=matched_keywords if matched_keywords else [request.query],
-                week=material.get("week")
-            ))
-    
-    # Sort by relevance score
-    results.sort(key=lambda x: x.relevanceScore, reverse=True)
+    hits = MATERIAL_INDEX.search(request.query, 10, min_score=0.1, keep_matched=True)  # Return max 10 results
+    total = MATERIAL_INDEX.count_matches(request.query)
     
     # If no results, return some default results
-    if not results:
-        for material in MOCK_MATERIALS[:3]:
-            results.append(SearchResult(
-                id=material["id"],
-                title=material["title"],
-                type=material["type"],
-                relevanceScore=round(random.uniform(0.3, 0.6), 2),
-                excerpt=material["excerpt"],
-                source=material["source"],
-                matchedKeywords=[request.query],
-                week=material.get("week")
-            ))
+    if not hits:
+        for ordinal in range(min(3, len(MATERIAL_RECORDS))):
+            hits.append(ordinal, round(random.uniform(0.3, 0.6), 2))
+        total = len(hits)
     
     return SearchResponse(
         query=request.query,
-        results=results[:10],  # Return max 10 results
-        message=f"Found {len(results)} results for '{request.query}'"
+        results=[to_search_result(hit, request.query) for hit in hits],
+        message=f"Found {total} results for '{request.query}'"
     )
 
 
+@router.get(
+    "/similar/{material_id}",
+    response_model=SimilarResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Similar Materials",
+    description="Materials most similar to the given one, from the precomputed neighbour graph"
+)
+async def similar_materials(material_id: str, limit: int = Query(5, ge=1, le=10)) -> SimilarResponse:
+    """
+    Get "more like this" results for a material
+    Neighbours are kept up to date as materials are added, so this is a lookup, not a search
+    """
+    hits = MATERIAL_INDEX.similar(material_id, limit)
+    if hits is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Material '{material_id}' not found")
+    
+    anchor = MATERIAL_INDEX.get(material_id)
+    results = []
+    for hit in hits:
+        shared = [k for k in hit.record.keywords if k.lower() in anchor.keywords_lower]
+        results.append(to_search_result(SearchHit(hit.record, hit.score, tuple(shared)), anchor.title))
+    return SimilarResponse(id=material_id, results=results)
+
+
+@router.get(
+    "/symbols/{name}",
+    response_model=SymbolResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Look Up Code Symbol",
+    description="Find where a function, class or variable is defined in code and lab materials, and what calls it"
+)
+async def lookup_symbol(name: str) -> SymbolResponse:
+    """
+    Look up a symbol in the code symbol index
+    snake_case and camelCase spellings are equivalent
+    """
+    symbols = MATERIAL_INDEX.symbols
+    # Uploads add symbols from worker threads, so copy everything out under the read lock
+    with MATERIAL_INDEX.lock.read():
+        definitions = list(symbols.lookup(name))
+        callers = sorted(symbols.callers(name))
+        callees = sorted(symbols.callees(name))
+        call_sites = sorted(symbols.call_sites(name))
+    if not definitions and not call_sites:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Symbol '{name}' not found")
+    
+    return SymbolResponse(
+        name=name,
+        definitions=[
+            SymbolDefinition(**location.to_dict(), title=getattr(MATERIAL_INDEX.get(location.chunk_id), "title", None))
+            for location in definitions
+        ],
+        callers=callers,
+        callees=callees,
+        call_sites=call_sites
+    )
+
+
+SEARCH_SUGGESTIONS = [
+    "Data Structures",
+    "Algorithms",
+    "Sorting",
+    "Binary Search Tree",
+    "Dynamic Programming",
+    "Graph Algorithms",
+    "Recursion",
+    "Hash Tables"
+]
+
+
 @router.get(
     "/suggestions",
     status_code=status.HTTP_200_OK,
@@ -205,15 +276,4 @@ async def get_suggestions() -> dict:
     """
     Get popular search suggestions
     """
-    return {
-        "suggestions": [
-            "Data Structures",
-            "Algorithms",
-            "Sorting",
-            "Binary Search Tree",
-            "Dynamic Programming",
-            "Graph Algorithms",
-            "Recursion",
-            "Hash Tables"
-        ]
-    }
+    return {"suggestions": SEARCH_SUGGESTIONS}
@@ -0,0 +1,4 @@
+"""
+Chat Package
+Message classification for the chat assistant
+"""
@@ -0,0 +1,173 @@
+"""
+Chat connection state
+What a chat WebSocket keeps between turns: the topic under discussion, the
+recent history, and recent retrieval results reused instead of searched
+again. Frames go out through a bounded outbox, so a client that reads slowly
+pauses the turn producing them, and one that stops reading is disconnected
+"""
+from collections import OrderedDict, deque
+from functools import lru_cache, wraps
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+import asyncio
+import time
+
+from app.metrics import register_metrics
+
+
+class SlowConsumerError(Exception):
+    """Raised when a client has not read a frame for longer than the send timeout"""
+
+
+class OutboxClosedError(Exception):
+    """Raised when queueing a frame for a socket that can no longer be written"""
+
+
+class ChatContext:
+    """Per-connection warm context; retrieval results expire after ttl seconds"""
+
+    def __init__(
+        self,
+        max_results: int = 32,
+        ttl: float = 300.0,
+        max_messages: int = 50,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_results = max_results
+        self.ttl = ttl
+        self.clock = clock
+        self.topic: Optional[str] = None
+        self.history: Deque[dict] = deque(maxlen=max_messages)
+        self._results: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, kind: str, tool: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """The tool with its results kept for this connection, keyed by kind and arguments"""
+        @wraps(tool)
+        async def lookup(**args):
+            key = (kind, tuple(sorted(args.items())))
+            entry = self._results.get(key)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            result = await tool(**args)
+            self._results[key] = (self.clock(), result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+            return result
+        return lookup
+
+    def record(self, message: str, response: str) -> None:
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": response})
+
+
+class ConnectionStats:
+    """Open connections and message rates for this worker process"""
+
+    def __init__(self, window: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.open = 0
+        self.peak = 0
+        self.total = 0
+        self.messages = 0
+        self.frames_sent = 0
+        self.send_waits = 0
+        self.slow_consumers = 0
+        self._recent: Deque[float] = deque()
+
+    def opened(self) -> None:
+        self.open += 1
+        self.total += 1
+        self.peak = max(self.peak, self.open)
+
+    def closed(self) -> None:
+        self.open -= 1
+
+    def message(self) -> None:
+        self.messages += 1
+        now = self.clock()
+        self._recent.append(now)
+        while self._recent and self._recent[0] < now - self.window:
+            self._recent.popleft()
+
+    def messages_per_second(self) -> float:
+        now = self.clock()
+        while self._recent and self._recent[0] < now - self.window:
+            self._recent.popleft()
+        return len(self._recent) / self.window
+
+    def stats(self) -> dict:
+        return {
+            "open_connections": self.open,
+            "peak_connections": self.peak,
+            "connections_total": self.total,
+            "messages": self.messages,
+            "messages_per_second": round(self.messages_per_second(), 3),
+            "frames_sent": self.frames_sent,
+            "send_waits": self.send_waits,
+            "slow_consumers": self.slow_consumers,
+        }
+
+
+@lru_cache()
+def get_connection_stats() -> ConnectionStats:
+    """Get the process-wide chat connection counters"""
+    return ConnectionStats()
+
+
+class FrameOutbox:
+    """
+    Bounded queue between a turn and the socket writer
+    put() waits while max_frames are unsent and raises SlowConsumerError
+    after timeout seconds without room
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict], Awaitable[None]],
+        max_frames: int = 32,
+        timeout: float = 10.0,
+        stats: Optional[ConnectionStats] = None,
+    ):
+        self.send = send
+        self.timeout = timeout
+        self.stats = stats
+        self._queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=max_frames)
+        self._writer: Optional["asyncio.Task"] = None
+
+    def start(self) -> "FrameOutbox":
+        self._writer = asyncio.ensure_future(self._write())
+        return self
+
+    async def _write(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            await self.send(frame)
+            self._queue.task_done()
+            if self.stats is not None:
+                self.stats.frames_sent += 1
+
+    async def put(self, frame: dict) -> None:
+        if self._writer is not None and self._writer.done():
+            raise OutboxClosedError("Connection writer stopped")
+        if self._queue.full() and self.stats is not None:
+            self.stats.send_waits += 1
+        try:
+            await asyncio.wait_for(self._queue.put(frame), self.timeout)
+        except asyncio.TimeoutError:
+            if self.stats is not None:
+                self.stats.slow_consumers += 1
+            raise SlowConsumerError(f"Client read nothing for {self.timeout}s") from None
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+
+register_metrics("chat_websocket", lambda: get_connection_stats().stats())
@@ -0,0 +1,206 @@
+"""
+Chat intent matching
+Classifies a message in one pass. Every rule keyword, regex trigger and
+topic is compiled into one Aho-Corasick automaton; a single scan of the
+lowercased message yields the rules that can fire, and only those rules'
+precompiled patterns are run. Rules are data (intents.json) checked in file
+order, so the first rule that fires wins and is reported by name
+"""
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import json
+import re
+
+
+RULES_PATH = Path(__file__).parent / "intents.json"
+
+MATCH_MODES = ("substring", "word", "prefix")
+
+
+class IntentError(Exception):
+    """Raised for malformed intent rules"""
+
+
+class AhoCorasick:
+    """Automaton finding every occurrence of every pattern in one pass over a text"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        if not pattern:
+            raise IntentError("Empty pattern")
+        state = 0
+        for char in pattern:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = following
+        self._out[state].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _link(self) -> None:
+        """Failure links breadth first; each state also reports its suffix states' patterns"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[following] = link if link != following else 0
+                self._out[following] = self._out[following] + self._out[self._fail[following]]
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(pattern id, end offset) of every occurrence, in order of end offset"""
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._out[state]:
+                yield pattern_id, position + 1
+
+
+class IntentRule:
+    """
+    A keyword rule fires when one of its keywords occurs (as a substring,
+    whole word or word prefix); a pattern rule runs its regex only when one
+    of its trigger literals occurs
+    """
+    __slots__ = ("name", "intent", "keywords", "match", "max_length", "pattern", "triggers", "query")
+
+    def __init__(self, spec: dict):
+        try:
+            self.name = spec["name"]
+            self.intent = spec["intent"]
+        except KeyError as exc:
+            raise IntentError(f"Intent rule needs {exc.args[0]!r}: {spec}") from None
+        self.keywords = [keyword.lower() for keyword in spec.get("keywords", ())]
+        self.match = spec.get("match", "word")
+        self.max_length: Optional[int] = spec.get("max_length")
+        self.pattern = re.compile(spec["pattern"]) if "pattern" in spec else None
+        self.triggers = [trigger.lower() for trigger in spec.get("triggers", ())]
+        self.query = spec.get("query")
+        if self.match not in MATCH_MODES:
+            raise IntentError(f"Rule '{self.name}' has unknown match mode '{self.match}'")
+        if (self.pattern is None) == (not self.keywords):
+            raise IntentError(f"Rule '{self.name}' needs either keywords or a pattern")
+        if self.pattern is not None and not self.triggers:
+            raise IntentError(f"Pattern rule '{self.name}' needs trigger literals")
+
+
+class IntentMatch:
+    """Outcome of classifying a message; rule is None for plain conversation"""
+    __slots__ = ("intent", "rule", "query", "keyword", "topic", "fired")
+
+    def __init__(
+        self,
+        intent: str,
+        rule: Optional[str] = None,
+        query: Optional[str] = None,
+        keyword: Optional[str] = None,
+        topic: Optional[str] = None,
+        fired: Tuple[str, ...] = (),
+    ):
+        self.intent = intent
+        self.rule = rule
+        self.query = query
+        self.keyword = keyword
+        self.topic = topic
+        self.fired = fired  # Names of every keyword rule that fired, besides the winner
+
+    def __repr__(self) -> str:
+        return f"IntentMatch(intent={self.intent!r}, rule={self.rule!r}, topic={self.topic!r})"
+
+
+def _is_word_char(text: str, index: int) -> bool:
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == "_")
+
+
+def load_rules(path: Path = RULES_PATH) -> List[dict]:
+    """Rule specs from a JSON file with a "rules" list"""
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)["rules"]
+
+
+class IntentMatcher:
+    """Rules plus topics compiled into one automaton"""
+
+    def __init__(self, rules: Sequence[dict], topics: Sequence[str] = ()):
+        self.rules = [IntentRule(spec) for spec in rules]
+        self.topics = [topic.lower() for topic in topics]
+        # literal -> [(kind, index)], kind is "keyword", "trigger" or "topic"
+        literals: Dict[str, List[Tuple[str, int]]] = {}
+        for index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                literals.setdefault(keyword, []).append(("keyword", index))
+            for trigger in rule.triggers:
+                literals.setdefault(trigger, []).append(("trigger", index))
+        for index, topic in enumerate(self.topics):
+            literals.setdefault(topic, []).append(("topic", index))
+        self._automaton = AhoCorasick(literals)
+        self._targets = [literals[literal] for literal in self._automaton.patterns]
+        self.regex_evaluations = 0
+
+    def _keyword_fits(self, text: str, start: int, end: int, mode: str) -> bool:
+        if mode == "substring":
+            return True
+        if _is_word_char(text, start - 1):
+            return False
+        return mode == "prefix" or not _is_word_char(text, end)
+
+    def classify(self, message: str) -> IntentMatch:
+        """The first rule (in rule order) that fires for the message, and the first topic it mentions"""
+        text = message.lower()
+        keywords: Dict[int, str] = {}
+        candidates: Set[int] = set()
+        topics: Set[int] = set()
+        for literal_id, end in self._automaton.find_all(text):
+            literal = self._automaton.patterns[literal_id]
+            start = end - len(literal)
+            for kind, index in self._targets[literal_id]:
+                if kind == "topic":
+                    topics.add(index)
+                elif kind == "trigger":
+                    candidates.add(index)
+                elif index not in keywords and self._keyword_fits(text, start, end, self.rules[index].match):
+                    keywords[index] = literal
+                    candidates.add(index)
+
+        topic = self.topics[min(topics)] if topics else None
+        fits = [index for index in sorted(keywords) if self._fits_length(index, text)]
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if not self._fits_length(index, text):
+                continue
+            query = None
+            if rule.pattern is not None:
+                self.regex_evaluations += 1
+                found = rule.pattern.search(text)
+                if found is None:
+                    continue
+                if rule.query == "last_group" and found.groups():
+                    query = found.groups()[-1]
+            if rule.query == "message":
+                query = message
+            fired = tuple(self.rules[other].name for other in fits if other != index)
+            return IntentMatch(rule.intent, rule.name, query, keywords.get(index), topic, fired)
+        return IntentMatch("conversation", topic=topic, fired=tuple(self.rules[index].name for index in fits))
+
+    def _fits_length(self, index: int, text: str) -> bool:
+        max_length = self.rules[index].max_length
+        return max_length is None or len(text) <= max_length
@@ -0,0 +1,259 @@
+"""
+Chat session store
+Conversation history keyed by session id, so clients send only the new
+message. Recently used sessions stay in an in-memory LRU; every message is
+also appended to a write buffer that is flushed to SQLite (WAL mode) in
+batches, by size or by a background task started in the app lifespan.
+History is read from SQLite only when a session is not hot, and only the
+last max_messages of a session are kept
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Iterator, List, Optional, Sequence, Set, Tuple
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.config import Settings
+from app.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at);
+"""
+
+# (session id, role, content, created at) rows waiting to be written
+PendingRow = Tuple[str, str, str, float]
+
+
+class SessionStore:
+    """
+    LRU of loaded sessions over a SQLite message log
+    Appends never read the database; a session that is not hot is loaded
+    (after flushing its pending writes) the first time its history is needed
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 1000,
+        max_messages: int = 50,
+        batch_size: int = 64,
+        ttl: float = 7 * 86400.0,
+        clock=time.time,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._hot: "OrderedDict[str, Deque[dict]]" = OrderedDict()
+        self._pending: List[PendingRow] = []
+        self._pending_sessions: Set[str] = set()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.appended = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def history(self, session_id: str) -> List[dict]:
+        """The session's last max_messages messages as {"role", "content"} dicts, oldest first"""
+        messages = self._hot.get(session_id)
+        if messages is not None:
+            self._hot.move_to_end(session_id)
+            self.hits += 1
+            return list(messages)
+        if session_id in self._pending_sessions:
+            self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.max_messages),
+            ).fetchall()
+        self.loads += 1
+        messages = deque(({"role": role, "content": content} for role, content in reversed(rows)), maxlen=self.max_messages)
+        self._remember(session_id, messages)
+        return list(messages)
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Add a message; it is written with the next batch"""
+        message = {"role": role, "content": content}
+        messages = self._hot.get(session_id)
+        if messages is not None:
+            messages.append(message)
+            self._hot.move_to_end(session_id)
+        self._pending.append((session_id, role, content, self.clock()))
+        self._pending_sessions.add(session_id)
+        self.appended += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _remember(self, session_id: str, messages: Deque[dict]) -> None:
+        self._hot[session_id] = messages
+        while len(self._hot) > self.max_sessions:
+            self._hot.popitem(last=False)
+            self.evictions += 1
+
+    def flush(self) -> int:
+        """Write pending messages in one transaction and trim the sessions they touched"""
+        if not self._pending:
+            return 0
+        rows, self._pending = self._pending, []
+        sessions, self._pending_sessions = self._pending_sessions, set()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)", rows
+                )
+                self._db.executemany(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    [(session_id, session_id, self.max_messages) for session_id in sessions],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                self._pending = rows + self._pending
+                self._pending_sessions |= sessions
+                raise
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than ttl"""
+        cutoff = self.clock() - self.ttl
+        with self._lock:
+            expired = [row[0] for row in self._db.execute(
+                "SELECT session_id FROM messages GROUP BY session_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            if expired:
+                self._db.executemany("DELETE FROM messages WHERE session_id = ?", [(s,) for s in expired])
+        for session_id in expired:
+            self._hot.pop(session_id, None)
+        return len(expired)
+
+    def stats(self) -> dict:
+        reads = self.hits + self.loads
+        return {
+            "hot_sessions": len(self._hot),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / reads, 4) if reads else 0.0,
+            "evictions": self.evictions,
+            "appended": self.appended,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "mean_batch": round(self.rows_written / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+class SessionHistory(Sequence[dict]):
+    """A session's history that is only read from the store when first accessed"""
+
+    def __init__(self, store: SessionStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self._messages: Optional[List[dict]] = None
+
+    @property
+    def messages(self) -> List[dict]:
+        if self._messages is None:
+            self._messages = self.store.history(self.session_id)
+        return self._messages
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.messages)
+
+
+_store: Optional[SessionStore] = None
+_flusher: Optional["asyncio.Task"] = None
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """Store opened by the lifespan; None before startup or when sessions are off"""
+    return _store
+
+
+async def _flush_periodically(store: SessionStore, interval: float) -> None:
+    purged_at = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            store.flush()
+            if time.monotonic() - purged_at >= 3600:
+                purged_at = time.monotonic()
+                store.purge_expired()
+        except sqlite3.Error:
+            logger.exception("Flushing chat sessions failed")
+
+
+async def start_session_store(settings: Settings) -> Optional[SessionStore]:
+    """Open the session database and start the background flusher"""
+    global _store, _flusher
+    if not settings.chat_sessions_enabled:
+        return None
+    path = settings.chat_sessions_path or os.path.join(tempfile.mkdtemp(prefix="chat-sessions-"), "sessions.sqlite3")
+    _store = SessionStore(
+        path,
+        max_sessions=settings.chat_session_cache_size,
+        max_messages=settings.chat_session_max_messages,
+        batch_size=settings.chat_session_batch_size,
+        ttl=settings.chat_session_ttl,
+    )
+    _flusher = asyncio.create_task(_flush_periodically(_store, settings.chat_session_flush_interval))
+    logger.info(f"Chat sessions stored in {path}")
+    return _store
+
+
+async def stop_session_store() -> None:
+    """Stop the flusher, write what is pending and close the database"""
+    global _store, _flusher
+    store, _store = _store, None
+    flusher, _flusher = _flusher, None
+    if flusher is not None:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+    if store is not None:
+        store.close()
+
+
+def _session_stats() -> dict:
+    return _store.stats() if _store is not None else {"enabled": False}
+
+
+register_metrics("chat_sessions", _session_stats)
@@ -0,0 +1,78 @@
+"""
+Chat stage graph
+The independent work behind one chat turn (retrieval, related materials,
+content generation) is started together on a tool controller as soon as the
+intent is known, while the reply is being written. The reply reads each
+stage when it reaches it; a stage that fails or misses its deadline is
+dropped and the reply goes on with a default
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+
+from app.generation.tool_controller import StageTiming, ToolCall, ToolController
+from app.metrics import register_metrics
+
+
+# Stage name -> status -> count, across every turn
+STAGE_COUNTS: Dict[str, Dict[str, int]] = {}
+
+
+class ChatStages:
+    """
+    Stages of one turn, running until read or closed
+    Use as an async context manager so stages nobody read are cancelled
+    """
+
+    def __init__(self, calls: List[ToolCall], stage_timeout: Optional[float] = None):
+        self.calls = calls
+        self.controller = ToolController(stage_timeout)
+        self._settled: Dict[str, "asyncio.Future"] = {}
+        self._run: Optional["asyncio.Task"] = None
+
+    def start(self) -> "ChatStages":
+        loop = asyncio.get_running_loop()
+        self._settled = {call.name: loop.create_future() for call in self.calls}
+        self._run = asyncio.ensure_future(self.controller.run(self.calls, on_done=self._on_done))
+        return self
+
+    def _on_done(self, stage: StageTiming, result: Any) -> None:
+        counts = STAGE_COUNTS.setdefault(stage.name, {})
+        counts[stage.status] = counts.get(stage.status, 0) + 1
+        settled = self._settled[stage.name]
+        if not settled.done():
+            settled.set_result((stage.status in ("ok", "cached"), result))
+
+    async def result(self, name: str, default: Any = None) -> Any:
+        """The stage's result, or default once it has failed or timed out, or was never scheduled"""
+        settled = self._settled.get(name)
+        if settled is None:
+            return default
+        succeeded, result = await asyncio.shield(settled)
+        return result if succeeded else default
+
+    async def close(self) -> None:
+        if self._run is not None and not self._run.done():
+            self._run.cancel()
+            await asyncio.gather(self._run, return_exceptions=True)
+        self.controller.close()
+        for settled in self._settled.values():
+            if not settled.done():
+                settled.set_result((False, None))
+
+    async def __aenter__(self) -> "ChatStages":
+        return self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def _stage_stats() -> dict:
+    stats = {}
+    for name, counts in STAGE_COUNTS.items():
+        total = sum(counts.values())
+        dropped = counts.get("timeout", 0) + counts.get("error", 0) + counts.get("skipped", 0)
+        stats[name] = {**counts, "drop_rate": round(dropped / total, 4) if total else 0.0}
+    return stats
+
+
+register_metrics("chat_stages", _stage_stats)
@@ -34,6 +34,98 @@ class Settings(BaseSettings):
     # OpenAI Settings (optional)
     openai_api_key: Optional[str] = None
 
+    # LLM Provider Settings; templates are served when neither a key nor a base URL is set
+    llm_base_url: Optional[str] = None  # Any OpenAI-compatible endpoint, e.g. http://localhost:8100/v1
+    llm_model: str = "gpt-4o-mini"
+    llm_timeout: float = 30.0
+    llm_connect_timeout: float = 5.0
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_http2: bool = True
+
+    # Provider resilience; a hedge duplicates a call slower than the latency percentile,
+    # the breaker fails fast while failure_rate of the recent window errored
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_delay: float = 0.05
+    llm_hedge_max_rate: float = 0.1
+    llm_breaker_enabled: bool = True
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_min_requests: int = 20
+    llm_breaker_window: int = 50
+    llm_breaker_cooldown: float = 30.0
+
+    # Generation cache; a similarity above 1 turns the similar-prompt fallback off
+    generation_cache_enabled: bool = True
+    generation_cache_max_bytes: int = 32 * 1024 * 1024
+    generation_cache_ttl: float = 3600.0
+    generation_cache_similarity: float = 0.9
+
+    # Materialized artifacts written by python -m app.generation.materialize; POST /generate reads them first
+    generation_artifacts_path: Optional[str] = None
+    generation_materialize_workers: int = 4
+
+    # Batch generation; items generated at once by one POST /generate/batch
+    generation_batch_concurrency: int = 8
+    generation_batch_max_items: int = 200
+
+    # Outline-first notes and slides; sections are generated when first opened
+    generation_outline_max_sections: int = 8
+    generation_outline_max_documents: int = 1000
+
+    # Context packing; passages fill what the window leaves after the prompt and reply, up to the cap
+    generation_context_window: int = 8192
+    generation_context_max_tokens: int = 3000
+
+    # Tool controller; seconds per tool call and per generation
+    generation_tool_timeout: float = 5.0
+    generation_tools_timeout: float = 15.0
+
+    # Generation jobs; finished results are kept for generation_job_ttl seconds
+    generation_job_workers: int = 4
+    generation_job_queue_size: int = 1000
+    generation_job_ttl: float = 86400.0
+    generation_jobs_path: Optional[str] = None  # SQLite result store; a temporary file when unset
+
+    # Chat prefetch (opt-in); follow-ups are warmed only while fewer than load_threshold requests are in flight
+    chat_prefetch_enabled: bool = False
+    chat_prefetch_max_tasks: int = 4
+    chat_prefetch_per_minute: int = 30
+    chat_prefetch_load_threshold: int = 8
+
+    # Chat sessions; the last chat_session_max_messages per session are kept, idle sessions expire after chat_session_ttl seconds
+    chat_sessions_enabled: bool = True
+    chat_sessions_path: Optional[str] = None  # SQLite session store; a temporary file when unset
+    chat_session_cache_size: int = 1000  # Sessions kept in memory
+    chat_session_max_messages: int = 50
+    chat_session_ttl: float = 604800.0
+    chat_session_flush_interval: float = 0.5  # Seconds between batched writes
+    chat_session_batch_size: int = 64  # Pending messages that force a write
+
+    # Chat stages; seconds a retrieval stage may take before the reply goes on without it
+    chat_stage_timeout: float = 2.0
+    chat_generation_timeout: float = 60.0  # Past this the reply carries template content
+
+    # Chat WebSocket; frames queued per connection before a turn pauses, and seconds before a stalled client is dropped
+    chat_ws_send_queue: int = 32
+    chat_ws_send_timeout: float = 10.0
+    chat_ws_context_size: int = 32  # Retrieval results kept per connection
+    chat_ws_context_ttl: float = 300.0
+
+    # Prompt templates; seconds between mtime checks, negative disables hot reload
+    prompt_reload_interval: float = 1.0
+
+    # RAG Settings
+    rag_data_dir: Optional[str] = None  # Segment files; a temporary directory when unset
+    rag_chunk_size: int = 1000
+    rag_chunk_overlap: int = 100
+    rag_embedding_dim: int = 256
+    rag_segment_max_chunks: int = 256
+    # Ingestion jobs kept for polling; pending jobs expire after rag_pending_job_ttl seconds without an upload
+    rag_max_ingestion_jobs: int = 1000
+    rag_pending_job_ttl: float = 600.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
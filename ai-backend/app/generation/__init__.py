@@ -0,0 +1,4 @@
+"""
+Generation Package
+LLM provider access and content generators
+"""
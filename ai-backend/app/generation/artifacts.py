@@ -0,0 +1,119 @@
+"""
+Materialized artifact store
+Content generated ahead of time (see app.generation.materialize) is kept on
+disk, addressed by the SHA-256 of its bytes. A ref per request key (bucket
+plus normalized prompt, the generation cache's key) points at the object,
+so identical content is stored once and writes from several processes are
+atomic renames
+"""
+from functools import lru_cache
+from typing import Hashable, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from app.config import get_settings
+from app.generation.cache import normalize_prompt
+from app.metrics import register_metrics
+
+
+Bucket = Tuple[Hashable, ...]
+
+
+def request_key(bucket: Bucket, prompt: str) -> str:
+    """Stable hex key for a request bucket and prompt"""
+    canonical = json.dumps([list(bucket), normalize_prompt(prompt)], separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Directory of objects/<2>/<sha256> content blobs and refs/<2>/<key>.json
+    pointers; refs are replaced atomically so readers never see partial writes
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "refs"), exist_ok=True)
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_served = 0
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _ref_path(self, key: str) -> str:
+        return os.path.join(self.root, "refs", key[:2], f"{key}.json")
+
+    def _write(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def has(self, bucket: Bucket, prompt: str) -> bool:
+        return os.path.exists(self._ref_path(request_key(bucket, prompt)))
+
+    def get(self, bucket: Bucket, prompt: str) -> Optional[str]:
+        """Materialized content for the request, or None"""
+        self.lookups += 1
+        try:
+            with open(self._ref_path(request_key(bucket, prompt)), "r", encoding="utf-8") as handle:
+                digest = json.load(handle)["digest"]
+            with open(self._object_path(digest), "rb") as handle:
+                data = handle.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            return None
+        self.hits += 1
+        self.bytes_served += len(data)
+        return data.decode("utf-8")
+
+    def put(self, bucket: Bucket, prompt: str, content: str) -> str:
+        """Store content for the request; returns its digest"""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self._object_path(digest)):
+            self._write(self._object_path(digest), data)
+        ref = {"digest": digest, "bucket": list(bucket), "prompt": prompt, "created_at": time.time()}
+        self._write(self._ref_path(request_key(bucket, prompt)), json.dumps(ref).encode("utf-8"))
+        return digest
+
+    def stats(self) -> dict:
+        return {
+            "path": self.root,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "bytes_served": self.bytes_served,
+        }
+
+
+@lru_cache()
+def open_artifact_store(root: str) -> ArtifactStore:
+    """Shared store for a directory"""
+    return ArtifactStore(root)
+
+
+def active_artifact_store() -> Optional[ArtifactStore]:
+    """The configured store, or None when GENERATION_ARTIFACTS_PATH is unset"""
+    root = get_settings().generation_artifacts_path
+    return open_artifact_store(root) if root else None
+
+
+def _artifact_metrics() -> dict:
+    store = active_artifact_store()
+    return store.stats() if store is not None else {"enabled": False}
+
+
+register_metrics("generation_artifacts", _artifact_metrics)
@@ -0,0 +1,196 @@
+"""
+Semantic generation cache
+Generated content is cached under (bucket, normalized prompt), where the bucket
+holds everything else that shapes the output (endpoint, type, language,
+context). A miss falls back to the most similar cached prompt in the same
+bucket when its cosine similarity reaches the threshold
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from math import sqrt
+from typing import Callable, Dict, Hashable, Optional, Set, Tuple
+import re
+import time
+
+from app.config import get_settings
+from app.metrics import register_metrics
+
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+# Wording that does not change what is generated
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "on", "about", "of", "for", "to", "in", "me", "some", "please", "can", "could",
+    "you", "i", "want", "need", "give", "write", "generate", "make", "create", "show", "explain",
+    "notes", "note", "summary", "summarize", "slides", "code", "explanation", "and", "is", "what",
+})
+
+Bucket = Tuple[Hashable, ...]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase content words of a prompt, with punctuation and filler removed"""
+    tokens = _TOKEN.findall(prompt.lower())
+    content = [t for t in tokens if t not in FILLER_WORDS]
+    return " ".join(content or tokens)
+
+
+def _vector(normalized: str) -> Dict[str, float]:
+    counts: Dict[str, float] = {}
+    for token in normalized.split():
+        counts[token] = counts.get(token, 0.0) + 1.0
+    norm = sqrt(sum(c * c for c in counts.values()))
+    return {token: count / norm for token, count in counts.items()} if norm else {}
+
+
+class _Entry:
+    __slots__ = ("content", "size", "expires", "vector", "hits")
+
+    def __init__(self, content: str, size: int, expires: float, vector: Dict[str, float]):
+        self.content = content
+        self.size = size
+        self.expires = expires
+        self.vector = vector
+        self.hits = 0
+
+
+class GenerationCache:
+    """
+    LRU cache with a TTL and a byte budget
+    Similar-prompt lookups go through a (bucket, token) -> keys index, so only
+    entries sharing a word with the prompt are compared
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600.0,
+        similarity_threshold: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[Bucket, str], _Entry]" = OrderedDict()
+        self._tokens: Dict[Tuple[Bucket, str], Set[Tuple[Bucket, str]]] = {}
+        self.bytes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, bucket: Bucket, prompt: str) -> Optional[str]:
+        """Cached content for the prompt, or for a similar prompt in the same bucket"""
+        self.lookups += 1
+        normalized = normalize_prompt(prompt)
+        key = (bucket, normalized)
+        entry = self._live(key)
+        if entry is None and self.similarity_threshold <= 1.0:
+            key = self._similar(bucket, normalized)
+            entry = self._live(key) if key is not None else None
+            if entry is not None:
+                self.semantic_hits += 1
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.hits += 1
+        self.bytes_saved += len(entry.content.encode("utf-8"))
+        return entry.content
+
+    def put(self, bucket: Bucket, prompt: str, content: str) -> bool:
+        """Cache content; returns False when it is larger than the whole budget"""
+        normalized = normalize_prompt(prompt)
+        key = (bucket, normalized)
+        size = len(content.encode("utf-8")) + len(normalized) + 64
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        vector = _vector(normalized)
+        self._entries[key] = _Entry(content, size, self.clock() + self.ttl, vector)
+        self.bytes += size
+        for token in vector:
+            self._tokens.setdefault((bucket, token), set()).add(key)
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens.clear()
+        self.bytes = 0
+
+    def _live(self, key: Tuple[Bucket, str]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _similar(self, bucket: Bucket, normalized: str) -> Optional[Tuple[Bucket, str]]:
+        """Most similar cached key in the bucket at or above the threshold"""
+        vector = _vector(normalized)
+        scores: Dict[Tuple[Bucket, str], float] = {}
+        for token, weight in vector.items():
+            for key in self._tokens.get((bucket, token), ()):
+                scores[key] = scores.get(key, 0.0) + weight * self._entries[key].vector[token]
+        best = max(scores.items(), key=lambda item: item[1], default=None)
+        if best is None or best[1] < self.similarity_threshold - 1e-9:
+            return None
+        return best[0]
+
+    def _remove(self, key: Tuple[Bucket, str]) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        bucket = key[0]
+        for token in entry.vector:
+            keys = self._tokens.get((bucket, token))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tokens[(bucket, token)]
+
+    def stats(self) -> dict:
+        misses = self.lookups - self.hits
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": misses,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+@lru_cache()
+def get_generation_cache() -> GenerationCache:
+    """Get the process-wide generation cache"""
+    settings = get_settings()
+    return GenerationCache(
+        max_bytes=settings.generation_cache_max_bytes,
+        ttl=settings.generation_cache_ttl,
+        similarity_threshold=settings.generation_cache_similarity,
+    )
+
+
+def active_generation_cache() -> Optional[GenerationCache]:
+    """The process-wide cache, or None when caching is disabled"""
+    return get_generation_cache() if get_settings().generation_cache_enabled else None
+
+
+register_metrics("generation_cache", lambda: get_generation_cache().stats())
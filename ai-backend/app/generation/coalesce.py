@@ -0,0 +1,114 @@
+"""
+Single-flight request coalescing
+Concurrent generation requests with the same key await one shared computation
+instead of each calling the provider. The computation runs as its own task and
+callers wait on it through asyncio.shield, so a caller that disconnects is
+cancelled alone while the others still get the result. A computation only
+prefetches are waiting for is cancelled when the last of them is
+"""
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import logging
+
+from app.generation.prefetch import speculative
+from app.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "wanted")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+        self.wanted = False  # A user request joined, so the result is kept even if every caller leaves
+
+
+class SingleFlight:
+    """
+    In-flight computations keyed by request
+    A flight is forgotten as soon as it finishes, so later requests start a
+    new one (or hit the generation cache the finished one filled)
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.cancelled_waiters = 0
+        self.abandoned = 0
+        self.failures = 0
+        self.max_fan_out = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, produce: Callable[[], Awaitable[T]]) -> T:
+        """Result of produce(), shared with every concurrent caller using the same key"""
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight.task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            flight = self._start(key, produce)
+        flight.waiters += 1
+        flight.wanted = flight.wanted or not speculative()
+        self.max_fan_out = max(self.max_fan_out, flight.waiters)
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.cancelled():
+                self.cancelled_waiters += 1
+            if flight.waiters == 1 and not flight.wanted:
+                # Nobody but cancelled prefetches wants this; stop the work and wait until it has stopped
+                self.abandoned += 1
+                flight.task.cancel()
+                await asyncio.wait([flight.task])
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _start(self, key: Hashable, produce: Callable[[], Awaitable[T]]) -> _Flight:
+        self.executions += 1
+        flight = _Flight(asyncio.ensure_future(produce()))
+        self._flights[key] = flight
+
+        def finished(task: "asyncio.Task") -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            # Retrieve the error so a flight every caller abandoned does not log "never retrieved"
+            if not task.cancelled() and task.exception() is not None:
+                self.failures += 1
+
+        flight.task.add_done_callback(finished)
+        return flight
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "mean_fan_out": round(self.calls / self.executions, 2) if self.executions else 0.0,
+            "max_fan_out": self.max_fan_out,
+            "cancelled_waiters": self.cancelled_waiters,
+            "abandoned": self.abandoned,
+            "failures": self.failures,
+        }
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight group for generation"""
+    return SingleFlight()
+
+
+register_metrics("generation_coalescing", lambda: get_single_flight().stats())
@@ -0,0 +1,177 @@
+"""
+Context builder
+Fits retrieved passages into a prompt's token budget. Passages are scored
+for relevance to the query, near-duplicates are dropped, the most valuable
+set that fits is chosen with a 0/1 knapsack, and the result is ordered most
+relevant first
+"""
+from typing import Dict, List, Optional, Sequence
+import re
+
+from app.config import get_settings
+from app.generation.templates import get_prompt_registry
+
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Capacity of the knapsack table; budgets above this are solved in coarser token units
+KNAPSACK_CELLS = 512
+# Only the best-scored passages are considered, so packing time does not grow with retrieval size
+MAX_CANDIDATES = 256
+DUPLICATE_CONTAINMENT = 0.8
+SHINGLE_SIZE = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count without a tokenizer
+    Every word or punctuation mark is a token, and long words add one per 6 characters
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE.findall(text))
+
+
+class ContextChunk:
+    """A passage with its relevance score and token estimate"""
+    __slots__ = ("text", "score", "tokens", "position")
+
+    def __init__(self, text: str, score: float, position: int, tokens: Optional[int] = None):
+        self.text = text
+        self.score = score
+        self.position = position
+        self.tokens = estimate_tokens(text) if tokens is None else tokens
+
+
+class PackedContext:
+    """Passages chosen for a prompt, in prompt order"""
+    __slots__ = ("passages", "tokens", "budget", "dropped", "duplicates")
+
+    def __init__(self, passages: List[str], tokens: int, budget: int, dropped: int, duplicates: int):
+        self.passages = passages
+        self.tokens = tokens
+        self.budget = budget
+        self.dropped = dropped
+        self.duplicates = duplicates
+
+
+def score_passages(query: str, passages: Sequence[str]) -> List[ContextChunk]:
+    """
+    Relevance of each passage: the share of query words it contains, plus a
+    small prior for retrieval rank so earlier passages win ties
+    """
+    query_words = set(_WORD.findall(query.lower()))
+    chunks = []
+    for position, text in enumerate(passages):
+        words = set(_WORD.findall(text.lower()))
+        overlap = len(query_words & words) / len(query_words) if query_words else 0.0
+        chunks.append(ContextChunk(text, overlap + 0.1 / (1 + position), position))
+    return chunks
+
+
+def _shingles(text: str) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def deduplicate(chunks: List[ContextChunk]) -> List[ContextChunk]:
+    """
+    Drop passages mostly contained in a better one (repeated retrievals,
+    overlapping neighbouring chunks)
+    Shared shingles are counted through a shingle -> kept passages index
+    """
+    kept: List[ContextChunk] = []
+    index: Dict[str, List[int]] = {}
+    for chunk in sorted(chunks, key=lambda c: (-c.score, c.position)):
+        shingles = _shingles(chunk.text)
+        if not shingles:
+            continue
+        shared: Dict[int, int] = {}
+        for shingle in shingles:
+            for other in index.get(shingle, ()):
+                shared[other] = shared.get(other, 0) + 1
+        if any(count >= DUPLICATE_CONTAINMENT * len(shingles) for count in shared.values()):
+            continue
+        for shingle in shingles:
+            index.setdefault(shingle, []).append(len(kept))
+        kept.append(chunk)
+    return kept
+
+
+def _truncate(chunk: ContextChunk, budget: int) -> ContextChunk:
+    """Head of an oversized passage that fits the budget, with its score scaled down"""
+    pieces = []
+    tokens = 0
+    for match in re.finditer(r"\S+\s*", chunk.text):
+        cost = estimate_tokens(match.group())
+        if tokens + cost > budget:
+            break
+        pieces.append(match.group())
+        tokens += cost
+    return ContextChunk("".join(pieces).rstrip(), chunk.score * tokens / max(chunk.tokens, 1), chunk.position, tokens)
+
+
+def knapsack(chunks: List[ContextChunk], budget: int) -> List[ContextChunk]:
+    """Subset with the highest total score whose tokens fit the budget"""
+    if budget <= 0 or not chunks:
+        return []
+    unit = max(1, -(-budget // KNAPSACK_CELLS))
+    capacity = budget // unit
+    weights = [-(-chunk.tokens // unit) for chunk in chunks]
+    best = [0.0] * (capacity + 1)
+    taken = [[False] * (capacity + 1) for _ in chunks]
+    for i, chunk in enumerate(chunks):
+        weight = weights[i]
+        for room in range(capacity, weight - 1, -1):
+            value = best[room - weight] + chunk.score
+            if value > best[room]:
+                best[room] = value
+                taken[i][room] = True
+    chosen = []
+    room = capacity
+    for i in range(len(chunks) - 1, -1, -1):
+        if taken[i][room]:
+            chosen.append(chunks[i])
+            room -= weights[i]
+    return chosen
+
+
+def pack_context(query: str, passages: Sequence[str], budget: int) -> PackedContext:
+    """Choose and order passages for a prompt within budget tokens"""
+    scored = score_passages(query, [p for p in passages if p and p.strip()])
+    candidates = sorted(scored, key=lambda c: (-c.score, c.position))[:MAX_CANDIDATES]
+    chunks = deduplicate(candidates)
+    duplicates = len(candidates) - len(chunks)
+    fitted = [chunk if chunk.tokens <= budget else _truncate(chunk, budget) for chunk in chunks]
+    chosen = knapsack([chunk for chunk in fitted if chunk.tokens > 0], budget)
+    chosen.sort(key=lambda c: (-c.score, c.position))
+    return PackedContext(
+        passages=[chunk.text for chunk in chosen],
+        tokens=sum(chunk.tokens for chunk in chosen),
+        budget=budget,
+        dropped=len(passages) - len(chosen) - duplicates,
+        duplicates=duplicates,
+    )
+
+
+def context_budget(max_tokens: int, prompt_tokens: int) -> int:
+    """Tokens left for context once the prompt and the reply are accounted for"""
+    settings = get_settings()
+    remaining = settings.generation_context_window - max_tokens - prompt_tokens
+    return max(0, min(settings.generation_context_max_tokens, remaining))
+
+
+def render_context(query: str, passages: Optional[Sequence[str]], max_tokens: int, prompt: str) -> str:
+    """
+    The context.tmpl block for a prompt, holding only the passages that fit
+    beside the prompt text and a reply of max_tokens; empty when none fit
+    """
+    if not passages:
+        return ""
+    prompts = get_prompt_registry()
+    overhead = estimate_tokens(prompt) + estimate_tokens(prompts.render("context", passages="")) + len(passages)
+    packed = pack_context(query, passages, context_budget(max_tokens, overhead))
+    if not packed.passages:
+        return ""
+    return prompts.render("context", passages="\n\n".join(f"- {passage}" for passage in packed.passages))
@@ -0,0 +1,265 @@
+"""
+Generation job queue
+Long generations are submitted as jobs and run by a fixed pool of asyncio
+workers started in the app lifespan. Job state and results live in a local
+SQLite file, so finished results survive a restart until they expire; the
+queue writes it from worker threads, never on the event loop
+"""
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from app.config import Settings
+from app.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+JobRunner = Callable[[dict], Awaitable[dict]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+"""
+
+
+class JobQueueError(Exception):
+    """Raised when a job cannot be accepted"""
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+class JobStore:
+    """
+    SQLite-backed job records
+    Finished jobs expire ttl seconds after they finish and are purged lazily
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def create(self, request: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = self.clock()
+        self._execute(
+            "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(request), now, now),
+        )
+        return job_id
+
+    def mark_running(self, job_id: str) -> None:
+        self._execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (self.clock(), job_id))
+
+    def complete(self, job_id: str, result: dict) -> None:
+        self._finish(job_id, "completed", json.dumps(result), None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, "failed", None, error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+        now = self.clock()
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+            (status, result, error, now, now + self.ttl, job_id),
+        )
+
+    def fail_unfinished(self, error: str) -> int:
+        """Fail jobs a previous process left queued or running"""
+        now = self.clock()
+        cursor = self._execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, expires_at = ? "
+            "WHERE status IN ('queued', 'running')",
+            (error, now, now + self.ttl),
+        )
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        return self._execute("DELETE FROM jobs WHERE expires_at <= ?", (self.clock(),)).rowcount
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job record, or None when unknown or expired"""
+        row = self._execute(
+            "SELECT id, status, result, error, created_at, updated_at, expires_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or (row[6] is not None and row[6] <= self.clock()):
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] is not None else None,
+            "error": row[3],
+            "created_at": _timestamp(row[4]),
+            "updated_at": _timestamp(row[5]),
+            "expires_at": _timestamp(row[6]),
+        }
+
+
+class GenerationJobQueue:
+    """
+    Bounded queue drained by a fixed number of worker tasks
+    The queue only holds job ids and requests; records stay in the JobStore
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int = 4, max_queued: int = 1000):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.busy = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._submitting = 0  # Submissions whose record is still being written
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(self.max_queued)
+        self._tasks = [asyncio.create_task(self._work(), name=f"generation-job-worker-{n}") for n in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued and running jobs are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job_id, _ = self._queue.get_nowait()
+            self.store.fail(job_id, "Service shut down before the job ran")
+
+    async def submit(self, request: dict) -> str:
+        """Record a job and queue it; raises JobQueueError when stopped or full"""
+        if not self.running:
+            raise JobQueueError("Generation workers are not running")
+        if self._queue.qsize() + self._submitting >= self.max_queued:
+            raise JobQueueError(f"Generation queue is full ({self.max_queued} jobs waiting)")
+        self._submitting += 1
+        try:
+            job_id = await asyncio.to_thread(self._record, request)
+        finally:
+            self._submitting -= 1
+        if not self.running:
+            await asyncio.to_thread(self.store.fail, job_id, "Service shut down before the job ran")
+            raise JobQueueError("Generation workers are not running")
+        self._queue.put_nowait((job_id, request))
+        self.submitted += 1
+        return job_id
+
+    def _record(self, request: dict) -> str:
+        self.store.purge_expired()
+        return self.store.create(request)
+
+    async def _work(self) -> None:
+        while True:
+            job_id, request = await self._queue.get()
+            self.busy += 1
+            try:
+                await asyncio.to_thread(self.store.mark_running, job_id)
+                result = await self.runner(request)
+            except asyncio.CancelledError:
+                # Written in place: the workers are stopping and may not get to await again
+                self.store.fail(job_id, "Service shut down while the job was running")
+                raise
+            except Exception as exc:
+                logger.exception(f"Generation job {job_id} failed")
+                await asyncio.to_thread(self.store.fail, job_id, str(exc) or exc.__class__.__name__)
+                self.failed += 1
+            else:
+                await asyncio.to_thread(self.store.complete, job_id, result)
+                self.completed += 1
+            finally:
+                self.busy -= 1
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        workers = len(self._tasks)
+        return {
+            "running": self.running,
+            "workers": workers,
+            "busy_workers": self.busy,
+            "utilization": round(self.busy / workers, 4) if workers else 0.0,
+            "queue_depth": self.depth,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+_queue: Optional[GenerationJobQueue] = None
+
+
+def get_job_queue() -> Optional[GenerationJobQueue]:
+    """Queue started by the lifespan; None before startup"""
+    return _queue
+
+
+async def start_job_queue(settings: Settings, runner: JobRunner) -> GenerationJobQueue:
+    """Open the result store and start the workers"""
+    global _queue
+    path = settings.generation_jobs_path or os.path.join(tempfile.mkdtemp(prefix="generation-jobs-"), "jobs.sqlite3")
+    store = JobStore(path, settings.generation_job_ttl)
+    interrupted = store.fail_unfinished("Interrupted by a restart")
+    if interrupted:
+        logger.warning(f"Marked {interrupted} unfinished generation jobs as failed")
+    _queue = GenerationJobQueue(store, runner, settings.generation_job_workers, settings.generation_job_queue_size)
+    _queue.start()
+    logger.info(f"Generation job queue ready: {settings.generation_job_workers} workers, results in {path}")
+    return _queue
+
+
+async def stop_job_queue() -> None:
+    """Stop the workers and close the result store"""
+    global _queue
+    queue, _queue = _queue, None
+    if queue is not None:
+        await queue.stop()
+        queue.store.close()
+
+
+def _queue_stats() -> dict:
+    return _queue.stats() if _queue is not None else {"running": False}
+
+
+register_metrics("generation_jobs", _queue_stats)
@@ -1 +1,120 @@
-# Placeholder for lab code generator
+"""
+Lab code generator
+Asks the LLM provider for a runnable, commented lab solution, using the
+lab_code/ prompt templates, and strips Markdown fences from the reply
+"""
+from typing import AsyncIterator, List, Optional
+import re
+
+from app.generation.context import render_context
+from app.generation.provider import LLMProvider
+from app.generation.templates import get_prompt_registry
+
+
+# A block cut off by max_tokens has no closing fence; its code runs to the end of the reply
+_FENCE = re.compile(r"```[\w+#-]*\n(.*?)(?:```|\Z)", re.DOTALL)
+_OPENING_FENCE = re.compile(r"```[\w+#-]*\n")
+
+
+def build_messages(
+    task: str,
+    language: str = "python",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> List[dict]:
+    """Chat messages asking for a lab solution in one language, with as much context as fits"""
+    prompts = get_prompt_registry()
+    system = prompts.render("lab_code/system")
+    instruction = prompts.render("lab_code/task", language=language, task=task)
+    instruction += render_context(task, context, max_tokens, system + instruction)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": instruction},
+    ]
+
+
+def extract_code(text: str) -> str:
+    """The first fenced code block of a reply, or the whole reply when it has none"""
+    match = _FENCE.search(text)
+    return (match.group(1) if match else text).strip() + "\n"
+
+
+class CodeExtractor:
+    """
+    extract_code applied to a reply as it streams
+    feed() takes each delta and returns the code it completes; finish()
+    returns the rest. Text before the first fence is held back until the
+    fence opens, so a reply without one is only released by finish()
+    """
+
+    def __init__(self):
+        self._before = ""
+        self._inside = None  # Unsent text of the open block; None until it opens
+        self._held = ""  # Trailing whitespace, sent only if more code follows
+        self._started = False
+        self._closed = False
+
+    def feed(self, delta: str) -> str:
+        if self._closed:
+            return ""
+        if self._inside is None:
+            self._before += delta
+            match = _OPENING_FENCE.search(self._before)
+            if match is None:
+                return ""
+            self._inside, self._before = self._before[match.end():], ""
+        else:
+            self._inside += delta
+        end = self._inside.find("```")
+        if end >= 0:
+            self._closed = True
+            code, self._inside = self._inside[:end], ""
+        else:
+            # Keep back trailing backticks that may start the closing fence
+            keep = len(self._inside) - len(self._inside.rstrip("`"))
+            code, self._inside = self._inside[:len(self._inside) - keep], self._inside[len(self._inside) - keep:]
+        return self._code(code)
+
+    def _code(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._held + text
+        code = text.rstrip()
+        self._held = text[len(code):]
+        return code
+
+    def finish(self) -> str:
+        if self._inside is None:
+            return self._before.strip() + "\n"
+        return self._code(self._inside) + "\n"
+
+
+async def generate_lab_code(
+    provider: LLMProvider,
+    task: str,
+    language: str = "python",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> str:
+    """Generate lab code with the provider"""
+    completion = await provider.complete(build_messages(task, language, context, max_tokens), max_tokens=max_tokens)
+    return extract_code(completion.text)
+
+
+async def stream_lab_code(
+    provider: LLMProvider,
+    task: str,
+    language: str = "python",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> AsyncIterator[str]:
+    """Stream the code of the reply as it is generated, without the fences or prose around it"""
+    extractor = CodeExtractor()
+    async for delta in provider.stream(build_messages(task, language, context, max_tokens), max_tokens=max_tokens):
+        code = extractor.feed(delta)
+        if code:
+            yield code
+    yield extractor.finish()
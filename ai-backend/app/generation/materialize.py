@@ -0,0 +1,173 @@
+"""
+Offline materialization
+Pre-generates notes, summaries, slides and code for every syllabus topic
+(chat knowledge-base topics, material titles and the suggestion lists) into
+the artifact store, so POST /generate serves them from disk. Topics are
+split across a process pool; each process runs its share concurrently over
+its own provider client. Already materialized requests are skipped unless
+--force is given
+
+Run with: python -m app.generation.materialize [--store DIR] [--workers N]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+
+from app.api.chat import CHAT_SUGGESTIONS, TOPIC_RESPONSES
+from app.api.generate import GenerateRequest, GenerateType, cache_bucket, request_subject
+from app.api.search import MOCK_MATERIALS, SEARCH_SUGGESTIONS
+from app.config import Settings, get_settings
+from app.generation.artifacts import ArtifactStore
+from app.generation.cache import normalize_prompt
+from app.generation.lab_code_generator import generate_lab_code
+from app.generation.provider import ProviderError, create_provider
+from app.generation.theory_generator import generate_theory
+
+
+CONTENT_TYPES = (GenerateType.NOTES, GenerateType.SUMMARY, GenerateType.SLIDES, GenerateType.CODE)
+
+# (topic, content type) pairs handed to the workers
+Job = Tuple[str, str]
+
+
+def syllabus_topics() -> List[str]:
+    """Every syllabus topic once, in source order; prompts that normalize alike count as one"""
+    candidates = list(TOPIC_RESPONSES) + [material["title"] for material in MOCK_MATERIALS]
+    candidates += SEARCH_SUGGESTIONS + CHAT_SUGGESTIONS
+    topics: Dict[str, str] = {}
+    for topic in candidates:
+        topics.setdefault(normalize_prompt(topic), topic)
+    return list(topics.values())
+
+
+def plan_jobs(
+    store: ArtifactStore,
+    topics: Sequence[str],
+    types: Sequence[GenerateType] = CONTENT_TYPES,
+    language: str = "python",
+    force: bool = False,
+) -> Tuple[List[Job], int]:
+    """Jobs still to generate, and how many were skipped as already materialized"""
+    jobs: List[Job] = []
+    skipped = 0
+    for topic in topics:
+        for content_type in types:
+            request = GenerateRequest(type=content_type, prompt=topic, language=language)
+            if not force and store.has(cache_bucket(request), request_subject(request)):
+                skipped += 1
+            else:
+                jobs.append((topic, content_type.value))
+    return jobs, skipped
+
+
+async def _generate_jobs(settings: Settings, root: str, jobs: List[Job], language: str, concurrency: int) -> List[dict]:
+    provider = create_provider(settings)
+    if provider is None:
+        raise RuntimeError("No LLM provider configured")
+    store = ArtifactStore(root)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(topic: str, content_type: str) -> dict:
+        request = GenerateRequest(type=content_type, prompt=topic, language=language)
+        subject = request_subject(request)
+        outcome = {"topic": topic, "type": content_type}
+        async with semaphore:
+            try:
+                if request.type == GenerateType.CODE:
+                    content = await generate_lab_code(provider, subject, language)
+                else:
+                    content = await generate_theory(provider, subject, content_type)
+            except ProviderError as exc:
+                return {**outcome, "status": "error", "error": str(exc)}
+        return {**outcome, "status": "ok", "digest": store.put(cache_bucket(request), subject, content)}
+
+    try:
+        return await asyncio.gather(*(one(topic, content_type) for topic, content_type in jobs))
+    finally:
+        await provider.close()
+
+
+def materialize_chunk(settings: Settings, root: str, jobs: List[Job], language: str, concurrency: int) -> List[dict]:
+    """Generate and store one worker's share of jobs"""
+    return asyncio.run(_generate_jobs(settings, root, jobs, language, concurrency))
+
+
+def materialize(
+    root: str,
+    topics: Optional[Sequence[str]] = None,
+    types: Sequence[GenerateType] = CONTENT_TYPES,
+    settings: Optional[Settings] = None,
+    workers: Optional[int] = None,
+    concurrency: int = 4,
+    language: str = "python",
+    force: bool = False,
+) -> dict:
+    """Materialize every topic and type into the store at root; returns a summary"""
+    settings = settings or get_settings()
+    workers = max(1, workers or settings.generation_materialize_workers)
+    store = ArtifactStore(root)
+    jobs, skipped = plan_jobs(store, syllabus_topics() if topics is None else topics, types, language, force)
+    started = time.perf_counter()
+    results: List[dict] = []
+    if jobs:
+        chunks = [chunk for chunk in (jobs[n::workers] for n in range(workers)) if chunk]
+        # spawn, so workers never inherit the parent's threads or event loop
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(chunks), mp_context=context) as pool:
+            futures = [pool.submit(materialize_chunk, settings, root, chunk, language, concurrency) for chunk in chunks]
+            for future in futures:
+                results.extend(future.result())
+    failures = [result for result in results if result["status"] != "ok"]
+    return {
+        "store": root,
+        "jobs": len(jobs) + skipped,
+        "skipped": skipped,
+        "generated": len(results) - len(failures),
+        "failed": len(failures),
+        "errors": failures,
+        "objects": len({result["digest"] for result in results if "digest" in result}),
+        "workers": min(workers, len(jobs)),
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Materialize the syllabus; exits non-zero when nothing can be generated or jobs failed"""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Pre-generate content for every syllabus topic")
+    parser.add_argument("--store", default=settings.generation_artifacts_path, help="Artifact directory (GENERATION_ARTIFACTS_PATH)")
+    parser.add_argument("--workers", type=int, default=settings.generation_materialize_workers, help="Worker processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="Provider calls in flight per worker")
+    parser.add_argument("--types", nargs="+", choices=[t.value for t in CONTENT_TYPES], default=[t.value for t in CONTENT_TYPES])
+    parser.add_argument("--language", default="python", help="Language of generated code")
+    parser.add_argument("--topic", action="append", dest="topics", help="Only this topic (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Regenerate already materialized content")
+    args = parser.parse_args(argv)
+
+    if not args.store:
+        parser.error("set GENERATION_ARTIFACTS_PATH or pass --store")
+    if not settings.llm_base_url and not settings.openai_api_key:
+        print("No LLM provider configured; set OPENAI_API_KEY or LLM_BASE_URL", file=sys.stderr)
+        return 2
+
+    summary = materialize(
+        args.store,
+        topics=args.topics,
+        types=[GenerateType(t) for t in args.types],
+        settings=settings,
+        workers=args.workers,
+        concurrency=args.concurrency,
+        language=args.language,
+        force=args.force,
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Outline-first documents
+Notes and slide decks can be requested as an outline of section titles; each
+section is generated the first time it is opened and kept with its document,
+so sections nobody reads never cost a provider call. Documents live in an
+LRU store keyed by a doc id derived from the request
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import re
+
+from app.config import get_settings
+from app.metrics import register_metrics
+
+
+# Bullets, numbering, Markdown headings and "Slide N:" prefixes in front of an outline title
+_TITLE_PREFIX = re.compile(r"^\s*(?:(?:[-*•#]+|\d+[.)]|slide\s+\d+\s*[:.-])\s*)+", re.IGNORECASE)
+# Slide separators, or the start of a level-2 heading
+_SECTION_BREAK = re.compile(r"\n-{3,}\n|\n(?=## )")
+_SECTION_HEADING = re.compile(r"##\s+(?:Slide\s+\d+:\s*)?(.+)")
+
+
+def parse_outline(text: str, max_sections: int) -> List[str]:
+    """Section titles from an outline reply, without numbering or duplicates"""
+    titles: List[str] = []
+    for line in text.splitlines():
+        title = _TITLE_PREFIX.sub("", line).strip().strip("*").strip()
+        if title and title not in titles:
+            titles.append(title)
+    return titles[:max_sections]
+
+
+def split_sections(content: str) -> List[Tuple[str, str]]:
+    """
+    (title, markdown) per section of a finished document
+    Text before the first heading (a document title) is kept with the first section
+    """
+    sections: List[Tuple[str, str]] = []
+    preamble = ""
+    for part in (part.strip() for part in _SECTION_BREAK.split(content)):
+        if not part:
+            continue
+        match = _SECTION_HEADING.match(part)
+        if match is None:
+            if sections:
+                title, text = sections[-1]
+                sections[-1] = (title, f"{text}\n\n{part}")
+            else:
+                preamble += f"{part}\n\n"
+            continue
+        sections.append((match.group(1).strip(), preamble + part))
+        preamble = ""
+    return sections
+
+
+class OutlineDocument:
+    """A document's section titles and whichever sections have been generated"""
+    __slots__ = ("doc_id", "type", "topic", "titles", "sections", "source")
+
+    def __init__(self, doc_id: str, type: str, topic: str, titles: List[str], source: str):
+        self.doc_id = doc_id
+        self.type = type
+        self.topic = topic
+        self.titles = titles
+        self.sections: Dict[int, str] = {}
+        self.source = source
+
+
+class OutlineStore:
+    """LRU store of outline documents, counting sections outlined versus generated"""
+
+    def __init__(self, max_documents: int = 1000):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, OutlineDocument]" = OrderedDict()
+        self.outlines = 0
+        self.sections_outlined = 0
+        self.sections_generated = 0
+        self.section_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def get(self, doc_id: str) -> Optional[OutlineDocument]:
+        document = self._documents.get(doc_id)
+        if document is not None:
+            self._documents.move_to_end(doc_id)
+        return document
+
+    def add(self, document: OutlineDocument) -> None:
+        self._documents[document.doc_id] = document
+        self._documents.move_to_end(document.doc_id)
+        self.outlines += 1
+        self.sections_outlined += len(document.titles)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+            self.evictions += 1
+
+    def section(self, document: OutlineDocument, number: int) -> Optional[str]:
+        """A section already produced for the document, or None"""
+        content = document.sections.get(number)
+        if content is not None:
+            self.section_hits += 1
+        return content
+
+    def set_section(self, document: OutlineDocument, number: int, content: str) -> None:
+        document.sections[number] = content
+        self.sections_generated += 1
+
+    def clear(self) -> None:
+        self._documents.clear()
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._documents),
+            "outlines": self.outlines,
+            "sections_outlined": self.sections_outlined,
+            "sections_generated": self.sections_generated,
+            "section_hits": self.section_hits,
+            "evictions": self.evictions,
+        }
+
+
+@lru_cache()
+def get_outline_store() -> OutlineStore:
+    """Get the process-wide outline store"""
+    return OutlineStore(max_documents=get_settings().generation_outline_max_documents)
+
+
+register_metrics("generation_outlines", lambda: get_outline_store().stats())
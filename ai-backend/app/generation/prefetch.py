@@ -0,0 +1,152 @@
+"""
+Speculative prefetch
+Background tasks that warm caches for requests a user is likely to make
+next. Prefetching only uses spare capacity: it has a global budget of
+concurrent tasks and tasks per minute, and everything in flight is
+cancelled as soon as foreground load reaches the threshold. Prefetch work
+runs with speculative() true, so shared computations it started are
+cancelled with it rather than left running on the provider
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Iterator, Optional, Set
+import asyncio
+import logging
+import time
+
+from app.config import get_settings
+from app.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Set inside prefetch tasks (each task runs in its own copy of the context)
+_speculative: ContextVar[bool] = ContextVar("speculative", default=False)
+
+
+def speculative() -> bool:
+    """Whether the running code is a prefetch rather than a user request"""
+    return _speculative.get()
+
+
+class Prefetcher:
+    """
+    Budgeted pool of low-priority tasks keyed so the same prediction is never
+    in flight twice
+    """
+
+    def __init__(
+        self,
+        max_tasks: int = 4,
+        per_minute: int = 30,
+        load_threshold: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_tasks = max_tasks
+        self.per_minute = per_minute
+        self.load_threshold = load_threshold
+        self.clock = clock
+        self.foreground = 0
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self._cancelling: Set[Hashable] = set()
+        self._started: Deque[float] = deque()
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.skipped_budget = 0
+        self.skipped_load = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Tasks still running, including cancelled ones whose work is still unwinding"""
+        return len(self._tasks)
+
+    @contextmanager
+    def foreground_request(self) -> Iterator[None]:
+        """Count a user-facing request; reaching the load threshold cancels all prefetching"""
+        self.foreground += 1
+        if self.foreground >= self.load_threshold:
+            self.cancel_all()
+        try:
+            yield
+        finally:
+            self.foreground -= 1
+
+    def schedule(self, key: Hashable, produce: Callable[[], Awaitable[object]]) -> bool:
+        """Start produce() in the background if the budget and load allow; True when scheduled"""
+        for stale in [k for k, task in self._tasks.items() if task.get_loop().is_closed()]:
+            del self._tasks[stale]
+            self._cancelling.discard(stale)
+        if key in self._tasks:
+            return False
+        if self.foreground >= self.load_threshold:
+            self.skipped_load += 1
+            return False
+        now = self.clock()
+        while self._started and now - self._started[0] >= 60.0:
+            self._started.popleft()
+        if self.in_flight >= self.max_tasks or len(self._started) >= self.per_minute:
+            self.skipped_budget += 1
+            return False
+        self._started.append(now)
+        self._tasks[key] = asyncio.get_running_loop().create_task(self._run(key, produce))
+        self.scheduled += 1
+        return True
+
+    async def _run(self, key: Hashable, produce: Callable[[], Awaitable[object]]) -> None:
+        _speculative.set(True)
+        try:
+            await asyncio.sleep(0)  # Let the response that triggered the prefetch go out first
+            await produce()
+            self.completed += 1
+        except Exception as exc:
+            logger.debug(f"Prefetch {key!r} failed: {exc!r}")
+            self.failed += 1
+        finally:
+            # The budget is released only here, once the work (and its cancellation) has finished
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+                self._cancelling.discard(key)
+
+    def cancel_all(self) -> int:
+        """Cancel every prefetch in flight; each keeps its budget slot until it has stopped"""
+        keys = [key for key, task in self._tasks.items() if key not in self._cancelling and not task.done()]
+        for key in keys:
+            self._tasks[key].cancel()
+            self._cancelling.add(key)
+        self.cancelled += len(keys)
+        return len(keys)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "foreground": self.foreground,
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "skipped_budget": self.skipped_budget,
+            "skipped_load": self.skipped_load,
+        }
+
+
+@lru_cache()
+def get_prefetcher() -> Prefetcher:
+    """Get the process-wide prefetcher"""
+    settings = get_settings()
+    return Prefetcher(
+        max_tasks=settings.chat_prefetch_max_tasks,
+        per_minute=settings.chat_prefetch_per_minute,
+        load_threshold=settings.chat_prefetch_load_threshold,
+    )
+
+
+def active_prefetcher() -> Optional[Prefetcher]:
+    """The process-wide prefetcher, or None when prefetching is off"""
+    return get_prefetcher() if get_settings().chat_prefetch_enabled else None
+
+
+register_metrics("chat_prefetch", lambda: get_prefetcher().stats())
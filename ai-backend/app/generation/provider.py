@@ -0,0 +1,178 @@
+"""
+LLM provider client
+Talks to an OpenAI-compatible chat completions API over one long-lived,
+connection-pooled httpx.AsyncClient that is opened in the app lifespan and
+closed at shutdown
+"""
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+import importlib.util
+import json
+import logging
+import time
+
+import httpx
+
+from app.config import Settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class ProviderError(Exception):
+    """Raised when the provider cannot produce a completion"""
+
+
+class Completion:
+    """Text returned by a provider plus usage and timing"""
+    __slots__ = ("text", "model", "prompt_tokens", "completion_tokens", "latency_ms")
+
+    def __init__(self, text: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0, latency_ms: float = 0.0):
+        self.text = text
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.latency_ms = latency_ms
+
+    def __repr__(self) -> str:
+        return f"Completion(model={self.model!r}, tokens={self.completion_tokens}, latency_ms={self.latency_ms:.1f})"
+
+
+class LLMProvider(ABC):
+    """Interface implemented by every provider"""
+    name = "base"
+    model = ""
+
+    @abstractmethod
+    async def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> Completion:
+        """One completion for the chat messages"""
+
+    @abstractmethod
+    def stream(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> AsyncIterator[str]:
+        """Text deltas as the provider produces them"""
+
+    async def close(self) -> None:
+        """Release pooled connections"""
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Provider for any server implementing POST /chat/completions"""
+    name = "openai"
+
+    def __init__(self, client: httpx.AsyncClient, model: str):
+        self.client = client
+        self.model = model
+
+    async def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> Completion:
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        started = time.perf_counter()
+        try:
+            response = await self.client.post("/chat/completions", json=payload)
+            response.raise_for_status()
+            data = response.json()
+            text = data["choices"][0]["message"]["content"]
+        except httpx.HTTPStatusError as exc:
+            raise ProviderError(f"Provider returned HTTP {exc.response.status_code}") from exc
+        except httpx.HTTPError as exc:
+            raise ProviderError(f"Provider request failed: {exc!r}") from exc
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            raise ProviderError("Malformed completion response") from exc
+        usage = data.get("usage") or {}
+        return Completion(
+            text=text or "",
+            model=data.get("model", self.model),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    async def stream(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> AsyncIterator[str]:
+        """Read a "stream": true completion and yield each content delta"""
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature, "stream": True}
+        try:
+            async with self.client.stream("POST", "/chat/completions", json=payload) as response:
+                if response.status_code >= 400:
+                    raise ProviderError(f"Provider returned HTTP {response.status_code}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as exc:
+            raise ProviderError(f"Provider request failed: {exc!r}") from exc
+        except (KeyError, IndexError, TypeError, ValueError) as exc:
+            raise ProviderError("Malformed completion stream") from exc
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def http2_available() -> bool:
+    """Whether the optional h2 package needed for HTTP/2 is installed"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(settings: Settings, base_url: str, api_key: Optional[str] = None) -> httpx.AsyncClient:
+    """Build the pooled client; HTTP/2 is used when enabled and h2 is installed"""
+    http2 = settings.llm_http2 and http2_available()
+    if settings.llm_http2 and not http2:
+        logger.warning("h2 is not installed; LLM client falls back to HTTP/1.1 keep-alive")
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        http2=http2,
+        timeout=httpx.Timeout(settings.llm_timeout, connect=settings.llm_connect_timeout),
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        ),
+    )
+
+
+def create_provider(settings: Settings) -> Optional[LLMProvider]:
+    """Provider described by the settings, with hedging and circuit breaking; None when no LLM is configured"""
+    if not settings.llm_base_url and not settings.openai_api_key:
+        return None
+    from app.generation.resilience import wrap_provider  # resilience.py builds on this module
+
+    base_url = settings.llm_base_url or DEFAULT_BASE_URL
+    client = create_http_client(settings, base_url, settings.openai_api_key)
+    return wrap_provider(OpenAICompatibleProvider(client, settings.llm_model), settings)
+
+
+_provider: Optional[LLMProvider] = None
+
+
+def get_provider() -> Optional[LLMProvider]:
+    """Provider opened by the lifespan; None means routers fall back to templates"""
+    return _provider
+
+
+def set_provider(provider: Optional[LLMProvider]) -> None:
+    global _provider
+    _provider = provider
+
+
+async def open_provider(settings: Settings) -> Optional[LLMProvider]:
+    """Create the process-wide provider at startup"""
+    provider = create_provider(settings)
+    set_provider(provider)
+    if provider is not None:
+        logger.info(f"LLM provider ready: {provider.name} ({provider.model})")
+    return provider
+
+
+async def close_provider() -> None:
+    """Close the process-wide provider at shutdown"""
+    provider = get_provider()
+    set_provider(None)
+    if provider is not None:
+        await provider.close()
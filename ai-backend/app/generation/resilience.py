@@ -0,0 +1,265 @@
+"""
+Provider resilience
+A wrapper around an LLM provider adding hedged requests and a circuit
+breaker. A hedge is a duplicate call fired when the first has taken longer
+than a recent latency percentile; whichever answers first wins and the other
+is cancelled. The breaker sees one outcome per call, however many attempts
+it took, and opens when the recent error rate spikes, so callers fail fast
+to their cached or template fallback instead of waiting on a failing provider
+"""
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional
+import asyncio
+import logging
+import time
+
+from app.config import Settings
+from app.generation.provider import Completion, LLMProvider, ProviderError, get_provider
+from app.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Latency samples needed before hedging starts, and how many are kept
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+
+class CircuitOpenError(ProviderError):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when at least min_requests of the last window outcomes
+    include failure_rate failures; open -> half-open after cooldown seconds,
+    where a single probe call decides between closed and open again
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_requests: int = 20,
+        window: int = 50,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = "closed"
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; counts rejections"""
+        if self.state == "open" and self.clock() - self._opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        # A probe that never reported back (e.g. cancelled before it ran) is replaced after a cooldown
+        if self.state == "half_open" and (not self._probing or self.clock() - self._probe_started >= self.cooldown):
+            self._probing = True
+            self._probe_started = self.clock()
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """A call allowed through was abandoned without an outcome"""
+        self._probing = False
+
+    def record(self, success: bool) -> None:
+        if self.state == "half_open":
+            self._probing = False
+            if success:
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == "closed"
+            and len(self._outcomes) >= self.min_requests
+            and failures >= self.failure_rate * len(self._outcomes)
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self._opened_at = self.clock()
+        self.opened += 1
+        logger.warning(f"LLM provider circuit opened for {self.cooldown:.0f}s")
+
+    def stats(self) -> dict:
+        outcomes = len(self._outcomes)
+        return {
+            "state": self.state,
+            "error_rate": round(self._outcomes.count(False) / outcomes, 4) if outcomes else 0.0,
+            "window": outcomes,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class ResilientProvider(LLMProvider):
+    """Provider wrapper with optional hedging and an optional circuit breaker"""
+
+    def __init__(
+        self,
+        inner: LLMProvider,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        hedge_max_rate: float = 0.1,
+    ):
+        self.inner = inner
+        self.name = inner.name
+        self.model = inner.model
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_rate = hedge_max_rate
+        self._latencies: Deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def __getattr__(self, name: str):
+        # Anything provider-specific (e.g. the pooled client) comes from the wrapped provider
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when a hedge is not allowed"""
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        if self.breaker is not None and self.breaker.state != "closed":
+            return None
+        if self.hedged >= self.hedge_max_rate * self.requests:
+            return None
+        ordered = sorted(self._latencies)
+        percentile = ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+        return max(self.hedge_min_delay, percentile)
+
+    def _check_circuit(self) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for provider {self.name}")
+
+    def _record(self, success: Optional[bool]) -> None:
+        """Report a call's outcome to the breaker; None when it was cancelled"""
+        if self.breaker is None:
+            return
+        if success is None:
+            self.breaker.release()
+        else:
+            self.breaker.record(success)
+
+    async def _attempt(self, messages: List[dict], max_tokens: int, temperature: float) -> Completion:
+        started = time.perf_counter()
+        completion = await self.inner.complete(messages, max_tokens, temperature)
+        self._latencies.append(time.perf_counter() - started)
+        return completion
+
+    async def complete(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> Completion:
+        self._check_circuit()
+        self.requests += 1
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._attempt(messages, max_tokens, temperature))
+        pending = {primary}
+        # A hedged call is one outcome: it succeeds if any attempt does and fails only if every attempt failed
+        success = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                # Checked again here since concurrent calls may have used up the hedge budget meanwhile
+                if not done and self.hedged < self.hedge_max_rate * self.requests:
+                    self.hedged += 1
+                    pending.add(asyncio.ensure_future(self._attempt(messages, max_tokens, temperature)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        success = True
+                        return task.result()
+                    if error is None or isinstance(task.exception(), ProviderError):
+                        error = task.exception()
+            if isinstance(error, ProviderError):
+                success = False
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            self._record(success)
+
+    async def stream(self, messages: List[dict], max_tokens: int = 1000, temperature: float = 0.3) -> AsyncIterator[str]:
+        """Streams are not hedged, but their outcome counts towards the breaker"""
+        self._check_circuit()
+        success = None
+        try:
+            async for delta in self.inner.stream(messages, max_tokens, temperature):
+                yield delta
+            success = True
+        except ProviderError:
+            success = False
+            raise
+        finally:
+            self._record(success)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        return {
+            "provider": self.name,
+            "breaker": self.breaker.stats() if self.breaker is not None else None,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+        }
+
+
+def wrap_provider(provider: LLMProvider, settings: Settings) -> LLMProvider:
+    """Add the hedging and circuit breaking enabled in the settings"""
+    if not settings.llm_hedge_enabled and not settings.llm_breaker_enabled:
+        return provider
+    breaker = None
+    if settings.llm_breaker_enabled:
+        breaker = CircuitBreaker(
+            failure_rate=settings.llm_breaker_failure_rate,
+            min_requests=settings.llm_breaker_min_requests,
+            window=settings.llm_breaker_window,
+            cooldown=settings.llm_breaker_cooldown,
+        )
+    return ResilientProvider(
+        provider,
+        breaker=breaker,
+        hedge=settings.llm_hedge_enabled,
+        hedge_percentile=settings.llm_hedge_percentile,
+        hedge_min_delay=settings.llm_hedge_min_delay,
+        hedge_max_rate=settings.llm_hedge_max_rate,
+    )
+
+
+def _resilience_metrics() -> dict:
+    provider = get_provider()
+    return provider.stats() if isinstance(provider, ResilientProvider) else {"enabled": False}
+
+
+register_metrics("llm_resilience", _resilience_metrics)
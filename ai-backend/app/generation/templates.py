@@ -0,0 +1,165 @@
+"""
+Prompt template engine
+Templates are files under app/generation/prompts with {{ name }} placeholders.
+Each file is read and compiled once into static text and dynamic slots;
+changed files are recompiled when their mtime moves, without a restart
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
+import logging
+import os
+import re
+import threading
+import time
+
+from app.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+TEMPLATE_SUFFIX = ".tmpl"
+
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+_NAME = re.compile(r"[A-Za-z0-9_]+(/[A-Za-z0-9_]+)*")
+
+
+class TemplateError(Exception):
+    """Raised for unknown templates and missing template variables"""
+
+
+class CompiledTemplate:
+    """
+    A template split into static segments and variable slots
+    Rendering copies the precomputed parts list, fills the slots and joins it
+    """
+    __slots__ = ("name", "mtime", "_parts", "_slots", "variables")
+
+    def __init__(self, name: str, source: str, mtime: float = 0.0):
+        self.name = name
+        self.mtime = mtime
+        parts: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            if match.start() > position:
+                parts.append(source[position:match.start()])
+            slots.append((len(parts), match.group(1)))
+            parts.append("")
+            position = match.end()
+        if position < len(source):
+            parts.append(source[position:])
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.variables = frozenset(name for _, name in slots)
+
+    @property
+    def static_length(self) -> int:
+        """Characters of text that never change between renders"""
+        return sum(len(part) for part in self._parts)
+
+    def render(self, **values: str) -> str:
+        """Fill every placeholder; values are converted with str()"""
+        if not self._slots:
+            return self._parts[0] if self._parts else ""
+        parts = self._parts.copy()
+        try:
+            for slot, name in self._slots:
+                parts[slot] = str(values[name])
+        except KeyError as exc:
+            raise TemplateError(f"Template '{self.name}' needs variable {exc.args[0]!r}") from None
+        return "".join(parts)
+
+
+class PromptRegistry:
+    """
+    Compiled templates keyed by path relative to the prompts directory,
+    without the suffix (e.g. "generate/notes")
+    A template's file is stat-ed at most once per reload_interval seconds;
+    a negative interval turns hot reload off
+    """
+
+    def __init__(self, directory: Path = PROMPTS_DIR, reload_interval: float = 1.0):
+        self.directory = Path(directory)
+        self.reload_interval = reload_interval
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.reloads = 0
+        self.load_all()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}{TEMPLATE_SUFFIX}"
+
+    def load_all(self) -> None:
+        """Compile every template file under the directory"""
+        for path in sorted(self.directory.rglob(f"*{TEMPLATE_SUFFIX}")):
+            name = path.relative_to(self.directory).with_suffix("").as_posix()
+            self._load(name, path)
+
+    def _load(self, name: str, path: Path) -> CompiledTemplate:
+        mtime = os.stat(path).st_mtime
+        template = CompiledTemplate(name, path.read_text(encoding="utf-8"), mtime)
+        self._templates[name] = template
+        self._checked[name] = time.monotonic()
+        self.loads += 1
+        return template
+
+    def get(self, name: str) -> CompiledTemplate:
+        """Compiled template, recompiled first if its file changed"""
+        template = self._templates.get(name)
+        if template is None:
+            path = self._path(name) if _NAME.fullmatch(name) else None
+            if path is None or not path.is_file():
+                raise TemplateError(f"Unknown prompt template '{name}'")
+            with self._lock:
+                return self._load(name, path)
+        if self.reload_interval >= 0:
+            now = time.monotonic()
+            if now - self._checked.get(name, 0.0) >= self.reload_interval:
+                self._checked[name] = now
+                template = self._reload_if_changed(name, template)
+        return template
+
+    def _reload_if_changed(self, name: str, template: CompiledTemplate) -> CompiledTemplate:
+        path = self._path(name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return template  # Keep serving the last good version
+        if mtime == template.mtime:
+            return template
+        with self._lock:
+            try:
+                template = self._load(name, path)
+            except (OSError, UnicodeDecodeError) as exc:
+                logger.warning(f"Keeping previous version of prompt '{name}': {exc}")
+                return template
+        self.reloads += 1
+        logger.info(f"Reloaded prompt template '{name}'")
+        return template
+
+    def render(self, name: str, /, **values: str) -> str:
+        """Render a template by name"""
+        return self.get(name).render(**values)
+
+    def has(self, name: str) -> bool:
+        """Whether a template with this name has been loaded"""
+        return name in self._templates
+
+    def names(self) -> List[str]:
+        return sorted(self._templates)
+
+
+@lru_cache()
+def get_prompt_registry() -> PromptRegistry:
+    """Get the process-wide prompt registry"""
+    return PromptRegistry(PROMPTS_DIR, get_settings().prompt_reload_interval)
+
+
+def render_prompt(name: str, /, **values: str) -> str:
+    """Render a template from the process-wide registry"""
+    return get_prompt_registry().render(name, **values)
+
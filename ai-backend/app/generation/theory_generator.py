@@ -1 +1,93 @@
-# Placeholder for theory content generator
+"""
+Theory content generator
+Builds chat prompts for theory sections, notes, slides, summaries and
+explanations from the theory/ prompt templates and sends them to the LLM provider
+"""
+from typing import AsyncIterator, List, Optional
+
+from app.generation.context import render_context
+from app.generation.provider import LLMProvider
+from app.generation.templates import get_prompt_registry
+
+
+STYLES = ("theory", "notes", "slides", "summary", "explanation")
+
+
+def build_messages(
+    topic: str,
+    style: str = "theory",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> List[dict]:
+    """Chat messages asking for one style of theory content, with as much context as fits"""
+    prompts = get_prompt_registry()
+    system = prompts.render("theory/system")
+    instruction = prompts.render(f"theory/{style if style in STYLES else 'theory'}", topic=topic)
+    instruction += render_context(topic, context, max_tokens, system + instruction)
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": instruction},
+    ]
+
+
+async def generate_theory(
+    provider: LLMProvider,
+    topic: str,
+    style: str = "theory",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> str:
+    """Generate theory content with the provider"""
+    completion = await provider.complete(build_messages(topic, style, context, max_tokens), max_tokens=max_tokens)
+    return completion.text.strip()
+
+
+async def stream_theory(
+    provider: LLMProvider,
+    topic: str,
+    style: str = "theory",
+    context: Optional[List[str]] = None,
+    max_tokens: int = 1000,
+) -> AsyncIterator[str]:
+    """Stream theory content from the provider as it is generated"""
+    async for delta in provider.stream(build_messages(topic, style, context, max_tokens), max_tokens=max_tokens):
+        yield delta
+
+
+# How outline and section prompts refer to each style
+DOCUMENT_LABELS = {"notes": "study notes", "slides": "a slide deck"}
+
+
+async def generate_outline(provider: LLMProvider, topic: str, style: str, max_sections: int = 8) -> str:
+    """Ask the provider for the section titles of a document, one per line"""
+    prompts = get_prompt_registry()
+    messages = [
+        {"role": "system", "content": prompts.render("theory/system")},
+        {"role": "user", "content": prompts.render(
+            "theory/outline", topic=topic, style=DOCUMENT_LABELS.get(style, style), max_sections=max_sections
+        )},
+    ]
+    completion = await provider.complete(messages, max_tokens=200)
+    return completion.text.strip()
+
+
+async def generate_section(
+    provider: LLMProvider,
+    topic: str,
+    style: str,
+    titles: List[str],
+    number: int,
+    max_tokens: int = 600,
+) -> str:
+    """Generate one section (1-based number) of a document whose outline is titles"""
+    prompts = get_prompt_registry()
+    outline = "\n".join(f"{n}. {title}" for n, title in enumerate(titles, start=1))
+    messages = [
+        {"role": "system", "content": prompts.render("theory/system")},
+        {"role": "user", "content": prompts.render(
+            "theory/section", topic=topic, style=DOCUMENT_LABELS.get(style, style),
+            outline=outline, number=number, title=titles[number - 1],
+        )},
+    ]
+    completion = await provider.complete(messages, max_tokens=max_tokens)
+    return completion.text.strip()
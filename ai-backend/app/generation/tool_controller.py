@@ -1 +1,269 @@
-# Placeholder for tool controller
+"""
+Tool controller
+Runs the tool calls behind one generation (retrieval, code checks,
+validation, provider calls) as a dependency graph: every call starts as soon
+as the calls it depends on have finished, so independent calls run
+concurrently. Calls are bounded by per-tool and overall timeouts, identical
+calls within a request run once, and every run returns a timing trace
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+Tool = Callable[..., Awaitable[Any]]
+
+# Called as each call settles with its trace entry and result (None unless it succeeded)
+DoneCallback = Callable[["StageTiming", Any], None]
+
+
+class ToolError(Exception):
+    """Raised for invalid graphs and when reading the result of a failed call"""
+
+
+class Ref:
+    """Placeholder argument replaced by the result of another call"""
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Ref({self.name!r})"
+
+
+class ToolCall:
+    """
+    One node of the graph: await tool(**args)
+    Args that are Refs make the call depend on the named calls; after adds
+    dependencies whose results are not needed as arguments
+    """
+    __slots__ = ("name", "tool", "args", "after", "timeout")
+
+    def __init__(
+        self,
+        name: str,
+        tool: Tool,
+        args: Optional[Dict[str, Any]] = None,
+        after: Iterable[str] = (),
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.tool = tool
+        self.args = args or {}
+        self.after = tuple(after)
+        self.timeout = timeout
+
+    @property
+    def dependencies(self) -> Tuple[str, ...]:
+        refs = tuple(value.name for value in self.args.values() if isinstance(value, Ref))
+        return tuple(dict.fromkeys(refs + self.after))
+
+
+class StageTiming:
+    """Trace entry for one call; times are milliseconds from the start of the run"""
+    __slots__ = ("name", "tool", "status", "started_ms", "duration_ms", "waited_ms", "error")
+
+    def __init__(self, name: str, tool: str):
+        self.name = name
+        self.tool = tool
+        self.status = "pending"  # ok, cached, error, timeout, skipped
+        self.started_ms = 0.0
+        self.duration_ms = 0.0
+        self.waited_ms = 0.0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "tool": self.tool,
+            "status": self.status,
+            "started_ms": round(self.started_ms, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "waited_ms": round(self.waited_ms, 3),
+            "error": self.error,
+        }
+
+
+class ExecutionResult:
+    """Results, errors and trace of one run"""
+
+    def __init__(self, results: Dict[str, Any], trace: List[StageTiming], elapsed_ms: float):
+        self.results = results
+        self.trace = trace
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {stage.name: stage.error for stage in self.trace if stage.error is not None}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.results:
+            raise ToolError(f"Tool call '{name}' failed: {self.errors.get(name, 'not run')}")
+        return self.results[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+    def trace_dict(self) -> dict:
+        return {"elapsed_ms": round(self.elapsed_ms, 3), "stages": [stage.to_dict() for stage in self.trace]}
+
+
+def _memo_key(tool: Tool, args: Dict[str, Any]) -> Optional[tuple]:
+    """Key identifying a call by tool and resolved arguments; None when an argument is unhashable"""
+    key = (tool, tuple(sorted(args.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class ToolController:
+    """
+    Executor for one request
+    Memoized calls are shared across every run() of the same controller, so
+    create one controller per request
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None, overall_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self.overall_timeout = overall_timeout
+        self._memo: Dict[tuple, "asyncio.Task"] = {}
+        # Calls currently waiting on each task; a memoized task is shared, so it is cancelled only when none are left
+        self._waiters: Dict["asyncio.Task", int] = {}
+
+    async def run(
+        self,
+        calls: List[ToolCall],
+        overall_timeout: Optional[float] = None,
+        on_done: Optional[DoneCallback] = None,
+    ) -> ExecutionResult:
+        """
+        Run the graph; failures are recorded in the trace, never raised
+        on_done lets a caller use each result as soon as it is ready
+        """
+        by_name = _check_graph(calls)
+        started = time.perf_counter()
+        trace = {call.name: StageTiming(call.name, getattr(call.tool, "__name__", repr(call.tool))) for call in calls}
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, "asyncio.Task"] = {}
+
+        async def run_call(call: ToolCall) -> None:
+            stage = trace[call.name]
+            if call.dependencies:
+                await asyncio.wait([tasks[name] for name in call.dependencies])
+            stage.started_ms = (time.perf_counter() - started) * 1000
+            stage.waited_ms = stage.started_ms
+            failed = [name for name in call.dependencies if name not in results]
+            if failed:
+                stage.status, stage.error = "skipped", f"Dependency failed: {', '.join(failed)}"
+            else:
+                args = {key: results[value.name] if isinstance(value, Ref) else value for key, value in call.args.items()}
+                await self._execute(call, args, stage, results)
+                stage.duration_ms = (time.perf_counter() - started) * 1000 - stage.started_ms
+            if on_done is not None:
+                on_done(stage, results.get(call.name))
+
+        for call in _topological(calls, by_name):
+            tasks[call.name] = asyncio.ensure_future(run_call(call))
+        limit = overall_timeout if overall_timeout is not None else self.overall_timeout
+        _, pending = await asyncio.wait(tasks.values(), timeout=limit)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+            for stage in trace.values():
+                if stage.status == "pending":
+                    stage.status, stage.error = "timeout", f"Overall timeout of {limit}s exceeded"
+                    if on_done is not None:
+                        on_done(stage, None)
+        return ExecutionResult(results, list(trace.values()), (time.perf_counter() - started) * 1000)
+
+    async def _execute(self, call: ToolCall, args: Dict[str, Any], stage: StageTiming, results: Dict[str, Any]) -> None:
+        key = _memo_key(call.tool, args)
+        task = self._memo.get(key) if key is not None else None
+        if task is not None and not (task.done() and (task.cancelled() or task.exception() is not None)):
+            cached = True
+        else:
+            cached = False
+            task = asyncio.ensure_future(call.tool(**args))
+            if key is not None:
+                self._memo[key] = task
+        timeout = call.timeout if call.timeout is not None else self.default_timeout
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # asyncio.wait leaves the task running when this call times out or is cancelled
+            done, _ = await asyncio.wait([task], timeout=timeout)
+        finally:
+            self._release(key, task)
+        if not done:
+            stage.status, stage.error = "timeout", f"Timed out after {timeout}s"
+        elif task.cancelled():
+            stage.status, stage.error = "error", "Cancelled"
+        elif task.exception() is not None:
+            exc = task.exception()
+            logger.warning(f"Tool call '{call.name}' failed: {exc!r}")
+            stage.status, stage.error = "error", str(exc) or exc.__class__.__name__
+        else:
+            results[call.name] = task.result()
+            stage.status = "cached" if cached else "ok"
+
+    def _release(self, key: Optional[tuple], task: "asyncio.Task") -> None:
+        """Stop waiting on a task, cancelling it if it is unfinished and nobody else waits on it"""
+        self._waiters[task] -= 1
+        if self._waiters[task]:
+            return
+        del self._waiters[task]
+        if not task.done():
+            task.cancel()
+            if key is not None and self._memo.get(key) is task:
+                del self._memo[key]
+
+    def close(self) -> None:
+        """Cancel memoized calls that are still running"""
+        for task in self._memo.values():
+            task.cancel()
+        self._memo.clear()
+        self._waiters.clear()
+
+
+def _check_graph(calls: List[ToolCall]) -> Dict[str, ToolCall]:
+    by_name: Dict[str, ToolCall] = {}
+    for call in calls:
+        if call.name in by_name:
+            raise ToolError(f"Duplicate tool call name '{call.name}'")
+        by_name[call.name] = call
+    for call in calls:
+        for name in call.dependencies:
+            if name not in by_name:
+                raise ToolError(f"Tool call '{call.name}' depends on unknown call '{name}'")
+    return by_name
+
+
+def _topological(calls: List[ToolCall], by_name: Dict[str, ToolCall]) -> List[ToolCall]:
+    """Calls ordered so dependencies come first; raises ToolError on a cycle"""
+    ordered: List[ToolCall] = []
+    state: Dict[str, int] = {}  # 1 visiting, 2 done
+
+    def visit(call: ToolCall, path: Tuple[str, ...]) -> None:
+        if state.get(call.name) == 2:
+            return
+        if state.get(call.name) == 1:
+            raise ToolError(f"Tool calls form a cycle: {' -> '.join(path + (call.name,))}")
+        state[call.name] = 1
+        for name in call.dependencies:
+            visit(by_name[name], path + (call.name,))
+        state[call.name] = 2
+        ordered.append(call)
+
+    for call in calls:
+        visit(call, ())
+    return ordered
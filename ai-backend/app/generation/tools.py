@@ -0,0 +1,39 @@
+"""
+Generation tools
+Async tool functions for the tool controller: retrieval from the material
+index and validation of generated content
+"""
+from typing import List
+import asyncio
+
+
+async def retrieve(query: str, limit: int = 3, min_score: float = 0.2) -> List[dict]:
+    """Best matching materials for a query as plain dicts"""
+    # Import here to avoid circular dependency
+    from app.api.search import MATERIAL_INDEX
+
+    # The index search is CPU-bound, so it runs off the event loop; search holds the
+    # index's read lock, so an upload adding records waits for it and vice versa
+    hits = await asyncio.to_thread(lambda: MATERIAL_INDEX.search(query, limit, min_score=min_score).top(limit))
+    return [
+        {
+            "id": hit.record.id,
+            "title": hit.record.title,
+            "excerpt": hit.record.excerpt,
+            "source": hit.record.source,
+            "score": round(hit.score, 4),
+        }
+        for hit in hits
+    ]
+
+
+async def validate(content: str, content_type: str = "text", language: str = "python") -> dict:
+    """Syntax check for code, grounding check for text"""
+    # Import here to avoid circular dependency
+    from app.api.validate import validate_grounding, validate_syntax
+
+    if content_type == "code":
+        result = validate_syntax(content, "code", language)
+    else:
+        result = validate_grounding(content, content_type)
+    return result.model_dump(exclude_none=True)
@@ -9,6 +9,9 @@ from contextlib import asynccontextmanager
 import logging
 
 from app.config import get_settings
+from app.chat.sessions import start_session_store, stop_session_store
+from app.generation.jobs import start_job_queue, stop_job_queue
+from app.generation.provider import close_provider, open_provider
 from app.api import health, rag, generation, validation, search, generate, validate, chat
 
 # Configure logging
@@ -29,11 +32,17 @@ async def lifespan(app: FastAPI):
     settings = get_settings()
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Version: {settings.app_version}")
+    await open_provider(settings)
+    await start_job_queue(settings, generation.run_job)
+    await start_session_store(settings)
     
     yield
     
     # Shutdown
     logger.info("Shutting down AI Backend service...")
+    await stop_session_store()
+    await stop_job_queue()
+    await close_provider()
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,29 @@
+"""
+Process-wide metrics registry
+Components register a callable returning their counters; GET /health/metrics
+collects every registered source on demand
+"""
+from typing import Callable, Dict
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+_sources: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, source: Callable[[], dict]) -> None:
+    """Register (or replace) a named metrics source"""
+    _sources[name] = source
+
+
+def collect_metrics() -> Dict[str, dict]:
+    """Snapshot of every registered source; a failing source reports its error"""
+    snapshot = {}
+    for name, source in sorted(_sources.items()):
+        try:
+            snapshot[name] = source()
+        except Exception as exc:
+            logger.warning(f"Metrics source '{name}' failed: {exc}")
+            snapshot[name] = {"error": str(exc)}
+    return snapshot
@@ -0,0 +1,4 @@
+"""
+RAG Package
+Retrieval over course materials: records, indexes, ingestion and storage
+"""
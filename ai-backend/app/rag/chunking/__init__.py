@@ -0,0 +1,7 @@
+"""
+Chunking Package
+Incremental document chunking
+"""
+from app.rag.chunking.chunker import Chunk, StreamingChunker, extract_keywords
+
+__all__ = ["Chunk", "StreamingChunker", "extract_keywords"]
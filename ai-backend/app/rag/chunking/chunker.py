@@ -0,0 +1,92 @@
+"""
+Streaming chunker
+Splits text into overlapping chunks as it arrives, holding at most one chunk
+plus the latest fed piece in memory
+"""
+from collections import Counter
+from typing import List
+import re
+
+
+_WORD = re.compile(r"[a-z][a-z0-9_]{2,}")
+
+STOPWORDS = frozenset({
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her",
+    "was", "one", "our", "out", "has", "have", "this", "that", "with", "from", "they",
+    "will", "what", "when", "where", "which", "their", "there", "then", "than", "them",
+    "into", "each", "also", "more", "some", "such", "only", "other", "these", "those",
+    "its", "use", "used", "using", "how", "who", "why", "been", "were", "would", "could",
+    "should", "about", "over", "your", "may", "must", "does", "did", "just",
+})
+
+
+def extract_keywords(text: str, limit: int = 8) -> List[str]:
+    """Most frequent non-stopword terms of a chunk, used as its index keywords"""
+    counts = Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+    return [word for word, _ in counts.most_common(limit)]
+
+
+class Chunk:
+    """A chunk of a document with its character offsets"""
+    __slots__ = ("index", "text", "start", "end")
+
+    def __init__(self, index: int, text: str, start: int, end: int):
+        self.index = index
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"Chunk(index={self.index}, start={self.start}, end={self.end})"
+
+
+class StreamingChunker:
+    """
+    Incremental fixed-size chunker
+    Chunks end on whitespace where possible and consecutive chunks share
+    `overlap` characters of context
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ""
+        self._offset = 0  # Document offset of the first buffered character
+        self._emitted = 0  # Document offset where the last emitted chunk ended
+        self._index = 0
+
+    def feed(self, text: str) -> List[Chunk]:
+        """Add text and return every chunk that is now complete"""
+        chunks = []
+        # Slice large pieces so the buffer never holds more than two chunks
+        for start in range(0, len(text), self.chunk_size):
+            self._buffer += text[start:start + self.chunk_size]
+            while len(self._buffer) >= self.chunk_size:
+                chunks.append(self._cut(self.chunk_size))
+        return chunks
+
+    def finish(self) -> List[Chunk]:
+        """Flush the remaining text as a final chunk"""
+        chunks = []
+        if self._offset + len(self._buffer) > self._emitted and self._buffer.strip():
+            chunks.append(self._cut(len(self._buffer), final=True))
+        self._buffer = ""
+        return chunks
+
+    def _cut(self, limit: int, final: bool = False) -> Chunk:
+        end = limit
+        if not final:
+            boundary = max(self._buffer.rfind(" ", 0, limit), self._buffer.rfind("\n", 0, limit))
+            if boundary > limit // 2:
+                end = boundary + 1
+        chunk = Chunk(self._index, self._buffer[:end], self._offset, self._offset + end)
+        self._index += 1
+        self._emitted = chunk.end
+        advance = max(end - self.overlap, 1)
+        self._buffer = self._buffer[advance:]
+        self._offset += advance
+        return chunk
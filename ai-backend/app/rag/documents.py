@@ -0,0 +1,114 @@
+"""
+Document store facade
+Resolves material, document and chunk ids against the material index and the
+segment store, so many ids can be fetched in one call and content is only
+read from disk when it is asked for
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from app.rag.records import MaterialRecord, SearchHit
+from app.rag.retriever import MaterialIndex
+from app.rag.vector_store import SegmentStore
+
+
+class DocumentStore:
+    """Batched lookups over indexed materials and stored chunks"""
+
+    def __init__(self, index: MaterialIndex, segments: SegmentStore):
+        self.index = index
+        self.segments = segments
+
+    def _describe(self, item_id: str) -> Optional[dict]:
+        """Metadata for an id without its content"""
+        record = self.index.get(item_id)
+        if record is not None:
+            doc_id = self.segments.doc_id(item_id)
+            if doc_id is None:
+                # Built-in materials have no stored chunks; the excerpt is their content
+                return self._entry(record, "material", None, 0, len(record.excerpt))
+            start, end = self.segments.span(item_id)
+            return self._entry(record, "chunk", doc_id, start, end)
+
+        chunk_ids = self.segments.document_chunks(item_id)
+        if chunk_ids:
+            first = self.index.get(chunk_ids[0])
+            last_start, last_end = self.segments.span(chunk_ids[-1])
+            entry = self._entry(first, "document", item_id, 0, last_end) if first else {
+                "id": item_id, "kind": "document", "doc_id": item_id, "start": 0, "end": last_end,
+            }
+            entry["id"] = item_id
+            entry["chunks"] = len(chunk_ids)
+            return entry
+        return None
+
+    @staticmethod
+    def _entry(record: MaterialRecord, kind: str, doc_id: Optional[str], start: int, end: int) -> dict:
+        return {
+            "id": record.id,
+            "kind": kind,
+            "title": record.title,
+            "type": record.type,
+            "source": record.source,
+            "doc_id": doc_id,
+            "start": start,
+            "end": end,
+        }
+
+    def get_many(self, ids: Sequence[str], include_content: bool = True) -> Tuple[List[dict], List[str]]:
+        """
+        Fetch several ids in request order
+        Chunk contents are read with a single pass per segment file;
+        returns (found entries, missing ids)
+        """
+        found: List[dict] = []
+        missing: List[str] = []
+        seen = set()
+        for item_id in ids:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            entry = self._describe(item_id)
+            if entry is None:
+                missing.append(item_id)
+            else:
+                found.append(entry)
+
+        if include_content:
+            self._hydrate(found)
+        return found, missing
+
+    def hydrate_hits(self, hits: Sequence[SearchHit]) -> List[dict]:
+        """Entries with content for retrieval hits, preserving their order and scores"""
+        entries = []
+        for hit in hits:
+            entry = self._describe(hit.record.id)
+            entry["score"] = hit.score
+            entries.append(entry)
+        self._hydrate(entries)
+        return entries
+
+    def locate_hits(self, hits: Sequence[SearchHit]) -> List[dict]:
+        """Ids, scores and offsets for retrieval hits without reading any content"""
+        located = []
+        for hit in hits:
+            entry = self._describe(hit.record.id)
+            located.append({
+                "id": entry["id"],
+                "score": hit.score,
+                "doc_id": entry["doc_id"],
+                "start": entry["start"],
+                "end": entry["end"],
+            })
+        return located
+
+    def _hydrate(self, entries: List[dict]) -> None:
+        chunk_ids = [e["id"] for e in entries if e["kind"] == "chunk"]
+        contents = self.segments.read_many(chunk_ids) if chunk_ids else {}
+        for entry in entries:
+            kind = entry["kind"]
+            if kind == "chunk":
+                entry["content"] = contents.get(entry["id"], "")
+            elif kind == "document":
+                entry["content"] = self.segments.read_document(entry["id"]) or ""
+            else:
+                entry["content"] = self.index.get(entry["id"]).excerpt
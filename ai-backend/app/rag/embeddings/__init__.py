@@ -0,0 +1,7 @@
+"""
+Embeddings Package
+Local text embeddings
+"""
+from app.rag.embeddings.embedder import HashingEmbedder, cosine_similarity
+
+__all__ = ["HashingEmbedder", "cosine_similarity"]
@@ -0,0 +1,41 @@
+"""
+Hashing embedder
+Deterministic, dependency-free text embeddings using signed feature hashing
+"""
+from array import array
+from typing import Sequence
+import math
+import re
+import zlib
+
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+
+class HashingEmbedder:
+    """
+    Embed text into a fixed-size float32 vector
+    Tokens are hashed with CRC32 (stable across processes) into `dim` buckets
+    with a sign bit, and the result is L2-normalized
+    """
+
+    def __init__(self, dim: int = 256):
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+
+    def embed(self, text: str) -> array:
+        """Return the normalized embedding of text"""
+        vector = [0.0] * self.dim
+        for token in _TOKEN.findall(text.lower()):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dim] += -1.0 if digest & 0x80000000 else 1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return array("f", vector)
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two normalized vectors"""
+    return sum(x * y for x, y in zip(a, b))
@@ -0,0 +1,15 @@
+"""
+Ingestion Package
+Streaming document ingestion and job tracking
+"""
+from app.rag.ingestion.jobs import IngestionJob, IngestionJobRegistry, get_ingestion_jobs
+from app.rag.ingestion.pipeline import DocumentIngestor, MultipartIngestError, ingest_multipart
+
+__all__ = [
+    "IngestionJob",
+    "IngestionJobRegistry",
+    "get_ingestion_jobs",
+    "DocumentIngestor",
+    "MultipartIngestError",
+    "ingest_multipart",
+]
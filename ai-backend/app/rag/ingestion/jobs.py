@@ -0,0 +1,113 @@
+"""
+Ingestion job tracking
+Progress counters for uploads, polled by clients while ingestion runs
+"""
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional
+import time
+import uuid
+
+from app.config import get_settings
+
+
+class IngestionJob:
+    """Progress of one upload"""
+    __slots__ = ("id", "status", "bytes_received", "documents", "chunks", "error", "created_at", "updated_at", "reserved_at")
+
+    def __init__(self, job_id: str, status: str = "receiving"):
+        self.id = job_id
+        self.status = status
+        self.bytes_received = 0
+        self.documents = 0
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.updated_at = self.created_at
+        self.reserved_at = 0.0  # Registry clock reading when the job was created
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def start(self) -> None:
+        self.status = "receiving"
+        self.touch()
+
+    def touch(self) -> None:
+        self.updated_at = datetime.utcnow()
+
+    def complete(self) -> None:
+        self.status = "completed"
+        self.touch()
+
+    def fail(self, error: str) -> None:
+        self.status = "failed"
+        self.error = error
+        self.touch()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "bytes_received": self.bytes_received,
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class IngestionJobRegistry:
+    """
+    In-memory job registry holding at most max_jobs jobs
+    Pending jobs whose upload has not started within pending_ttl seconds
+    expire; past the limit the oldest finished jobs go first, then the oldest
+    pending ones, so reserving ids cannot grow the registry without bound
+    """
+
+    def __init__(self, max_jobs: int = 1000, pending_ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_jobs = max_jobs
+        self.pending_ttl = pending_ttl
+        self.clock = clock
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def create(self, status: str = "receiving") -> IngestionJob:
+        """New job; status "pending" reserves an id for an upload not yet sent"""
+        self._expire()
+        job = IngestionJob(uuid.uuid4().hex, status)
+        job.reserved_at = self.clock()
+        self._jobs[job.id] = job
+        excess = len(self._jobs) - self.max_jobs
+        if excess > 0:
+            finished = [j.id for j in self._jobs.values() if j.finished]
+            pending = [j.id for j in self._jobs.values() if j.status == "pending" and j is not job]
+            for job_id in (finished + pending)[:excess]:
+                del self._jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        job = self._jobs.get(job_id)
+        if job is not None and self._expired(job):
+            del self._jobs[job_id]
+            return None
+        return job
+
+    def _expired(self, job: IngestionJob) -> bool:
+        return job.status == "pending" and self.clock() - job.reserved_at >= self.pending_ttl
+
+    def _expire(self) -> None:
+        for job_id in [j.id for j in self._jobs.values() if self._expired(j)]:
+            del self._jobs[job_id]
+
+
+@lru_cache()
+def get_ingestion_jobs() -> IngestionJobRegistry:
+    """Get the process-wide ingestion job registry"""
+    settings = get_settings()
+    return IngestionJobRegistry(settings.rag_max_ingestion_jobs, settings.rag_pending_job_ttl)
@@ -0,0 +1,270 @@
+"""
+Streaming ingestion pipeline
+Multipart bodies are parsed as they arrive and each file part is piped through
+the chunker, embedder and segment writer without buffering the whole file;
+parsing, chunking, embedding and symbol extraction run in a worker thread so
+the event loop only reads the body
+"""
+from pathlib import PurePosixPath
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
+import codecs
+import re
+import tempfile
+import zipfile
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.rag.chunking import Chunk, StreamingChunker, extract_keywords
+from app.rag.embeddings import HashingEmbedder
+from app.rag.ingestion.jobs import IngestionJob
+from app.rag.records import MaterialRecord
+from app.rag.retriever import MaterialIndex, language_for
+from app.rag.vector_store import SegmentStore, SegmentWriter
+
+
+READ_SIZE = 64 * 1024
+EXCERPT_LENGTH = 160
+
+CODE_SUFFIXES = frozenset({".py", ".java", ".c", ".h", ".cpp", ".hpp", ".cc", ".js", ".ts", ".go", ".rs"})
+TEXT_SUFFIXES = CODE_SUFFIXES | frozenset({
+    ".txt", ".md", ".markdown", ".rst", ".tex", ".json", ".csv", ".srt", ".vtt", ".html",
+})
+ZIP_CONTENT_TYPES = frozenset({"application/zip", "application/x-zip-compressed"})
+
+# Material types whose chunks are parsed into the symbol index
+CODE_MATERIAL_TYPES = frozenset({"code", "lab"})
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class MultipartIngestError(Exception):
+    """Raised when an upload body cannot be parsed or ingested"""
+
+
+def infer_material_type(filename: str) -> str:
+    """Guess a material type from a file name"""
+    return "code" if PurePosixPath(filename).suffix.lower() in CODE_SUFFIXES else "notes"
+
+
+def _excerpt(text: str) -> str:
+    excerpt = _WHITESPACE.sub(" ", text[:EXCERPT_LENGTH * 2]).strip()
+    return excerpt[:EXCERPT_LENGTH]
+
+
+class DocumentIngestor:
+    """
+    Ingests a single document fed as raw bytes
+    Bytes are decoded incrementally, chunked, embedded, written to a segment
+    and registered in the index one chunk at a time; code and lab chunks are
+    also parsed into the index's symbol tables
+    """
+
+    def __init__(
+        self,
+        doc_id: str,
+        title: str,
+        material_type: str,
+        source: str,
+        job: IngestionJob,
+        writer: SegmentWriter,
+        embedder: HashingEmbedder,
+        index: Optional[MaterialIndex] = None,
+        chunk_size: int = 1000,
+        overlap: int = 100,
+    ):
+        self.doc_id = doc_id
+        self.title = title
+        self.material_type = material_type
+        self.source = source
+        self.job = job
+        self.writer = writer
+        self.embedder = embedder
+        self.index = index
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._chunker = StreamingChunker(chunk_size, overlap)
+        self._parse_symbols = index is not None and material_type in CODE_MATERIAL_TYPES
+        self._language = language_for(title)
+        self._previous: Optional[Chunk] = None
+        self._line = 1  # Line number at the start of the previous chunk
+
+    def write(self, data: bytes) -> None:
+        """Feed the next piece of the document"""
+        for chunk in self._chunker.feed(self._decoder.decode(data)):
+            self._store(chunk)
+
+    def close(self) -> None:
+        """Flush the final chunk and count the document"""
+        for chunk in self._chunker.feed(self._decoder.decode(b"", final=True)):
+            self._store(chunk)
+        for chunk in self._chunker.finish():
+            self._store(chunk)
+        self.job.documents += 1
+        self.job.touch()
+
+    def _store(self, chunk: Chunk) -> None:
+        chunk_id = f"{self.doc_id}:{chunk.index}"
+        self.writer.add(chunk_id, self.doc_id, chunk.text, self.embedder.embed(chunk.text), chunk.start, chunk.end)
+        if self.index is not None:
+            self.index.add(MaterialRecord(
+                id=chunk_id,
+                title=self.title,
+                type=self.material_type,
+                excerpt=_excerpt(chunk.text),
+                source=self.source,
+                keywords=extract_keywords(chunk.text),
+            ))
+            if self._parse_symbols:
+                self.index.add_source(chunk_id, self.doc_id, chunk.text, self._language, self._first_line(chunk))
+        self.job.chunks += 1
+        self.job.touch()
+
+    def _first_line(self, chunk: Chunk) -> int:
+        """Line number of the chunk's first line within the document"""
+        previous = self._previous
+        if previous is not None:
+            self._line += previous.text.count("\n", 0, chunk.start - previous.start)
+        self._previous = chunk
+        return self._line
+
+
+def _ingest_zip(spool, archive_name: str, make_ingestor: Callable[[str], DocumentIngestor]) -> None:
+    """Ingest the text members of a ZIP spooled to disk, one member read at a time; blocking"""
+    spool.seek(0)
+    try:
+        archive = zipfile.ZipFile(spool)
+    except zipfile.BadZipFile:
+        raise MultipartIngestError(f"'{archive_name}' is not a valid ZIP archive")
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or PurePosixPath(info.filename).suffix.lower() not in TEXT_SUFFIXES:
+                continue
+            ingestor = make_ingestor(f"{archive_name}/{info.filename}")
+            with archive.open(info) as member:
+                while True:
+                    data = member.read(READ_SIZE)
+                    if not data:
+                        break
+                    ingestor.write(data)
+            ingestor.close()
+
+
+async def ingest_multipart(
+    stream: AsyncIterator[bytes],
+    content_type: str,
+    job: IngestionJob,
+    store: SegmentStore,
+    index: Optional[MaterialIndex] = None,
+    material_type: Optional[str] = None,
+    source: Optional[str] = None,
+    chunk_size: int = 1000,
+    overlap: int = 100,
+) -> None:
+    """
+    Parse a multipart body from an async byte stream and ingest every file part
+    Plain-text parts are ingested while they stream in; ZIP parts are spooled to
+    a temporary file on disk and ingested member by member once complete
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise MultipartIngestError("Missing boundary in multipart body")
+
+    embedder = HashingEmbedder(store.dim)
+    writer = store.writer()
+    documents = 0
+
+    def make_ingestor(filename: str) -> DocumentIngestor:
+        nonlocal documents
+        documents += 1
+        return DocumentIngestor(
+            doc_id=f"upload-{job.id[:12]}-{documents}",
+            title=filename,
+            material_type=material_type or infer_material_type(filename),
+            source=source or f"Upload - {filename}",
+            job=job,
+            writer=writer,
+            embedder=embedder,
+            index=index,
+            chunk_size=chunk_size,
+            overlap=overlap,
+        )
+
+    headers: List[Tuple[bytes, bytes]] = []
+    header_field = bytearray()
+    header_value = bytearray()
+    part = {"ingestor": None, "spool": None, "name": ""}
+    completed_zips: List[Tuple[object, str]] = []
+
+    def on_part_begin() -> None:
+        headers.clear()
+        part.update(ingestor=None, spool=None, name="")
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.extend(data[start:end])
+
+    def on_header_end() -> None:
+        headers.append((bytes(header_field).lower(), bytes(header_value)))
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        disposition = dict(headers).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        filename = options.get(b"filename")
+        if not filename:
+            return  # Plain form fields carry no documents
+        name = PurePosixPath(filename.decode("utf-8", errors="replace").replace("\\", "/")).name
+        part_type = dict(headers).get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+        suffix = PurePosixPath(name).suffix.lower()
+        part["name"] = name
+        if suffix == ".zip" or part_type in ZIP_CONTENT_TYPES:
+            part["spool"] = tempfile.TemporaryFile()
+        elif suffix in TEXT_SUFFIXES or part_type.startswith("text/"):
+            part["ingestor"] = make_ingestor(name)
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if part["ingestor"] is not None:
+            part["ingestor"].write(data[start:end])
+        elif part["spool"] is not None:
+            part["spool"].write(data[start:end])
+
+    def on_part_end() -> None:
+        if part["ingestor"] is not None:
+            part["ingestor"].close()
+        elif part["spool"] is not None:
+            completed_zips.append((part["spool"], part["name"]))
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    try:
+        async for data in stream:
+            job.bytes_received += len(data)
+            # Part callbacks chunk, embed and index, so they run off the event loop
+            await asyncio.to_thread(parser.write, data)
+            for spool, name in completed_zips:
+                try:
+                    await asyncio.to_thread(_ingest_zip, spool, name, make_ingestor)
+                finally:
+                    spool.close()
+            completed_zips.clear()
+            job.touch()
+        await asyncio.to_thread(parser.finalize)
+    except MultipartParseError as exc:
+        raise MultipartIngestError(f"Malformed multipart body: {exc}") from exc
+    finally:
+        if part["spool"] is not None and not part["spool"].closed:
+            part["spool"].close()
+        writer.close()
@@ -0,0 +1,169 @@
+"""
+Compact in-memory records for course materials and search hits
+Hot-path objects are slotted, share interned strings for repeated fields and
+keep scores in arrays; pydantic models are only built at the API boundary
+"""
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple
+import sys
+
+
+def intern_field(value: Optional[str]) -> Optional[str]:
+    """Intern a low-cardinality field (type, source, keyword) so records share one copy"""
+    return sys.intern(value) if value is not None else None
+
+
+def _lowered(value: str) -> str:
+    """Lowercase a string, reusing the original object when it is already lowercase"""
+    lowered = value.lower()
+    return value if lowered == value else lowered
+
+
+class MaterialRecord:
+    """
+    Slotted representation of a single course material
+    Lowercased copies of the searchable fields are computed once at load time
+    """
+    __slots__ = (
+        "id",
+        "title",
+        "type",
+        "excerpt",
+        "source",
+        "week",
+        "keywords",
+        "title_lower",
+        "excerpt_lower",
+        "keywords_lower",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        type: str,
+        excerpt: str,
+        source: str,
+        week: Optional[int] = None,
+        keywords: Iterable[str] = (),
+    ):
+        self.id = id
+        self.title = title
+        self.type = intern_field(type)
+        self.excerpt = excerpt
+        self.source = intern_field(source)
+        self.week = week
+        self.keywords = tuple(intern_field(k) for k in keywords)
+        self.title_lower = _lowered(title)
+        self.excerpt_lower = _lowered(excerpt)
+        lowered_keywords = tuple(intern_field(_lowered(k)) for k in self.keywords)
+        self.keywords_lower = self.keywords if lowered_keywords == self.keywords else lowered_keywords
+
+    @classmethod
+    def from_dict(cls, material: dict) -> "MaterialRecord":
+        """Build a record from a material dict such as an entry of MOCK_MATERIALS"""
+        return cls(
+            id=material["id"],
+            title=material["title"],
+            type=material["type"],
+            excerpt=material["excerpt"],
+            source=material["source"],
+            week=material.get("week"),
+            keywords=material.get("keywords", ()),
+        )
+
+    def to_dict(self) -> dict:
+        """Convert back to the plain material dict shape"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "type": self.type,
+            "excerpt": self.excerpt,
+            "source": self.source,
+            "week": self.week,
+            "keywords": list(self.keywords),
+        }
+
+    def __repr__(self) -> str:
+        return f"MaterialRecord(id={self.id!r}, type={self.type!r})"
+
+
+class SearchHit:
+    """A scored reference to a material record"""
+    __slots__ = ("record", "score", "matched")
+
+    def __init__(self, record: MaterialRecord, score: float, matched: Tuple[str, ...] = ()):
+        self.record = record
+        self.score = score
+        self.matched = matched
+
+    def to_dict(self) -> dict:
+        """Convert to the dict shape returned in chat search_results"""
+        record = self.record
+        return {
+            "id": record.id,
+            "title": record.title,
+            "type": record.type,
+            "excerpt": record.excerpt,
+            "source": record.source,
+            "score": self.score,
+        }
+
+    def __repr__(self) -> str:
+        return f"SearchHit(id={self.record.id!r}, score={self.score})"
+
+
+class HitList:
+    """
+    Array-backed buffer of search hits
+    Ordinals and scores live in typed arrays; SearchHit objects are only
+    created for the hits that are actually returned
+    """
+    __slots__ = ("_records", "_ordinals", "_scores", "_matched")
+
+    def __init__(self, records: List[MaterialRecord]):
+        self._records = records
+        self._ordinals = array("I")
+        self._scores = array("d")
+        self._matched: List[Tuple[str, ...]] = []
+
+    def append(self, ordinal: int, score: float, matched: Iterable[str] = ()) -> None:
+        """Add a hit for the record at the given ordinal"""
+        self._ordinals.append(ordinal)
+        self._scores.append(score)
+        self._matched.append(tuple(matched))
+
+    def sort(self) -> None:
+        """Sort hits by score, highest first; ties keep insertion order"""
+        order = sorted(range(len(self._scores)), key=self._scores.__getitem__, reverse=True)
+        self._ordinals = array("I", (self._ordinals[i] for i in order))
+        self._scores = array("d", (self._scores[i] for i in order))
+        self._matched = [self._matched[i] for i in order]
+
+    def ordinal(self, position: int) -> int:
+        """Record ordinal of the hit at the given position"""
+        return self._ordinals[position]
+
+    def hit(self, position: int) -> SearchHit:
+        """Materialize the hit at the given position"""
+        return SearchHit(
+            self._records[self._ordinals[position]],
+            self._scores[position],
+            self._matched[position],
+        )
+
+    def top(self, n: int) -> List[SearchHit]:
+        """Materialize the first n hits"""
+        return [self.hit(i) for i in range(min(n, len(self._scores)))]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __iter__(self) -> Iterator[SearchHit]:
+        for i in range(len(self._scores)):
+            yield self.hit(i)
+
+
+def load_records(materials: Iterable[dict]) -> List[MaterialRecord]:
+    """Load material dicts into compact records"""
+    return [MaterialRecord.from_dict(m) for m in materials]
@@ -0,0 +1,8 @@
+"""
+Retriever Package
+Indexes and top-k query evaluation over material records
+"""
+from app.rag.retriever.index import MaterialIndex, score_record
+from app.rag.retriever.symbols import SymbolIndex, SymbolLocation, extract_symbols, language_for
+
+__all__ = ["MaterialIndex", "score_record", "SymbolIndex", "SymbolLocation", "extract_symbols", "language_for"]
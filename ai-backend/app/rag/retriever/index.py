@@ -0,0 +1,435 @@
+"""
+Inverted keyword index with dynamic-pruning top-k retrieval
+Scores are identical to a full scan of calculate_relevance, but documents that
+cannot enter the top-k are skipped using per-term upper bounds (WAND); phrase
+and proximity bonuses come from a positional index
+Public methods take the index's reader/writer lock, so worker-thread searches
+never see a record half added
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import random
+
+from app.rag.records import HitList, MaterialRecord, SearchHit
+from app.rag.retriever.locks import ReadWriteLock
+from app.rag.retriever.neighbors import NeighborGraph
+from app.rag.retriever.positions import (
+    ParsedQuery, PositionalIndex, closeness, contains_phrase, positions_of, tokenize,
+)
+from app.rag.retriever.symbols import SymbolIndex, extract_symbols
+
+
+# Score contributions, shared by the reference scorer and the index
+TITLE_WEIGHT = 0.4
+KEYWORD_WEIGHT = 0.15
+EXCERPT_WEIGHT = 0.2
+PROXIMITY_WEIGHT = 0.1
+JITTER = 0.1
+MAX_SCORE = 1.0
+MAX_MATCHED = 5
+PINNED_KINDS = frozenset({"function", "method", "class"})  # Symbol kinds pinned to the top of code searches
+
+_END = 2 ** 32  # Sentinel ordinal for an exhausted posting cursor
+
+
+def score_record(query: str, material: MaterialRecord, parsed: Optional[ParsedQuery] = None) -> tuple[float, List[str]]:
+    """Score a record against a query by scanning its fields"""
+    parsed = parsed or ParsedQuery(query)
+    title_tokens = tokenize(material.title_lower)
+    excerpt_tokens = tokenize(material.excerpt_lower)
+
+    # Quoted phrases are required
+    for phrase in parsed.phrases:
+        if not (contains_phrase(title_tokens, phrase) or contains_phrase(excerpt_tokens, phrase)
+                or any(contains_phrase(tokenize(k), phrase) for k in material.keywords_lower)):
+            return 0.0, []
+
+    matched = []
+    score = 0.0
+
+    # Check title
+    if contains_phrase(title_tokens, parsed.terms):
+        score += TITLE_WEIGHT
+        matched.append(query)
+
+    # Check keywords
+    for keyword, keyword_lower in zip(material.keywords, material.keywords_lower):
+        if keyword_lower in parsed.lower or any(w in keyword_lower for w in parsed.words):
+            score += KEYWORD_WEIGHT
+            if keyword not in matched:
+                matched.append(keyword)
+
+    # Check excerpt
+    if contains_phrase(excerpt_tokens, parsed.terms):
+        score += EXCERPT_WEIGHT
+
+    # Reward query terms that appear close together
+    distinct = tuple(dict.fromkeys(parsed.terms))
+    if len(distinct) > 1:
+        best = 0.0
+        for tokens in (title_tokens, excerpt_tokens):
+            lists = positions_of(tokens, distinct)
+            if lists is not None:
+                best = max(best, closeness(lists))
+        if best:
+            score += PROXIMITY_WEIGHT * best
+
+    # Add some randomness to simulate real search variance
+    score = min(MAX_SCORE, score + random.uniform(0, JITTER))
+
+    return score, matched[:MAX_MATCHED]
+
+
+class _PhraseMatches:
+    """Records that earn a phrase or proximity bonus for one query"""
+    __slots__ = ("title", "excerpt", "closeness", "allowed", "slack")
+
+    def __init__(self, title: Set[int], excerpt: Set[int], closeness: Dict[int, float], allowed: Optional[Set[int]]):
+        self.title = title
+        self.excerpt = excerpt
+        self.closeness = closeness
+        # Records containing every quoted phrase, or None when there are none
+        self.allowed = allowed
+        # Largest phrase and proximity bonus any record can get
+        self.slack = JITTER
+        if title:
+            self.slack += TITLE_WEIGHT
+        if excerpt:
+            self.slack += EXCERPT_WEIGHT
+        if closeness:
+            self.slack += PROXIMITY_WEIGHT * max(closeness.values())
+
+    def candidates(self) -> Set[int]:
+        return self.title | self.excerpt | set(self.closeness)
+
+
+class _Cursor:
+    """Iterator over one keyword's posting list"""
+    __slots__ = ("postings", "position", "upper_bound")
+
+    def __init__(self, postings: array, upper_bound: float):
+        self.postings = postings
+        self.position = 0
+        self.upper_bound = upper_bound
+
+    @property
+    def doc(self) -> int:
+        return self.postings[self.position] if self.position < len(self.postings) else _END
+
+    def advance_to(self, ordinal: int) -> None:
+        """Move to the first posting >= ordinal"""
+        self.position = bisect_left(self.postings, ordinal, self.position)
+
+
+class _TopK:
+    """Bounded min-heap of (rounded score, -ordinal) with the acceptance rule of a stable sort"""
+    __slots__ = ("k", "min_score", "keep_matched", "heap")
+
+    def __init__(self, k: int, min_score: float, keep_matched: bool):
+        self.k = k
+        self.min_score = min_score
+        self.keep_matched = keep_matched
+        self.heap: List[Tuple[float, int, List[str]]] = []
+
+    def can_enter(self, upper_bound: float, ordinal: int = -1) -> bool:
+        """Whether a document whose score is at most upper_bound could still be kept"""
+        if self.k <= 0:
+            return False
+        if not self.keep_matched and upper_bound <= self.min_score:
+            return False
+        if len(self.heap) < self.k:
+            return True
+        return (round(min(MAX_SCORE, upper_bound), 2), -ordinal) > self.heap[0][:2]
+
+    def offer(self, ordinal: int, score: float, matched: List[str]) -> None:
+        """Keep the document if it passes the inclusion rule and beats the current minimum"""
+        if not (score > self.min_score or (self.keep_matched and matched)):
+            return
+        entry = (round(score, 2), -ordinal, matched)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+
+class MaterialIndex:
+    """
+    Keyword index over material records
+    Each distinct keyword keeps a sorted posting list of record ordinals and
+    the largest score it can add to a single record; title, excerpt and
+    keyword tokens are also kept with their positions
+    """
+
+    def __init__(self, records: Iterable[MaterialRecord] = ()):
+        self.lock = ReadWriteLock()
+        self.records: List[MaterialRecord] = []
+        self.symbols = SymbolIndex()
+        self.positions = PositionalIndex()
+        self.neighbors = NeighborGraph()
+        self._ordinals: Dict[str, int] = {}
+        self._postings: Dict[str, array] = {}
+        self._upper_bounds: Dict[str, float] = {}
+        # Every substring of every keyword token -> keywords containing it
+        self._fragments: Dict[str, Set[str]] = {}
+        # First token of each keyword -> keywords starting with it
+        self._heads: Dict[str, Set[str]] = {}
+        self._blank_keywords: Set[str] = set()
+        self._max_head = 0
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, record_id: str) -> Optional[MaterialRecord]:
+        """Look up a record by id"""
+        with self.lock.read():
+            ordinal = self._ordinals.get(record_id)
+            return self.records[ordinal] if ordinal is not None else None
+
+    def add(self, record: MaterialRecord) -> int:
+        """Append a record to the index and return its ordinal"""
+        with self.lock.write():
+            return self._add(record)
+
+    def add_source(self, chunk_id: str, doc_id: str, text: str, language: Optional[str] = None, first_line: int = 1) -> int:
+        """Parse a code chunk's symbols outside the lock, then record them; returns the number of new definitions"""
+        parsed = extract_symbols(text, language)
+        with self.lock.write():
+            return self.symbols.add_parsed(chunk_id, doc_id, parsed, first_line)
+
+    def _add(self, record: MaterialRecord) -> int:
+        if record.id in self._ordinals:
+            raise ValueError(f"Record '{record.id}' already indexed")
+        ordinal = len(self.records)
+        self.records.append(record)
+        self._ordinals[record.id] = ordinal
+        self.positions.add(ordinal, record.title_lower, record.excerpt_lower, record.keywords_lower)
+        self.neighbors.add(ordinal, record.title_lower, record.excerpt_lower, record.keywords_lower)
+
+        counts: Dict[str, int] = {}
+        for keyword in record.keywords_lower:
+            counts[keyword] = counts.get(keyword, 0) + 1
+
+        for keyword, count in counts.items():
+            postings = self._postings.get(keyword)
+            if postings is None:
+                postings = self._postings[keyword] = array("I")
+                self._register_keyword(keyword)
+            postings.append(ordinal)
+            bound = KEYWORD_WEIGHT * count
+            if bound > self._upper_bounds.get(keyword, 0.0):
+                self._upper_bounds[keyword] = bound
+        return ordinal
+
+    def _register_keyword(self, keyword: str) -> None:
+        tokens = keyword.split()
+        if not tokens:
+            self._blank_keywords.add(keyword)
+            return
+        self._heads.setdefault(tokens[0], set()).add(keyword)
+        self._max_head = max(self._max_head, len(tokens[0]))
+        for token in tokens:
+            for start in range(len(token)):
+                for end in range(start + 1, len(token) + 1):
+                    self._fragments.setdefault(token[start:end], set()).add(keyword)
+
+    def matching_keywords(self, query_lower: str, query_words: Iterable[str]) -> Set[str]:
+        """
+        Keywords matched by the query under calculate_relevance's rules:
+        the keyword occurs in the query, or a query word occurs in the keyword
+        """
+        with self.lock.read():
+            return self._matching_keywords(query_lower, query_words)
+
+    def _matching_keywords(self, query_lower: str, query_words: Iterable[str]) -> Set[str]:
+        matched: Set[str] = set()
+        for word in query_words:
+            # A whitespace-free word inside a keyword lies within a single keyword token
+            matched.update(self._fragments.get(word, ()))
+            # A keyword inside the query starts with its first token inside one query word
+            for start in range(len(word)):
+                for end in range(start + 1, min(len(word), start + self._max_head) + 1):
+                    for keyword in self._heads.get(word[start:end], ()):
+                        if keyword not in matched and keyword in query_lower:
+                            matched.add(keyword)
+        for keyword in self._blank_keywords:
+            if keyword in query_lower:
+                matched.add(keyword)
+        return matched
+
+    def _phrase_matches(self, parsed: ParsedQuery) -> _PhraseMatches:
+        """Resolve phrase, proximity and quoted-phrase matches by intersecting position lists"""
+        terms = parsed.terms
+        title = self.positions.phrase("title", terms) if terms else set()
+        excerpt = self.positions.phrase("excerpt", terms) if terms else set()
+        proximity: Dict[int, float] = {}
+        distinct = tuple(dict.fromkeys(terms))
+        if len(distinct) > 1:
+            for field in ("title", "excerpt"):
+                for ordinal, value in self.positions.proximity(field, distinct).items():
+                    if value > proximity.get(ordinal, 0.0):
+                        proximity[ordinal] = value
+        allowed = None
+        for phrase in parsed.phrases:
+            found = self.positions.phrase_anywhere(phrase)
+            allowed = found if allowed is None else allowed & found
+        return _PhraseMatches(title, excerpt, proximity, allowed)
+
+    def _score(self, ordinal: int, parsed: ParsedQuery, matched_keywords: Set[str], phrases: _PhraseMatches) -> tuple[float, List[str]]:
+        """Fully score one record using the query's precomputed keyword and phrase matches"""
+        record = self.records[ordinal]
+        matched = []
+        score = 0.0
+        if ordinal in phrases.title:
+            score += TITLE_WEIGHT
+            matched.append(parsed.query)
+        for keyword, keyword_lower in zip(record.keywords, record.keywords_lower):
+            if keyword_lower in matched_keywords:
+                score += KEYWORD_WEIGHT
+                if keyword not in matched:
+                    matched.append(keyword)
+        if ordinal in phrases.excerpt:
+            score += EXCERPT_WEIGHT
+        value = phrases.closeness.get(ordinal)
+        if value:
+            score += PROXIMITY_WEIGHT * value
+        score = min(MAX_SCORE, score + random.uniform(0, JITTER))
+        return score, matched[:MAX_MATCHED]
+
+    def top_k(self, query: str, k: int, min_score: float = 0.0, keep_matched: bool = False) -> HitList:
+        """
+        Return the k best records, highest score first
+        A record is kept if its score exceeds min_score, or, with keep_matched,
+        if anything in it matched the query
+        """
+        with self.lock.read():
+            return self._top_k(query, k, min_score, keep_matched)
+
+    def _top_k(self, query: str, k: int, min_score: float, keep_matched: bool) -> HitList:
+        parsed = ParsedQuery(query)
+        matched_keywords = self._matching_keywords(parsed.lower, parsed.words)
+        phrases = self._phrase_matches(parsed)
+        slack = phrases.slack
+        top = _TopK(k, min_score, keep_matched)
+
+        if phrases.allowed is not None:
+            # Quoted phrases already narrow the query to a few records
+            for ordinal in sorted(phrases.allowed):
+                score, matched = self._score(ordinal, parsed, matched_keywords, phrases)
+                top.offer(ordinal, score, matched)
+            return self._hits(top)
+
+        cursors = [_Cursor(self._postings[kw], self._upper_bounds[kw]) for kw in matched_keywords]
+        cursors = [c for c in cursors if len(c.postings)]
+
+        # WAND: pick the first ordinal whose accumulated upper bound can enter the heap
+        while cursors:
+            cursors.sort(key=lambda c: c.doc)
+            bound = slack
+            pivot = -1
+            for i, cursor in enumerate(cursors):
+                if cursor.doc == _END:
+                    break
+                bound += cursor.upper_bound
+                if top.can_enter(bound, cursor.doc):
+                    pivot = i
+                    break
+            if pivot < 0:
+                break
+            pivot_doc = cursors[pivot].doc
+            if cursors[0].doc == pivot_doc:
+                score, matched = self._score(pivot_doc, parsed, matched_keywords, phrases)
+                top.offer(pivot_doc, score, matched)
+                for cursor in cursors:
+                    if cursor.doc == pivot_doc:
+                        cursor.position += 1
+            else:
+                for cursor in cursors[:pivot]:
+                    cursor.advance_to(pivot_doc)
+            cursors = [c for c in cursors if c.doc != _END]
+
+        # Records without keyword matches can only score through phrase and proximity bonuses
+        if slack > JITTER and top.can_enter(slack):
+            postings = [self._postings[kw] for kw in matched_keywords]
+            for ordinal in sorted(phrases.candidates()):
+                if any(_contains(p, ordinal) for p in postings):
+                    continue
+                score, matched = self._score(ordinal, parsed, matched_keywords, phrases)
+                top.offer(ordinal, score, matched)
+
+        return self._hits(top)
+
+    def _hits(self, top: _TopK) -> HitList:
+        hits = HitList(self.records)
+        for score, negative_ordinal, matched in sorted(top.heap, reverse=True):
+            hits.append(-negative_ordinal, score, matched)
+        return hits
+
+    def search(self, query: str, k: int, min_score: float = 0.0, keep_matched: bool = False) -> HitList:
+        """
+        top_k preceded by chunks that define a code symbol named in the query,
+        such as "merge_sort implementation" or "where is insert defined"
+        """
+        with self.lock.read():
+            return self._search(query, k, min_score, keep_matched)
+
+    def _search(self, query: str, k: int, min_score: float, keep_matched: bool) -> HitList:
+        hits = HitList(self.records)
+        defined: Set[int] = set()
+        for location in self.symbols.match_query(query):
+            # Only callable and class definitions are pinned; a variable named like a query word is not an answer
+            if location.kind not in PINNED_KINDS:
+                continue
+            ordinal = self._ordinals.get(location.chunk_id)
+            if ordinal is None or ordinal in defined or len(hits) >= k:
+                continue
+            defined.add(ordinal)
+            hits.append(ordinal, MAX_SCORE, (location.name,))
+        if len(hits) < k:
+            ranked = self._top_k(query, k, min_score, keep_matched)
+            for position in range(len(ranked)):
+                if len(hits) >= k:
+                    break
+                hit = ranked.hit(position)
+                if ranked.ordinal(position) not in defined:
+                    hits.append(ranked.ordinal(position), hit.score, hit.matched)
+        return hits
+
+    def similar(self, record_id: str, k: int) -> Optional[List[SearchHit]]:
+        """Records most similar to the given one, read from the neighbour graph; None if unknown"""
+        with self.lock.read():
+            ordinal = self._ordinals.get(record_id)
+            if ordinal is None:
+                return None
+            return [
+                SearchHit(self.records[other], round(similarity, 2))
+                for other, similarity in self.neighbors.neighbors(ordinal, k)
+            ]
+
+    def count_matches(self, query: str) -> int:
+        """Count records with any keyword, title, excerpt or symbol match, without scoring them"""
+        with self.lock.read():
+            return self._count_matches(query)
+
+    def _count_matches(self, query: str) -> int:
+        parsed = ParsedQuery(query)
+        phrases = self._phrase_matches(parsed)
+        ordinals: Set[int] = set()
+        for keyword in self._matching_keywords(parsed.lower, parsed.words):
+            ordinals.update(self._postings[keyword])
+        ordinals |= phrases.title | phrases.excerpt
+        if phrases.allowed is not None:
+            ordinals &= phrases.allowed
+        for location in self.symbols.match_query(query):
+            ordinal = self._ordinals.get(location.chunk_id)
+            if ordinal is not None:
+                ordinals.add(ordinal)
+        return len(ordinals)
+
+
+def _contains(postings: array, ordinal: int) -> bool:
+    position = bisect_left(postings, ordinal)
+    return position < len(postings) and postings[position] == ordinal
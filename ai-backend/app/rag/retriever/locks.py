@@ -0,0 +1,52 @@
+"""
+Reader/writer lock for the retriever indexes
+Searches run in worker threads while uploads add records, so readers share
+the index and a writer waits for them to drain; a waiting writer holds back
+new readers so a steady stream of searches cannot starve ingestion
+"""
+from contextlib import contextmanager
+from typing import Iterator
+import threading
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer; not reentrant"""
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock shared with other readers"""
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock exclusively"""
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
@@ -0,0 +1,120 @@
+"""
+Nearest-neighbour graph over material records
+Each record keeps its k most similar records, computed when it is added and
+updated incrementally as later records arrive, so "more like this" is a
+list lookup
+"""
+from array import array
+from math import sqrt
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+
+from app.rag.chunking.chunker import STOPWORDS
+from app.rag.retriever.positions import tokenize
+
+
+# Feature weights per field
+TITLE_FEATURE = 2.0
+KEYWORD_FEATURE = 2.0
+EXCERPT_FEATURE = 1.0
+
+
+def record_features(title: str, excerpt: str, keywords: Iterable[str]) -> Dict[str, float]:
+    """L2-normalized bag of weighted tokens describing a record"""
+    features: Dict[str, float] = {}
+    for text, weight in ((title, TITLE_FEATURE), (excerpt, EXCERPT_FEATURE)):
+        for token in tokenize(text):
+            if token not in STOPWORDS and len(token) > 1:
+                features[token] = features.get(token, 0.0) + weight
+    for keyword in keywords:
+        for token in tokenize(keyword):
+            if token not in STOPWORDS:
+                features[token] = features.get(token, 0.0) + KEYWORD_FEATURE
+    norm = sqrt(sum(w * w for w in features.values()))
+    if norm:
+        for token in features:
+            features[token] /= norm
+    return features
+
+
+def _similarity(mine: Dict[str, float], theirs: Dict[str, float]) -> float:
+    """Cosine similarity of two normalized feature bags"""
+    if len(theirs) < len(mine):
+        mine, theirs = theirs, mine
+    return sum(weight * theirs.get(token, 0.0) for token, weight in mine.items())
+
+
+class NeighborGraph:
+    """
+    k-nearest-neighbour lists keyed by record ordinal
+    Candidates are the records sharing one of a record's max_tokens heaviest
+    feature tokens, read from the newest max_postings entries of each
+    token -> ordinals posting list, so adding a record costs a bounded
+    number of comparisons rather than the size of the corpus. Lists are
+    approximate once a shared token is common enough to hit either cap;
+    None lifts a cap
+    """
+
+    def __init__(self, k: int = 10, max_tokens: Optional[int] = 16, max_postings: Optional[int] = 128):
+        self.k = k
+        self.max_tokens = max_tokens
+        self.max_postings = max_postings
+        self._features: List[Dict[str, float]] = []
+        self._postings: Dict[str, array] = {}
+        # Per ordinal: similarities ascending and the matching ordinals
+        self._scores: List[array] = []
+        self._neighbors: List[array] = []
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def add(self, ordinal: int, title: str, excerpt: str, keywords: Iterable[str]) -> None:
+        """Add a record and refresh the neighbour lists it affects"""
+        if ordinal != len(self._features):
+            raise ValueError(f"Expected ordinal {len(self._features)}, got {ordinal}")
+        self._features.append({})
+        self._scores.append(array("f"))
+        self._neighbors.append(array("I"))
+        self._link(ordinal, record_features(title, excerpt, keywords))
+
+    def _candidates(self, ordinal: int, features: Dict[str, float]) -> Dict[int, float]:
+        """Similarity of each bounded candidate to the given features"""
+        # Heaviest tokens first; among equal weights the rarer token is more telling
+        tokens = sorted(features, key=lambda token: (-features[token], len(self._postings.get(token, ()))))
+        candidates: Set[int] = set()
+        for token in tokens[:self.max_tokens]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                candidates.update(postings if self.max_postings is None else postings[-self.max_postings:])
+        candidates.discard(ordinal)
+        return {other: _similarity(features, self._features[other]) for other in candidates}
+
+    def _link(self, ordinal: int, features: Dict[str, float]) -> None:
+        similarities = self._candidates(ordinal, features)
+        self._features[ordinal] = features
+        for token in features:
+            self._postings.setdefault(token, array("I")).append(ordinal)
+        for other, similarity in similarities.items():
+            self._offer(ordinal, other, similarity)
+            self._offer(other, ordinal, similarity)
+
+    def _offer(self, ordinal: int, other: int, similarity: float) -> None:
+        scores = self._scores[ordinal]
+        neighbors = self._neighbors[ordinal]
+        if len(scores) >= self.k:
+            if similarity <= scores[0]:
+                return
+            del scores[0]
+            del neighbors[0]
+        position = bisect.bisect_left(scores, similarity)
+        scores.insert(position, similarity)
+        neighbors.insert(position, other)
+
+    def neighbors(self, ordinal: int, limit: int = 0) -> List[Tuple[int, float]]:
+        """(ordinal, similarity) pairs, most similar first"""
+        if not 0 <= ordinal < len(self._neighbors):
+            return []
+        scores = self._scores[ordinal]
+        neighbors = self._neighbors[ordinal]
+        count = len(scores) if limit <= 0 else min(limit, len(scores))
+        return [(neighbors[-1 - i], scores[-1 - i]) for i in range(count)]
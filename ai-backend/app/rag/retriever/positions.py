@@ -0,0 +1,157 @@
+"""
+Positional inverted index
+Token positions per field let phrase and proximity queries be answered by
+intersecting position lists instead of scanning raw text
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import heapq
+import re
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUOTED = re.compile(r'"([^"]*)"')
+
+FIELDS = ("title", "excerpt", "keywords")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of a text"""
+    return _TOKEN.findall(text.lower())
+
+
+class ParsedQuery:
+    """
+    A search query split into its parts
+    Quoted segments become required phrases; the rest of the query, with the
+    quotes removed, is matched against keywords and scored for phrase and
+    proximity as before
+    """
+    __slots__ = ("query", "lower", "words", "terms", "phrases")
+
+    def __init__(self, query: str):
+        self.query = query
+        self.lower = query.replace('"', " ").lower() if '"' in query else query.lower()
+        self.words = set(self.lower.split())
+        self.terms = tuple(tokenize(self.lower))
+        self.phrases = tuple(
+            tokens for tokens in (tuple(tokenize(segment)) for segment in _QUOTED.findall(query)) if tokens
+        )
+
+
+def contains_phrase(tokens: Sequence[str], phrase: Sequence[str]) -> bool:
+    """Whether phrase occurs as a contiguous run of tokens"""
+    width = len(phrase)
+    if not width:
+        return False
+    first = phrase[0]
+    for start in range(len(tokens) - width + 1):
+        if tokens[start] == first and tuple(tokens[start:start + width]) == tuple(phrase):
+            return True
+    return False
+
+
+def min_span(position_lists: Sequence[Sequence[int]]) -> int:
+    """Length of the shortest token window containing one position from every list"""
+    heap = [(positions[0], i, 0) for i, positions in enumerate(position_lists)]
+    heapq.heapify(heap)
+    high = max(position for position, _, _ in heap)
+    best = high - heap[0][0] + 1
+    while True:
+        low, i, j = heapq.heappop(heap)
+        best = min(best, high - low + 1)
+        if j + 1 == len(position_lists[i]):
+            return best
+        following = position_lists[i][j + 1]
+        high = max(high, following)
+        heapq.heappush(heap, (following, i, j + 1))
+
+
+def closeness(position_lists: Sequence[Sequence[int]]) -> float:
+    """1.0 when all terms are adjacent, shrinking as the window around them grows"""
+    return len(position_lists) / min_span(position_lists)
+
+
+def positions_of(tokens: Sequence[str], terms: Iterable[str]) -> Optional[List[List[int]]]:
+    """Position lists of each term within a token sequence, or None if one is absent"""
+    positions: Dict[str, List[int]] = {}
+    for position, token in enumerate(tokens):
+        positions.setdefault(token, []).append(position)
+    lists = []
+    for term in terms:
+        if term not in positions:
+            return None
+        lists.append(positions[term])
+    return lists
+
+
+class PositionalIndex:
+    """
+    Term -> record ordinal -> token positions, per field
+    Keyword positions leave a gap between keywords so phrases never span two
+    """
+
+    def __init__(self):
+        self._fields: Dict[str, Dict[str, Dict[int, array]]] = {field: {} for field in FIELDS}
+
+    def add(self, ordinal: int, title: str, excerpt: str, keywords: Iterable[str]) -> None:
+        """Index the searchable fields of one record"""
+        self._add_tokens("title", ordinal, enumerate(tokenize(title)))
+        self._add_tokens("excerpt", ordinal, enumerate(tokenize(excerpt)))
+        positioned: List[Tuple[int, str]] = []
+        offset = 0
+        for keyword in keywords:
+            tokens = tokenize(keyword)
+            positioned.extend((offset + i, token) for i, token in enumerate(tokens))
+            offset += len(tokens) + 1
+        self._add_tokens("keywords", ordinal, positioned)
+
+    def _add_tokens(self, field: str, ordinal: int, positioned: Iterable[Tuple[int, str]]) -> None:
+        postings = self._fields[field]
+        for position, token in positioned:
+            by_record = postings.get(token)
+            if by_record is None:
+                by_record = postings[token] = {}
+            positions = by_record.get(ordinal)
+            if positions is None:
+                positions = by_record[ordinal] = array("I")
+            positions.append(position)
+
+    def _with_all(self, field: str, terms: Sequence[str]) -> Tuple[List[Dict[int, array]], Set[int]]:
+        """Per-term postings and the ordinals containing every term, rarest term first"""
+        postings = self._fields[field]
+        by_term = [postings.get(term) for term in terms]
+        if not by_term or any(p is None for p in by_term):
+            return [], set()
+        rarest = min(by_term, key=len)
+        return by_term, {o for o in rarest if all(o in p for p in by_term)}
+
+    def phrase(self, field: str, phrase: Sequence[str]) -> Set[int]:
+        """Ordinals whose field contains the phrase"""
+        by_term, candidates = self._with_all(field, phrase)
+        found = set()
+        for ordinal in candidates:
+            tails = [by_term[i][ordinal] for i in range(1, len(phrase))]
+            for start in by_term[0][ordinal]:
+                if all(_contains(tail, start + i) for i, tail in enumerate(tails, 1)):
+                    found.add(ordinal)
+                    break
+        return found
+
+    def phrase_anywhere(self, phrase: Sequence[str]) -> Set[int]:
+        """Ordinals with the phrase in any field"""
+        found: Set[int] = set()
+        for field in FIELDS:
+            found |= self.phrase(field, phrase)
+        return found
+
+    def proximity(self, field: str, terms: Sequence[str]) -> Dict[int, float]:
+        """closeness() of the terms for each ordinal whose field contains them all"""
+        by_term, candidates = self._with_all(field, terms)
+        return {ordinal: closeness([p[ordinal] for p in by_term]) for ordinal in candidates}
+
+
+def _contains(positions: array, position: int) -> bool:
+    index = bisect_left(positions, position)
+    return index < len(positions) and positions[index] == position
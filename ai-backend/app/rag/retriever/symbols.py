@@ -0,0 +1,285 @@
+"""
+Code symbol index
+Function, class and variable definitions plus call relationships extracted
+from code chunks at ingestion time, keyed for constant-time lookup
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import ast
+import re
+
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CALL = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*\(")
+_MAX_LINE = 500
+
+# (pattern, kind) pairs for the language-agnostic lexer, applied line by line
+_DEFINITIONS = [
+    (re.compile(r"^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+    (re.compile(r"^\s*(?:pub(?:\(\w+\))?\s+)?(?:fn|func)\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"), "function"),
+    (re.compile(r"^\s*(?:(?:public|private|protected|abstract|final|static|export|sealed)\s+)*"
+                r"(?:class|struct|interface|enum|trait)\s+([A-Za-z_]\w*)"), "class"),
+    (re.compile(r"^\s*(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^)]*\)|[A-Za-z_$][\w$]*)\s*=>"), "function"),
+]
+
+# C-style "<type> name(params) {" definitions; the head is checked by _is_c_definition
+_C_FUNCTION = re.compile(
+    r"^\s*(?:(?:public|private|protected|static|final|virtual|inline|const|unsigned|synchronized)\s+)*"
+    r"([A-Za-z_][\w<>\[\],.:]*)([\s*&]+)([A-Za-z_]\w*)\s*\([^;{}()]*\)\s*(?:const\s*)?"
+    r"(?:throws\s+[\w.,\s]+)?(\{?)\s*$"
+)
+# Words that start statements, so "return merge(a, b)" is a call rather than a definition
+_STATEMENT_HEADS = frozenset({
+    "return", "yield", "await", "else", "new", "throw", "raise", "delete", "case", "goto", "do",
+    "print", "echo", "assert", "del", "not", "and", "or", "in", "is", "typeof", "import", "from",
+})
+_C_TYPES = frozenset({
+    "int", "long", "short", "char", "float", "double", "bool", "boolean", "byte", "auto", "size_t",
+    "string", "var", "signed", "unsigned", "struct", "void",
+})
+
+_NOT_CALLS = frozenset({
+    "if", "elif", "for", "while", "switch", "return", "catch", "sizeof", "new", "def", "class",
+    "function", "print", "super", "and", "or", "not", "in", "is", "with", "assert", "lambda",
+})
+
+
+def _is_c_definition(line: str) -> Optional[str]:
+    """
+    Function name when the line is a C-style definition: the head must not
+    be a statement keyword, and must look like a type unless a body follows
+    """
+    match = _C_FUNCTION.match(line)
+    if match is None:
+        return None
+    head, separator, name, brace = match.groups()
+    if head in _STATEMENT_HEADS:
+        return None
+    type_like = (
+        head in _C_TYPES or head[0].isupper()
+        or any(mark in head for mark in "<>[]:.") or any(mark in separator for mark in "*&")
+    )
+    return name if type_like or brace else None
+
+
+def normalize_symbol(name: str) -> str:
+    """Lookup key shared by snake_case, camelCase and spaced spellings"""
+    return name.replace("_", "").lower()
+
+
+class SymbolLocation:
+    """Where a symbol is defined"""
+    __slots__ = ("name", "kind", "chunk_id", "doc_id", "line", "scope")
+
+    def __init__(self, name: str, kind: str, chunk_id: str, doc_id: str, line: int, scope: Optional[str] = None):
+        self.name = name
+        self.kind = kind
+        self.chunk_id = chunk_id
+        self.doc_id = doc_id
+        self.line = line
+        self.scope = scope
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "chunk_id": self.chunk_id,
+            "doc_id": self.doc_id,
+            "line": self.line,
+            "scope": self.scope,
+        }
+
+    def __repr__(self) -> str:
+        return f"SymbolLocation({self.name!r}, {self.kind!r}, {self.chunk_id!r}:{self.line})"
+
+
+class _PythonExtractor(ast.NodeVisitor):
+    """Collect definitions and calls from a Python syntax tree"""
+
+    def __init__(self):
+        self.definitions: List[Tuple[str, str, int, Optional[str]]] = []
+        self.calls: List[Tuple[Optional[str], str]] = []
+        self.references: Set[str] = set()
+        self._scopes: List[Tuple[str, str]] = []
+
+    @property
+    def _scope(self) -> Optional[str]:
+        return ".".join(name for name, _ in self._scopes) or None
+
+    def _define(self, node, kind: str) -> None:
+        self.definitions.append((node.name, kind, node.lineno, self._scope))
+        self._scopes.append((node.name, kind))
+        self.generic_visit(node)
+        self._scopes.pop()
+
+    def visit_FunctionDef(self, node) -> None:
+        in_class = bool(self._scopes) and self._scopes[-1][1] == "class"
+        self._define(node, "method" if in_class else "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node) -> None:
+        self._define(node, "class")
+
+    def visit_Assign(self, node) -> None:
+        if not self._scopes:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.definitions.append((target.id, "variable", node.lineno, None))
+        self.generic_visit(node)
+
+    def visit_Call(self, node) -> None:
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        if name:
+            caller = next((n for n, kind in reversed(self._scopes) if kind != "class"), None)
+            self.calls.append((caller, name))
+        self.generic_visit(node)
+
+    def visit_Name(self, node) -> None:
+        self.references.add(node.id)
+
+
+def _lex(text: str) -> Tuple[List[Tuple[str, str, int, Optional[str]]], List[Tuple[Optional[str], str]], Set[str]]:
+    """Line-oriented fallback for other languages and unparseable fragments"""
+    definitions = []
+    calls = []
+    current: Optional[str] = None
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line[:_MAX_LINE]
+        defined = None
+        for pattern, kind in _DEFINITIONS:
+            match = pattern.match(line)
+            if match:
+                defined = match.group(1)
+                definitions.append((defined, kind, number, None))
+                if kind == "function":
+                    current = defined
+                break
+        else:
+            defined = _is_c_definition(line)
+            if defined is not None:
+                definitions.append((defined, "function", number, None))
+                current = defined
+        for callee in _CALL.findall(line):
+            if callee != defined and callee not in _NOT_CALLS:
+                calls.append((current, callee))
+    return definitions, calls, set(_IDENTIFIER.findall(text))
+
+
+def extract_symbols(text: str, language: Optional[str] = None):
+    """
+    Extract (definitions, calls, references) from source text
+    Python is parsed with ast; other languages, and Python fragments that do
+    not parse on their own, go through the lexer
+    """
+    if language == "python":
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            return _lex(text)
+        extractor = _PythonExtractor()
+        extractor.visit(tree)
+        return extractor.definitions, extractor.calls, extractor.references
+    return _lex(text)
+
+
+class SymbolIndex:
+    """
+    Symbol tables for code chunks
+    Definitions, call edges and identifier references are keyed by
+    normalized name, so lookups do not depend on corpus size
+    """
+
+    def __init__(self):
+        self._definitions: Dict[str, List[SymbolLocation]] = {}
+        self._callees: Dict[str, Set[str]] = {}
+        self._callers: Dict[str, Set[str]] = {}
+        self._call_sites: Dict[str, Set[str]] = {}
+        self._references: Dict[str, Set[str]] = {}
+        self._seen: Set[Tuple[str, str, int]] = set()
+        self.chunks = 0
+
+    def __len__(self) -> int:
+        return len(self._definitions)
+
+    def add_source(self, chunk_id: str, doc_id: str, text: str, language: Optional[str] = None, first_line: int = 1) -> int:
+        """Parse one code chunk and record its symbols; returns the number of new definitions"""
+        return self.add_parsed(chunk_id, doc_id, extract_symbols(text, language), first_line)
+
+    def add_parsed(self, chunk_id: str, doc_id: str, parsed: tuple, first_line: int = 1) -> int:
+        """Record the output of extract_symbols for one chunk"""
+        definitions, calls, references = parsed
+        added = 0
+        for name, kind, line, scope in definitions:
+            absolute = first_line + line - 1
+            # Overlapping chunks see the same definition twice
+            if (doc_id, name, absolute) in self._seen:
+                continue
+            self._seen.add((doc_id, name, absolute))
+            self._definitions.setdefault(normalize_symbol(name), []).append(
+                SymbolLocation(name, kind, chunk_id, doc_id, absolute, scope)
+            )
+            added += 1
+        for caller, callee in calls:
+            key = normalize_symbol(callee)
+            self._call_sites.setdefault(key, set()).add(chunk_id)
+            if caller:
+                self._callees.setdefault(normalize_symbol(caller), set()).add(callee)
+                self._callers.setdefault(key, set()).add(caller)
+        for name in references:
+            self._references.setdefault(normalize_symbol(name), set()).add(chunk_id)
+        self.chunks += 1
+        return added
+
+    def lookup(self, name: str) -> List[SymbolLocation]:
+        """Definitions of a symbol, in ingestion order"""
+        return self._definitions.get(normalize_symbol(name), [])
+
+    def callers(self, name: str) -> Set[str]:
+        """Names of functions that call the symbol"""
+        return self._callers.get(normalize_symbol(name), set())
+
+    def callees(self, name: str) -> Set[str]:
+        """Names the symbol calls"""
+        return self._callees.get(normalize_symbol(name), set())
+
+    def call_sites(self, name: str) -> Set[str]:
+        """Chunks containing a call to the symbol"""
+        return self._call_sites.get(normalize_symbol(name), set())
+
+    def references(self, name: str) -> Set[str]:
+        """Chunks mentioning the identifier"""
+        return self._references.get(normalize_symbol(name), set())
+
+    def match_query(self, query: str, max_words: int = 3) -> List[SymbolLocation]:
+        """
+        Definitions named by a free-text query
+        Runs of up to max_words adjacent identifiers are joined and looked up,
+        so "merge sort" finds merge_sort and mergeSort
+        """
+        if not self._definitions:
+            return []
+        words = _IDENTIFIER.findall(query)
+        found: List[SymbolLocation] = []
+        seen: Set[str] = set()
+        start = 0
+        while start < len(words):
+            # Prefer the longest run, so "merge sort" does not also report merge
+            for end in range(min(len(words), start + max_words), start, -1):
+                key = "".join(normalize_symbol(w) for w in words[start:end])
+                if len(key) >= 2 and key in self._definitions:
+                    if key not in seen:
+                        seen.add(key)
+                        found.extend(self._definitions[key])
+                    start = end
+                    break
+            else:
+                start += 1
+        return found
+
+
+def language_for(filename: str) -> Optional[str]:
+    """Language name used by extract_symbols for a file name"""
+    return "python" if filename.lower().endswith(".py") else None
+
@@ -0,0 +1,7 @@
+"""
+Vector Store Package
+Append-only segment storage for chunk content and embeddings
+"""
+from app.rag.vector_store.segments import Segment, SegmentStore, SegmentWriter, get_segment_store
+
+__all__ = ["Segment", "SegmentStore", "SegmentWriter", "get_segment_store"]
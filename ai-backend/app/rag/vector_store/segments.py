@@ -0,0 +1,239 @@
+"""
+Segment store
+Chunk text is appended to per-segment data files; offsets, lengths and
+embeddings stay in memory as typed arrays and content is read back on demand
+Writers may run in ingestion worker threads: a chunk's location is published
+only after its segment entry is complete, so readers never see half a chunk
+"""
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+import tempfile
+import threading
+
+from app.config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Segment:
+    """One append-only segment: a data file plus in-memory chunk metadata"""
+    __slots__ = (
+        "number", "path", "chunk_ids", "doc_ids", "offsets", "lengths", "starts", "ends", "vectors", "dim", "sealed",
+    )
+
+    def __init__(self, number: int, path: Path, dim: int):
+        self.number = number
+        self.path = path
+        self.chunk_ids: List[str] = []
+        self.doc_ids: List[str] = []
+        self.offsets = array("Q")  # Byte offset in the data file
+        self.lengths = array("I")  # Byte length in the data file
+        self.starts = array("Q")  # Character span within the source document
+        self.ends = array("Q")
+        self.vectors = array("f")
+        self.dim = dim
+        self.sealed = False
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def vector(self, position: int) -> array:
+        """Embedding of the chunk at a position in this segment"""
+        start = position * self.dim
+        return self.vectors[start:start + self.dim]
+
+
+class SegmentStore:
+    """Registry of segments and chunk locations"""
+
+    def __init__(self, directory: Path, dim: int = 256, max_chunks: int = 256):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.max_chunks = max_chunks
+        self.segments: List[Segment] = []
+        self._locations: Dict[str, Tuple[int, int]] = {}
+        self._documents: Dict[str, List[str]] = {}
+        self._segments_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._locations
+
+    def _new_segment(self) -> Segment:
+        # Concurrent uploads must not be given the same segment number
+        with self._segments_lock:
+            number = len(self.segments)
+            segment = Segment(number, self.directory / f"segment-{number:06d}.dat", self.dim)
+            self.segments.append(segment)
+        return segment
+
+    def writer(self) -> "SegmentWriter":
+        """Open a writer that appends to its own segments"""
+        return SegmentWriter(self)
+
+    def read(self, chunk_id: str) -> Optional[str]:
+        """Read a chunk's content from its segment file"""
+        location = self._locations.get(chunk_id)
+        if location is None:
+            return None
+        segment = self.segments[location[0]]
+        with open(segment.path, "rb") as handle:
+            handle.seek(segment.offsets[location[1]])
+            return handle.read(segment.lengths[location[1]]).decode("utf-8")
+
+    def read_many(self, chunk_ids: Sequence[str]) -> Dict[str, str]:
+        """Read several chunks, opening each segment file once"""
+        by_segment: Dict[int, List[Tuple[str, int]]] = {}
+        for chunk_id in chunk_ids:
+            location = self._locations.get(chunk_id)
+            if location is not None:
+                by_segment.setdefault(location[0], []).append((chunk_id, location[1]))
+        contents = {}
+        for number, entries in by_segment.items():
+            segment = self.segments[number]
+            with open(segment.path, "rb") as handle:
+                for chunk_id, position in sorted(entries, key=lambda e: segment.offsets[e[1]]):
+                    handle.seek(segment.offsets[position])
+                    contents[chunk_id] = handle.read(segment.lengths[position]).decode("utf-8")
+        return contents
+
+    def vector(self, chunk_id: str) -> Optional[array]:
+        """Embedding of a stored chunk"""
+        location = self._locations.get(chunk_id)
+        if location is None:
+            return None
+        return self.segments[location[0]].vector(location[1])
+
+    def span(self, chunk_id: str) -> Optional[Tuple[int, int]]:
+        """Character offsets of a chunk within its document"""
+        location = self._locations.get(chunk_id)
+        if location is None:
+            return None
+        segment = self.segments[location[0]]
+        return segment.starts[location[1]], segment.ends[location[1]]
+
+    def document_chunks(self, doc_id: str) -> List[str]:
+        """Chunk ids of a document in order"""
+        return self._documents.get(doc_id, [])
+
+    def read_document(self, doc_id: str) -> Optional[str]:
+        """Reassemble a document from its chunks, dropping the overlap between them"""
+        chunk_ids = self._documents.get(doc_id)
+        if not chunk_ids:
+            return None
+        contents = self.read_many(chunk_ids)
+        parts = []
+        covered = 0
+        for chunk_id in chunk_ids:
+            start, end = self.span(chunk_id)
+            if end > covered:
+                parts.append(contents[chunk_id][max(0, covered - start):])
+                covered = end
+        return "".join(parts)
+
+    def doc_id(self, chunk_id: str) -> Optional[str]:
+        """Document a stored chunk belongs to"""
+        location = self._locations.get(chunk_id)
+        if location is None:
+            return None
+        return self.segments[location[0]].doc_ids[location[1]]
+
+    def chunk_ids(self) -> Iterator[str]:
+        """All stored chunk ids in write order"""
+        for segment in self.segments:
+            yield from segment.chunk_ids
+
+    def stats(self) -> dict:
+        return {
+            "segments": len(self.segments),
+            "sealed_segments": sum(1 for s in self.segments if s.sealed),
+            "chunks": len(self._locations),
+            "documents": len(self._documents),
+            "directory": str(self.directory),
+        }
+
+
+class SegmentWriter:
+    """
+    Appends chunks to segments of a SegmentStore
+    Text goes straight to disk; only offsets and embeddings are kept in memory
+    """
+
+    def __init__(self, store: SegmentStore):
+        self.store = store
+        self._segment: Optional[Segment] = None
+        self._handle = None
+        self._position = 0
+
+    def add(
+        self,
+        chunk_id: str,
+        doc_id: str,
+        text: str,
+        vector: Sequence[float],
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> None:
+        """Append one chunk, sealing the current segment when it is full"""
+        if chunk_id in self.store:
+            raise ValueError(f"Chunk '{chunk_id}' already stored")
+        if len(vector) != self.store.dim:
+            raise ValueError(f"Expected a {self.store.dim}-dimensional vector, got {len(vector)}")
+        if self._segment is None:
+            self._segment = self.store._new_segment()
+            self._handle = open(self._segment.path, "ab")
+            self._position = 0
+
+        data = text.encode("utf-8")
+        self._handle.write(data)
+        self._handle.flush()
+
+        segment = self._segment
+        position = len(segment)
+        segment.offsets.append(self._position)
+        segment.lengths.append(len(data))
+        segment.starts.append(start)
+        segment.ends.append(start + len(text) if end is None else end)
+        segment.vectors.extend(vector)
+        segment.doc_ids.append(doc_id)
+        segment.chunk_ids.append(chunk_id)
+        self._position += len(data)
+        # Publish last, so a reader that finds the location finds the whole entry
+        self.store._documents.setdefault(doc_id, []).append(chunk_id)
+        self.store._locations[chunk_id] = (segment.number, position)
+
+        if len(segment) >= self.store.max_chunks:
+            self.seal()
+
+    def seal(self) -> None:
+        """Close the current segment; the next add starts a new one"""
+        if self._segment is not None:
+            self._handle.close()
+            self._segment.sealed = True
+            logger.info(f"Sealed segment {self._segment.number} with {len(self._segment)} chunks")
+            self._segment = None
+            self._handle = None
+
+    def close(self) -> None:
+        self.seal()
+
+    def __enter__(self) -> "SegmentWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@lru_cache()
+def get_segment_store() -> SegmentStore:
+    """Get the process-wide segment store"""
+    settings = get_settings()
+    directory = settings.rag_data_dir or tempfile.mkdtemp(prefix="rag-segments-")
+    return SegmentStore(Path(directory), settings.rag_embedding_dim, settings.rag_segment_max_chunks)
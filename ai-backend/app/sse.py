@@ -0,0 +1,25 @@
+"""
+Server-sent events
+Formats events for text/event-stream responses; each event is flushed as
+soon as it is yielded, so clients see the first tokens before generation ends
+"""
+from typing import Any, AsyncIterator
+import json
+
+from fastapi.responses import StreamingResponse
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Stop nginx from buffering the stream
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One SSE frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Streaming response for an async iterator of sse_event() frames"""
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Standalone performance benchmarks, runnable with `python -m benchmarks.<name>`
+"""
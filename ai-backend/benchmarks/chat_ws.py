@@ -0,0 +1,159 @@
+"""
+Chat WebSocket benchmark
+Runs the app in one uvicorn worker, holds many /chat/ws connections open
+and sends turns over them, reporting connections held, messages per second
+and turn latency. The same turns sent as one POST /chat per turn on a new
+connection give the polling baseline
+
+Run with: python -m benchmarks.chat_ws
+"""
+from typing import List, Optional
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+import websockets
+
+from app.chat.connection import get_connection_stats
+from app.config import get_settings
+from app.main import app
+
+
+MESSAGES = ["Explain recursion", "Explain that again", "Search for binary search tree", "thanks"]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class AppServer:
+    """The app served by a single uvicorn worker in a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "AppServer":
+        config = uvicorn.Config(app, host=self.host, port=self.port, log_level="warning", loop="asyncio", ws_max_queue=32)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("App server failed to start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+            self._server = None
+
+    def __enter__(self) -> "AppServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+async def _websocket_client(url: str, turns: int, latencies: List[float], ready: asyncio.Event, go: asyncio.Event) -> None:
+    async with websockets.connect(url) as websocket:
+        json.loads(await websocket.recv())  # Session frame
+        ready.set()
+        await go.wait()
+        for turn in range(turns):
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"message": MESSAGES[turn % len(MESSAGES)]}))
+            while json.loads(await websocket.recv())["type"] != "done":
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _drive_websockets(base: str, connections: int, turns: int) -> dict:
+    url = f"ws://{base}{get_settings().api_prefix}/chat/ws"
+    latencies: List[float] = []
+    go = asyncio.Event()
+    readies = [asyncio.Event() for _ in range(connections)]
+    clients = [asyncio.ensure_future(_websocket_client(url, turns, latencies, ready, go)) for ready in readies]
+    await asyncio.gather(*(ready.wait() for ready in readies))
+    held = get_connection_stats().open
+    started = time.perf_counter()
+    go.set()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+    return {
+        "connections": held,
+        "messages": len(latencies),
+        "messages_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+async def _drive_polling(base: str, connections: int, turns: int) -> dict:
+    """One POST /chat per turn, each on a fresh connection as the polling frontend does"""
+    url = f"http://{base}{get_settings().api_prefix}/chat"
+    latencies: List[float] = []
+    # No keep-alive, so every turn opens a connection
+    http = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0), timeout=60)
+
+    async def client() -> None:
+        history: List[dict] = []
+        for turn in range(turns):
+            message = MESSAGES[turn % len(MESSAGES)]
+            started = time.perf_counter()
+            response = await http.post(url, json={"messages": history, "message": message})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            history += [{"role": "user", "content": message}, {"role": "assistant", "content": response.json()["response"]}]
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(client() for _ in range(connections)))
+    finally:
+        await http.aclose()
+    elapsed = time.perf_counter() - started
+    return {
+        "connections": connections,
+        "messages": len(latencies),
+        "messages_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+def measure_chat(connections: int = 100, turns: int = 20, mode: str = "websocket") -> dict:
+    """Turns per second through one worker, over held WebSockets or one POST per turn"""
+    drive = _drive_websockets if mode == "websocket" else _drive_polling
+    with AppServer() as server:
+        report = asyncio.run(drive(f"{server.host}:{server.port}", connections, turns))
+    report["mode"] = mode
+    return report
+
+
+def main():
+    """Print messages per second and latency for WebSockets and polling"""
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    for connections in (10, 100, 500):
+        for mode in ("websocket", "polling"):
+            report = measure_chat(connections=connections, turns=20, mode=mode)
+            print(
+                f"{mode:<9} connections={report['connections']:<4} "
+                f"{report['messages_per_second']:8.1f} msg/s  "
+                f"p50={report['p50_ms']:6.1f} ms  p95={report['p95_ms']:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+OpenAI-compatible stub server
+Serves POST /v1/chat/completions on localhost with configurable latency and
+injected faults, so provider code can be exercised under concurrency with
+no network access
+
+Run with: python -m benchmarks.llm_stub --port 8100 --latency 0.05
+"""
+from typing import Callable, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+
+def echo_reply(messages: List[dict]) -> str:
+    """Default reply: restate the last user message"""
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return f"Stub completion for: {prompt[:500]}"
+
+
+class LLMStubServer:
+    """
+    Stub provider running uvicorn in a background thread
+    latency, jitter, failure_rate, failure_status and chunk_delay may be changed
+    while it runs; "stream": true requests get SSE chunks chunk_delay apart
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        reply: Callable[[List[dict]], str] = echo_reply,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+        chunk_delay: float = 0.0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.reply = reply
+        self.chunk_delay = chunk_delay
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections: Set[Tuple[str, int]] = set()
+        self._random = random.Random(seed)
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = self._create_app()
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as LLM_BASE_URL"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI(title="LLM Stub")
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if request.client:
+                self.connections.add((request.client.host, request.client.port))
+            try:
+                body = await request.json()
+                delay = self.latency + self._random.uniform(0, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self.failure_rate and self._random.random() < self.failure_rate:
+                    self.failures += 1
+                    return JSONResponse({"error": {"message": "Injected failure"}}, status_code=self.failure_status)
+                messages = body.get("messages", [])
+                text = self.reply(messages)
+                if body.get("stream"):
+                    self.in_flight += 1  # Held until the stream ends
+                    return StreamingResponse(self._chunks(text, body.get("model", "stub")), media_type="text/event-stream")
+                prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+                return {
+                    "id": f"stub-{self.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(text.split()),
+                        "total_tokens": prompt_tokens + len(text.split()),
+                    },
+                }
+            finally:
+                self.in_flight -= 1
+
+        return app
+
+    async def _chunks(self, text: str, model: str):
+        """OpenAI-style stream: one chunk per word, then [DONE]"""
+        try:
+            for delta in re.findall(r"\S+\s*|\s+", text):
+                chunk = {"object": "chat.completion.chunk", "model": model, "choices": [{"index": 0, "delta": {"content": delta}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if self.chunk_delay > 0:
+                    await asyncio.sleep(self.chunk_delay)
+            yield "data: [DONE]\n\n"
+        finally:
+            self.in_flight -= 1
+
+    def start(self) -> "LLMStubServer":
+        """Start serving and wait until the socket is bound"""
+        # The asyncio loop keeps uvicorn from installing the uvloop policy for the whole process
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning", lifespan="off", loop="asyncio")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("LLM stub server failed to start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+            self._server = None
+
+    def __enter__(self) -> "LLMStubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    """Serve the stub until interrupted"""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    args = parser.parse_args()
+
+    stub = LLMStubServer(args.latency, args.jitter, args.failure_rate, port=args.port)
+    print(f"Serving stub completions at http://127.0.0.1:{args.port}/v1")
+    uvicorn.run(stub.app, host="127.0.0.1", port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
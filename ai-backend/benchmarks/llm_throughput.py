@@ -0,0 +1,78 @@
+"""
+LLM client throughput benchmark
+Drives the pooled provider client against the local stub server and reports
+requests per second, latency percentiles and connections opened
+
+Run with: python -m benchmarks.llm_throughput
+"""
+from typing import List
+import asyncio
+import statistics
+import time
+
+from app.config import Settings
+from app.generation.provider import OpenAICompatibleProvider, create_http_client
+from benchmarks.llm_stub import LLMStubServer
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _drive(url: str, requests: int, concurrency: int, max_connections: int) -> dict:
+    settings = Settings(llm_max_connections=max_connections, llm_max_keepalive_connections=max_connections)
+    provider = OpenAICompatibleProvider(create_http_client(settings, url), "stub")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    messages = [{"role": "user", "content": "Explain binary search trees"}]
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await provider.complete(messages, max_tokens=64)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(requests)))
+    finally:
+        await provider.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_second": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+def measure_throughput(
+    requests: int = 200,
+    concurrency: int = 50,
+    max_connections: int = 20,
+    latency: float = 0.02,
+) -> dict:
+    """Send requests through one pooled client and report throughput and connection reuse"""
+    with LLMStubServer(latency=latency) as stub:
+        report = asyncio.run(_drive(stub.url, requests, concurrency, max_connections))
+        report["connections_opened"] = len(stub.connections)
+        report["max_in_flight"] = stub.max_in_flight
+    return report
+
+
+def main():
+    """Print the throughput report"""
+    for concurrency in (1, 10, 50):
+        report = measure_throughput(requests=200, concurrency=concurrency)
+        print(
+            f"concurrency={concurrency:<3} "
+            f"{report['requests_per_second']:8.1f} req/s  "
+            f"p50={report['p50_ms']:6.1f} ms  p95={report['p95_ms']:6.1f} ms  "
+            f"connections={report['connections_opened']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
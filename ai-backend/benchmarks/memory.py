@@ -0,0 +1,112 @@
+"""
+Memory benchmark for search hot-path objects
+Uses tracemalloc to report bytes per loaded document and peak allocation per request
+
+Run with: python -m benchmarks.memory
+"""
+import asyncio
+import gc
+import tracemalloc
+from typing import Callable, List
+
+from app.api.search import MOCK_MATERIALS, SearchRequest, search_materials
+from app.api.chat import perform_search
+from app.rag.records import load_records
+
+
+def synthetic_materials(n_docs: int) -> List[dict]:
+    """
+    Build n material dicts shaped like MOCK_MATERIALS
+    Strings are created at runtime so repeated fields are distinct objects,
+    the way they would be after JSON decoding
+    """
+    materials = []
+    for i in range(n_docs):
+        base = MOCK_MATERIALS[i % len(MOCK_MATERIALS)]
+        week = i % 12 + 1
+        materials.append({
+            "id": f"{base['id']}-{i}",
+            "title": f"{base['title']} ({i})",
+            "type": "".join(base["type"]),
+            "excerpt": f"{base['excerpt']} Part {i}.",
+            "source": f"Week {week} - {base['source'].split(' - ')[-1]}",
+            "week": week,
+            "keywords": ["".join(k) for k in base["keywords"]],
+        })
+    return materials
+
+
+def _traced_size(build: Callable[[], object]) -> int:
+    """Return the bytes still allocated by the object build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = build()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+
+def bytes_per_document(n_docs: int = 2000) -> dict:
+    """Compare retained bytes per document for dicts and compact records"""
+    dict_bytes = _traced_size(lambda: synthetic_materials(n_docs))
+    # The source dicts are dropped once loaded, so only what records retain is counted
+    record_bytes = _traced_size(lambda: load_records(synthetic_materials(n_docs)))
+    return {
+        "documents": n_docs,
+        "dict_bytes_per_doc": dict_bytes / n_docs,
+        "record_bytes_per_doc": record_bytes / n_docs,
+    }
+
+
+def peak_request_allocation(query: str = "binary search tree insert", iterations: int = 50) -> dict:
+    """Report the peak bytes allocated while serving a single search and chat lookup"""
+    request = SearchRequest(query=query)
+    loop = asyncio.new_event_loop()
+    try:
+        # Warm up caches and lazily created objects outside the measurement
+        loop.run_until_complete(search_materials(request))
+        loop.run_until_complete(perform_search(query))
+
+        peaks = {"search_materials": 0, "perform_search": 0}
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for _ in range(iterations):
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                loop.run_until_complete(search_materials(request))
+                _, peak = tracemalloc.get_traced_memory()
+                peaks["search_materials"] = max(peaks["search_materials"], peak - base)
+
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                loop.run_until_complete(perform_search(query))
+                _, peak = tracemalloc.get_traced_memory()
+                peaks["perform_search"] = max(peaks["perform_search"], peak - base)
+        finally:
+            tracemalloc.stop()
+    finally:
+        loop.close()
+    return {"query": query, "peak_bytes": peaks}
+
+
+def main():
+    """Print the memory report"""
+    docs = bytes_per_document()
+    print(f"Documents loaded:        {docs['documents']}")
+    print(f"Dict bytes per doc:      {docs['dict_bytes_per_doc']:.0f}")
+    print(f"Record bytes per doc:    {docs['record_bytes_per_doc']:.0f}")
+
+    peaks = peak_request_allocation()
+    print(f"Peak allocation for query '{peaks['query']}':")
+    for name, peak in peaks["peak_bytes"].items():
+        print(f"  {name:<22} {peak} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Prompt rendering benchmark
+Compares rendering a precompiled template against re-reading and
+substituting the template file on every request
+
+Run with: python -m benchmarks.prompt_render
+"""
+import timeit
+
+from app.generation.templates import PROMPTS_DIR, PromptRegistry, _PLACEHOLDER
+
+
+TEMPLATES = ("generate/notes", "generate/slides", "generate/code_python")
+VALUES = {"prompt": "Binary Search Trees", "language": "python"}
+
+
+def _render_uncompiled(name: str) -> str:
+    source = (PROMPTS_DIR / f"{name}.tmpl").read_text(encoding="utf-8")
+    return _PLACEHOLDER.sub(lambda m: VALUES[m.group(1)], source)
+
+
+def render_cost(number: int = 2000) -> dict:
+    """Microseconds per render for each template, compiled and uncompiled"""
+    registry = PromptRegistry(PROMPTS_DIR, reload_interval=1.0)
+    report = {}
+    for name in TEMPLATES:
+        compiled = timeit.timeit(lambda: registry.render(name, **VALUES), number=number)
+        uncompiled = timeit.timeit(lambda: _render_uncompiled(name), number=number)
+        report[name] = {
+            "compiled_us": compiled / number * 1e6,
+            "uncompiled_us": uncompiled / number * 1e6,
+            "static_chars": registry.get(name).static_length,
+        }
+    return report
+
+
+def main():
+    """Print the render cost report"""
+    for name, costs in render_cost().items():
+        print(
+            f"{name:<22} compiled {costs['compiled_us']:6.2f} us   "
+            f"read+substitute {costs['uncompiled_us']:6.2f} us   "
+            f"static {costs['static_chars']} chars"
+        )
+
+
+if __name__ == "__main__":
+    main()
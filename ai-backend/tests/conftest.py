@@ -3,7 +3,13 @@ Pytest configuration and fixtures
 """
 import pytest
 from fastapi.testclient import TestClient
+from app import main
 from app.main import create_app
+from app.api import search
+from app.config import Settings
+from app.generation.cache import get_generation_cache
+from app.rag.retriever import MaterialIndex
+from benchmarks.llm_stub import LLMStubServer
 
 
 @pytest.fixture(scope="module")
@@ -29,3 +35,35 @@ def api_prefix():
     Get API prefix from settings
     """
     return "/api/v1"
+
+
+@pytest.fixture
+def material_index(monkeypatch):
+    """
+    Replace the shared search index with a fresh one so uploads made by a
+    test do not leak into other tests
+    """
+    index = MaterialIndex(search.MATERIAL_RECORDS)
+    monkeypatch.setattr(search, "MATERIAL_INDEX", index)
+    return index
+
+
+@pytest.fixture(scope="session")
+def llm_stub():
+    """
+    Local OpenAI-compatible stub server shared by provider tests
+    """
+    with LLMStubServer() as stub:
+        yield stub
+
+
+@pytest.fixture
+def llm_client(test_app, llm_stub, monkeypatch):
+    """
+    Test client whose lifespan opens an LLM provider pointed at the stub
+    """
+    settings = Settings(llm_base_url=llm_stub.url, llm_model="stub-model")
+    monkeypatch.setattr(main, "get_settings", lambda: settings)
+    get_generation_cache().clear()
+    with TestClient(test_app) as client:
+        yield client
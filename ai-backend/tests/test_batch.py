@@ -0,0 +1,109 @@
+"""
+Tests for batch generation
+"""
+from app.api import generate
+from app.api.generate import GenerateRequest, template_content
+from app.generation.artifacts import ArtifactStore
+from app.generation.cache import get_generation_cache
+from app.generation.prefetch import Prefetcher
+from tests.test_streaming import parse_events
+
+
+TOPICS = ["Arrays", "Stacks", "Queues", "Hash Tables", "Binary Trees", "Heaps", "Graphs", "Tries", "Sorting", "Searching", "Recursion", "Dynamic Programming"]
+
+
+class TestBatchGenerate:
+    """Test suite for POST /generate/batch"""
+    
+    def test_results_in_request_order(self, client, api_prefix):
+        """Test template results come back in the order they were requested"""
+        items = [{"type": "notes", "prompt": "Arrays"}, {"type": "code", "prompt": "Stack"}, {"type": "summary", "prompt": "Queues"}]
+        response = client.post(f"{api_prefix}/generate/batch", json={"items": items})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [result["index"] for result in data["results"]] == [0, 1, 2]
+        assert data["succeeded"] == 3
+        assert data["failed"] == 0
+        for item, result in zip(items, data["results"]):
+            assert result["type"] == item["type"]
+            assert result["content"] == template_content(GenerateRequest(**item))
+            assert result["sources"]
+    
+    def test_empty_batch_rejected(self, client, api_prefix):
+        """Test a batch needs at least one item"""
+        response = client.post(f"{api_prefix}/generate/batch", json={"items": []})
+        
+        assert response.status_code == 422
+    
+    def test_oversized_batch_rejected(self, client, api_prefix):
+        """Test batches above the item limit are refused"""
+        items = [{"type": "notes", "prompt": f"Topic {n}"} for n in range(201)]
+        response = client.post(f"{api_prefix}/generate/batch", json={"items": items})
+        
+        assert response.status_code == 413
+    
+    def test_concurrency_is_bounded(self, llm_client, llm_stub, api_prefix):
+        """Test no more than the requested number of items reach the provider at once"""
+        llm_stub.latency = 0.03
+        llm_stub.max_in_flight = 0
+        items = [{"type": "notes", "prompt": topic} for topic in TOPICS]
+        try:
+            response = llm_client.post(f"{api_prefix}/generate/batch", json={"items": items, "concurrency": 3})
+        finally:
+            llm_stub.latency = 0.0
+        
+        data = response.json()
+        assert data["succeeded"] == len(TOPICS)
+        assert all(topic in result["content"] for topic, result in zip(TOPICS, data["results"]))
+        assert 1 < llm_stub.max_in_flight <= 3
+    
+    def test_provider_failures_reported_per_item(self, llm_client, llm_stub, api_prefix):
+        """Test failed items carry an error instead of template content"""
+        get_generation_cache().clear()
+        llm_stub.failure_rate = 1.0
+        try:
+            response = llm_client.post(f"{api_prefix}/generate/batch", json={"items": [{"type": "notes", "prompt": "Tries"}]})
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        result = response.json()["results"][0]
+        assert result["status"] == "error"
+        assert result["content"] is None
+        assert "HTTP 503" in result["error"]
+        assert response.json()["failed"] == 1
+    
+    def test_items_use_artifacts_and_count_as_foreground(self, llm_client, llm_stub, api_prefix, tmp_path, monkeypatch):
+        """Test batch items are served from materialized artifacts first and provider items yield prefetching"""
+        store = ArtifactStore(str(tmp_path))
+        store.put(("generate", "notes", None), "Graphs", "# Stored graph notes")
+        prefetcher = Prefetcher()
+        foreground = []
+        generate_with_provider = generate.generate_with_provider
+        
+        async def watched(provider, request):
+            foreground.append(prefetcher.foreground)
+            return await generate_with_provider(provider, request)
+        
+        monkeypatch.setattr(generate, "active_artifact_store", lambda: store)
+        monkeypatch.setattr(generate, "active_prefetcher", lambda: prefetcher)
+        monkeypatch.setattr(generate, "generate_with_provider", watched)
+        requests = llm_stub.requests
+        items = [{"type": "notes", "prompt": "Graphs"}, {"type": "notes", "prompt": "Tries"}]
+        
+        results = llm_client.post(f"{api_prefix}/generate/batch", json={"items": items}).json()["results"]
+        
+        assert results[0]["content"] == "# Stored graph notes"
+        assert "Tries" in results[1]["content"]
+        assert foreground == [1]
+        assert llm_stub.requests == requests + 1
+    
+    def test_streamed_batch(self, client, api_prefix):
+        """Test stream=true sends an item event per result and a done event"""
+        items = [{"type": "notes", "prompt": topic} for topic in TOPICS[:4]]
+        response = client.post(f"{api_prefix}/generate/batch", json={"items": items, "stream": True})
+        
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.text)
+        assert sorted(data["index"] for event, data in events if event == "item") == [0, 1, 2, 3]
+        assert events[-1] == ("done", {"succeeded": 4, "failed": 0})
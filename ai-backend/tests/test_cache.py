@@ -0,0 +1,128 @@
+"""
+Tests for the semantic generation cache
+"""
+import pytest
+
+from app.generation.cache import GenerationCache, normalize_prompt
+
+
+BUCKET = ("generate", "notes", None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestGenerationCache:
+    """Test suite for GenerationCache"""
+    
+    def test_normalize_prompt(self):
+        """Test wording that does not change the content is dropped"""
+        assert normalize_prompt("Notes on Recursion, please!") == "recursion"
+        assert normalize_prompt("Give me some notes about recursion") == "recursion"
+        assert normalize_prompt("the") == "the"
+    
+    def test_exact_hit(self):
+        """Test differently worded prompts share an entry after normalization"""
+        cache = GenerationCache()
+        cache.put(BUCKET, "notes on recursion", "content")
+        
+        assert cache.get(BUCKET, "Recursion notes please") == "content"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["bytes_saved"] == len("content")
+    
+    def test_semantic_hit(self):
+        """Test a similar prompt is served above the threshold only"""
+        cache = GenerationCache(similarity_threshold=0.8)
+        cache.put(BUCKET, "recursion in python", "content")
+        
+        assert cache.get(BUCKET, "python recursion basics") == "content"
+        assert cache.get(BUCKET, "python generators") is None
+        assert cache.stats()["semantic_hits"] == 1
+    
+    def test_buckets_are_isolated(self):
+        """Test type, language and endpoint are part of the key"""
+        cache = GenerationCache()
+        cache.put(BUCKET, "recursion", "notes")
+        
+        assert cache.get(("generate", "slides", None), "recursion") is None
+        assert cache.get(("generate", "code", "java"), "recursion") is None
+    
+    def test_ttl(self):
+        """Test entries expire after the TTL"""
+        clock = FakeClock()
+        cache = GenerationCache(ttl=10, clock=clock)
+        cache.put(BUCKET, "recursion", "content")
+        clock.now = 11
+        
+        assert cache.get(BUCKET, "recursion") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 0
+    
+    def test_byte_cap_evicts_least_recently_used(self):
+        """Test the byte budget evicts the least recently used entry"""
+        cache = GenerationCache(max_bytes=600, similarity_threshold=2)
+        cache.put(BUCKET, "stacks", "s" * 200)
+        cache.put(BUCKET, "queues", "q" * 200)
+        cache.get(BUCKET, "stacks")
+        cache.put(BUCKET, "heaps", "h" * 200)
+        
+        assert cache.get(BUCKET, "queues") is None
+        assert cache.get(BUCKET, "stacks") is not None
+        assert cache.bytes <= 600
+        assert cache.stats()["evictions"] == 1
+    
+    def test_oversized_entry_is_not_stored(self):
+        """Test content larger than the whole budget is skipped"""
+        cache = GenerationCache(max_bytes=100)
+        
+        assert cache.put(BUCKET, "recursion", "x" * 200) is False
+        assert len(cache) == 0
+
+
+class TestGenerationCacheRouters:
+    """Test suite for cached generation endpoints"""
+    
+    def test_generate_served_from_cache(self, llm_client, llm_stub, api_prefix):
+        """Test a reworded request does not reach the provider"""
+        first = llm_client.post(f"{api_prefix}/generate", json={"type": "notes", "prompt": "notes on recursion"})
+        requests = llm_stub.requests
+        second = llm_client.post(f"{api_prefix}/generate", json={"type": "notes", "prompt": "Recursion notes, please"})
+        
+        assert second.json()["content"] == first.json()["content"]
+        assert llm_stub.requests == requests
+    
+    def test_generation_cache_respects_context(self, llm_client, llm_stub, api_prefix):
+        """Test /generation/generate caches per context"""
+        body = {"prompt": "Stacks", "generation_type": "theory", "context": ["LIFO"]}
+        llm_client.post(f"{api_prefix}/generation/generate", json=body)
+        cached = llm_client.post(f"{api_prefix}/generation/generate", json=body)
+        requests = llm_stub.requests
+        llm_client.post(f"{api_prefix}/generation/generate", json={**body, "context": ["push and pop"]})
+        
+        assert cached.json()["message"] == "Content served from cache"
+        assert llm_stub.requests == requests + 1
+    
+    def test_generation_cache_keyed_on_topics(self, llm_client, llm_stub, api_prefix):
+        """Test the same topics in any order hit the cache, whatever excerpts the search returns"""
+        body = {"prompt": "Compare these", "generation_type": "theory", "topics": ["hash table", "linked list"]}
+        llm_client.post(f"{api_prefix}/generation/generate", json=body)
+        requests = llm_stub.requests
+        cached = llm_client.post(f"{api_prefix}/generation/generate", json={**body, "topics": ["Linked list", "hash table"]})
+        
+        assert cached.json()["message"] == "Content served from cache"
+        assert llm_stub.requests == requests
+    
+    def test_cache_metrics_exposed(self, llm_client, api_prefix):
+        """Test cache counters are reported by /health/metrics"""
+        llm_client.post(f"{api_prefix}/generate", json={"type": "summary", "prompt": "queues"})
+        llm_client.post(f"{api_prefix}/generate", json={"type": "summary", "prompt": "queues"})
+        
+        metrics = llm_client.get(f"{api_prefix}/health/metrics").json()["metrics"]["generation_cache"]
+        assert metrics["hits"] >= 1
+        assert metrics["hit_rate"] > 0
+        assert metrics["bytes_saved"] > 0
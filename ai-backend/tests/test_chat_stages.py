@@ -0,0 +1,235 @@
+"""
+Tests for the chat stage graph
+"""
+import asyncio
+import gc
+import time
+
+import pytest
+
+from app.api import chat
+from app.api.chat import generate_response
+from app.api.search import MATERIAL_INDEX
+from app.chat.stages import STAGE_COUNTS, ChatStages
+from app.config import Settings
+from app.rag.records import MaterialRecord
+from tests.test_chat_ws import receive_turn
+from app.generation.tool_controller import ToolCall
+
+
+async def slow_value(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+@pytest.fixture
+def fast_deadlines(monkeypatch):
+    """Stage deadlines short enough to test dropping slow stages"""
+    settings = Settings(chat_stage_timeout=0.1, chat_generation_timeout=0.2)
+    monkeypatch.setattr(chat, "get_settings", lambda: settings)
+    # Collect now, so a full collection of the suite's heap does not land inside a timed turn
+    gc.collect()
+    return settings
+
+
+class TestChatStages:
+    """Test suite for reading stages with deadlines"""
+    
+    def test_stages_run_concurrently(self):
+        """Test stages start together and each is read as soon as it is ready"""
+        async def run():
+            calls = [
+                ToolCall("a", slow_value, {"value": 1, "delay": 0.1}),
+                ToolCall("b", slow_value, {"value": 2, "delay": 0.1}),
+            ]
+            started = time.perf_counter()
+            async with ChatStages(calls) as stages:
+                results = [await stages.result("a"), await stages.result("b")]
+            return results, time.perf_counter() - started
+        
+        results, elapsed = asyncio.run(run())
+        
+        assert results == [1, 2]
+        assert elapsed < 0.18
+    
+    def test_late_stage_gets_default(self):
+        """Test a stage past its deadline is dropped without holding up the others"""
+        async def run():
+            calls = [
+                ToolCall("slow", slow_value, {"value": "late", "delay": 5}),
+                ToolCall("fast", slow_value, {"value": "ready", "delay": 0}),
+            ]
+            started = time.perf_counter()
+            async with ChatStages(calls, stage_timeout=0.05) as stages:
+                fast = await stages.result("fast")
+                slow = await stages.result("slow", "dropped")
+            return fast, slow, time.perf_counter() - started
+        
+        fast, slow, elapsed = asyncio.run(run())
+        
+        assert (fast, slow) == ("ready", "dropped")
+        assert elapsed < 1
+        assert STAGE_COUNTS["slow"]["timeout"] >= 1
+    
+    def test_unscheduled_stage_gets_default(self):
+        """Test reading a stage that was never scheduled returns the default"""
+        async def run():
+            async with ChatStages([]) as stages:
+                return await stages.result("related", ([], []))
+        
+        assert asyncio.run(run()) == ([], [])
+    
+    def test_close_cancels_unread_stages(self):
+        """Test leaving the context cancels stages nobody read"""
+        cancelled = []
+        
+        async def never_read():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        
+        async def run():
+            async with ChatStages([ToolCall("unread", never_read)]):
+                await asyncio.sleep(0.01)
+        
+        asyncio.run(run())
+        
+        assert cancelled == [True]
+
+
+class TestChatStageGraph:
+    """Test suite for concurrent stages in the chat pipeline"""
+    
+    def test_generation_overlaps_related_materials(self, monkeypatch, fast_deadlines):
+        """Test related materials are retrieved while content is generated"""
+        async def slow_content(content_type, topic):
+            await asyncio.sleep(0.1)
+            return f"{content_type} on {topic}"
+        
+        related_materials = chat.related_materials
+        
+        async def slow_related(topic, limit=3):
+            await asyncio.sleep(0.08)
+            return await related_materials(topic, limit)
+        
+        monkeypatch.setattr(chat, "generate_content", slow_content)
+        monkeypatch.setattr(chat, "related_materials", slow_related)
+        
+        async def run():
+            started = time.perf_counter()
+            response = await generate_response("Generate notes on sorting algorithms", [])
+            return response, time.perf_counter() - started
+        
+        (text, sources, search_results, generated, action), elapsed = asyncio.run(run())
+        
+        assert generated == "notes on sorting algorithms"
+        assert search_results
+        assert "Related Materials" in text
+        assert elapsed < 0.17
+    
+    def test_slow_search_is_dropped(self, monkeypatch, fast_deadlines):
+        """Test a search past its deadline leaves the reply to its fallback"""
+        async def stuck_search(query):
+            await asyncio.sleep(5)
+        
+        monkeypatch.setattr(chat, "perform_search", stuck_search)
+        
+        async def run():
+            started = time.perf_counter()
+            response = await generate_response("Search for sorting", [])
+            return response, time.perf_counter() - started
+        
+        (text, sources, search_results, generated, action), elapsed = asyncio.run(run())
+        
+        assert action == "search"
+        assert "couldn't find" in text
+        assert elapsed < 1
+    
+    def test_slow_generation_serves_template(self, monkeypatch, fast_deadlines):
+        """Test generation past its deadline is replaced by the template"""
+        async def stuck_content(content_type, topic):
+            await asyncio.sleep(5)
+        
+        monkeypatch.setattr(chat, "generate_content", stuck_content)
+        
+        text, sources, search_results, generated, action = asyncio.run(generate_response("Generate code for heaps", []))
+        
+        assert action == "generation"
+        assert generated.startswith("# Code Example: heaps")
+    
+    def test_blocking_index_search_is_dropped(self, monkeypatch, fast_deadlines):
+        """Test a search that blocks inside the index still misses its deadline instead of stalling the turn"""
+        index_search = MATERIAL_INDEX.search
+        
+        def slow_search(*args, **kwargs):
+            time.sleep(0.5)
+            return index_search(*args, **kwargs)
+        
+        monkeypatch.setattr(MATERIAL_INDEX, "search", slow_search)
+        chat.SEARCH_CACHE.clear()
+        
+        async def run():
+            started = time.perf_counter()
+            async with ChatStages([ToolCall("search", chat.perform_search, {"query": "sorting"})], 0.05) as stages:
+                result = await stages.result("search", "dropped")
+            return result, time.perf_counter() - started
+        
+        result, elapsed = asyncio.run(run())
+        
+        assert result == "dropped"
+        assert elapsed < 0.4
+
+
+class TestGenerationWithoutRelated:
+    """Test suite for generation turns that schedule no related-materials stage"""
+    
+    @pytest.mark.parametrize("body", [
+        {"message": "can you generate something"},
+        {"message": "generate notes on recursion", "enable_search": False},
+    ])
+    def test_chat_generation(self, client, api_prefix, body):
+        """Test POST /chat answers a generation with no related materials"""
+        response = client.post(f"{api_prefix}/chat", json=body)
+        
+        assert response.status_code == 200
+        assert response.json()["action_taken"] == "generation"
+    
+    @pytest.mark.parametrize("body", [
+        {"message": "can you generate something"},
+        {"message": "generate notes on recursion", "enable_search": False},
+    ])
+    def test_websocket_generation(self, client, api_prefix, body):
+        """Test the WebSocket answers the same turn and keeps the connection"""
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            websocket.receive_json()
+            websocket.send_json(body)
+            assert receive_turn(websocket)[-1]["action_taken"] == "generation"
+            websocket.send_json({"message": "thanks"})
+            assert receive_turn(websocket)[-1]["action_taken"] == "acknowledgment"
+
+
+class TestRelatedMaterials:
+    """Test suite for topic anchors and neighbour lookups behind related materials"""
+    
+    def test_limit_one_returns_anchor_only(self, material_index):
+        """Test a limit of one returns the anchor rather than every neighbour"""
+        hits, sources = asyncio.run(chat.related_materials("binary search tree", 1))
+        
+        assert len(hits) == 1
+    
+    def test_anchor_resolved_again_after_upload(self, material_index):
+        """Test a material added after the first lookup can become the topic's anchor"""
+        topic = "splay tree rotations"
+        before, _ = asyncio.run(chat.related_materials(topic))
+        material_index.add(MaterialRecord(
+            id="splay", title="Splay Tree Rotations", type="theory",
+            excerpt="Splay tree rotations move an accessed node to the root.", source="Lecture 12",
+            keywords=["splay tree", "rotations"],
+        ))
+        
+        after, _ = asyncio.run(chat.related_materials(topic))
+        
+        assert not before or before[0].record.id != "splay"
+        assert after[0].record.id == "splay"
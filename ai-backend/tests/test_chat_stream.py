@@ -0,0 +1,72 @@
+"""
+Tests for streaming chat over SSE
+"""
+import asyncio
+import time
+
+from app.api import chat
+from app.api.chat import ChatRequest, stream_chat
+from tests.test_streaming import parse_events
+
+
+def post_stream(client, api_prefix, message):
+    response = client.post(f"{api_prefix}/chat/stream", json={"messages": [], "message": message})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+
+class TestChatStream:
+    """Test suite for POST /chat/stream"""
+    
+    def test_explanation_events(self, client, api_prefix):
+        """Test events arrive in stage order and add up to the POST /chat response"""
+        events = post_stream(client, api_prefix, "Explain recursion")
+        names = [event for event, _ in events]
+        
+        assert names[0] == "intent"
+        assert events[0][1] == {"intent": "explanation", "rule": "explain", "topic": "recursion"}
+        assert names[-1] == "done"
+        assert names.count("text") > 3
+        whole = client.post(f"{api_prefix}/chat", json={"messages": [], "message": "Explain recursion"}).json()
+        assert "".join(data["text"] for event, data in events if event == "text") == whole["response"]
+        assert events[-1][1]["action_taken"] == whole["action_taken"]
+        assert events[-1][1]["sources"] == whole["sources"]
+    
+    def test_search_results_before_text(self, client, api_prefix):
+        """Test search results are sent before the response text built from them"""
+        events = post_stream(client, api_prefix, "Search for binary search tree")
+        names = [event for event, _ in events]
+        
+        assert names.index("search_results") < names.index("text")
+        results = events[names.index("search_results")][1]["results"]
+        assert results and "title" in results[0]
+    
+    def test_generated_content_last(self, client, api_prefix):
+        """Test generated content follows the response text"""
+        events = post_stream(client, api_prefix, "Generate notes on hashing")
+        names = [event for event, _ in events]
+        
+        assert names[:2] == ["intent", "text"]
+        assert names[-2:] == ["generated_content", "done"]
+        assert events[-2][1]["content"].startswith("# Notes on hashing")
+    
+    def test_early_events_do_not_wait_for_generation(self, monkeypatch):
+        """Test the intent and first text arrive while slow generation is still running"""
+        async def slow_content(content_type, topic):
+            await asyncio.sleep(0.3)
+            return f"{content_type} on {topic}"
+        
+        monkeypatch.setattr(chat, "generate_content", slow_content)
+        
+        async def run():
+            started = time.perf_counter()
+            arrivals = []
+            request = ChatRequest(messages=[], message="Generate code for heaps")
+            async for frame in stream_chat(request):
+                arrivals.append((frame.split("\n", 1)[0][len("event: "):], time.perf_counter() - started))
+            return arrivals
+        
+        arrivals = dict(asyncio.run(run()))
+        
+        assert arrivals["intent"] < 0.05
+        assert arrivals["generated_content"] >= 0.3
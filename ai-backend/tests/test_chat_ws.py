@@ -0,0 +1,194 @@
+"""
+Tests for the chat WebSocket
+"""
+import asyncio
+
+import pytest
+
+from app.api import chat
+from app.chat.connection import ChatContext, FrameOutbox, SlowConsumerError, get_connection_stats
+from app.chat.sessions import get_session_store
+from app.config import Settings
+from tests.test_streaming import parse_events
+
+
+def receive_turn(websocket):
+    """Frames of one turn, up to and including done"""
+    frames = []
+    while not frames or frames[-1]["type"] not in ("done", "error"):
+        frames.append(websocket.receive_json())
+    return frames
+
+
+class TestChatWebSocket:
+    """Test suite for /chat/ws"""
+    
+    def test_turns_stream_over_one_connection(self, client, api_prefix):
+        """Test each message streams the same events as /chat/stream over a single connection"""
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            assert websocket.receive_json()["type"] == "session"
+            turns = []
+            for message in ("hello", "Explain recursion"):
+                websocket.send_json({"message": message})
+                turns.append(receive_turn(websocket))
+        
+        streamed = parse_events(client.post(f"{api_prefix}/chat/stream", json={"message": "Explain recursion"}).text)
+        assert [frame["type"] for frame in turns[0]] == ["intent", "text", "done"]
+        assert [frame["type"] for frame in turns[1]] == [event for event, _ in streamed]
+        assert "".join(frame["text"] for frame in turns[1] if frame["type"] == "text") == "".join(
+            data["text"] for event, data in streamed if event == "text"
+        )
+    
+    def test_follow_up_continues_topic(self, client, api_prefix):
+        """Test an explanation that names no topic continues the connection's last topic"""
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"message": "Explain recursion"})
+            receive_turn(websocket)
+            websocket.send_json({"message": "Explain that again"})
+            intent = receive_turn(websocket)[0]
+        
+        assert intent["intent"] == "explanation"
+        assert intent["topic"] == "recursion"
+    
+    def test_invalid_message_keeps_connection(self, client, api_prefix):
+        """Test a malformed message gets an error frame and the connection stays usable"""
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"text": "no message field"})
+            assert websocket.receive_json()["type"] == "error"
+            websocket.send_json({"message": "thanks"})
+            assert receive_turn(websocket)[-1]["action_taken"] == "acknowledgment"
+    
+    def test_non_json_message_keeps_connection(self, client, api_prefix):
+        """Test text that is not JSON gets an error frame and the connection stays usable"""
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            websocket.receive_json()
+            websocket.send_text("hello?")
+            assert websocket.receive_json()["type"] == "error"
+            websocket.send_json({"message": "thanks"})
+            assert receive_turn(websocket)[-1]["action_taken"] == "acknowledgment"
+    
+    def test_slow_consumer_closed_quietly(self, monkeypatch):
+        """Test a stalled client is dropped even when closing its socket fails"""
+        settings = Settings(chat_ws_send_queue=1, chat_ws_send_timeout=0.05)
+        monkeypatch.setattr(chat, "get_settings", lambda: settings)
+        
+        class StalledSocket:
+            """Accepts one message, never reads a frame and fails to close"""
+            
+            def __init__(self):
+                self.messages = [{"message": "Explain recursion"}]
+            
+            async def accept(self):
+                pass
+            
+            async def receive_json(self):
+                if self.messages:
+                    return self.messages.pop()
+                await asyncio.sleep(5)
+            
+            async def send_json(self, frame):
+                await asyncio.sleep(5)
+            
+            async def close(self, code=1000, reason=None):
+                raise RuntimeError("Unexpected ASGI message 'websocket.close'")
+        
+        stats = get_connection_stats()
+        slow_consumers = stats.slow_consumers
+        
+        asyncio.run(asyncio.wait_for(chat.chat_ws(StalledSocket()), 2))
+        
+        assert stats.slow_consumers == slow_consumers + 1
+    
+    def test_connections_counted(self, client, api_prefix):
+        """Test open connections and messages are reported in the metrics"""
+        stats = get_connection_stats()
+        total, messages = stats.total, stats.messages
+        with client.websocket_connect(f"{api_prefix}/chat/ws") as websocket:
+            websocket.receive_json()
+            assert stats.open >= 1
+            websocket.send_json({"message": "hello"})
+            receive_turn(websocket)
+        
+        metrics = client.get(f"{api_prefix}/health/metrics").json()["metrics"]["chat_websocket"]
+        assert stats.total == total + 1
+        assert stats.messages == messages + 1
+        assert metrics["messages_per_second"] > 0
+    
+    def test_session_kept_by_store(self, llm_client, api_prefix):
+        """Test turns are added to the session the connection was opened with"""
+        with llm_client.websocket_connect(f"{api_prefix}/chat/ws?session_id=ws-session") as websocket:
+            assert websocket.receive_json() == {"type": "session", "session_id": "ws-session"}
+            websocket.send_json({"message": "hello"})
+            receive_turn(websocket)
+        
+        assert get_session_store().history("ws-session")[0] == {"role": "user", "content": "hello"}
+
+
+class TestChatContext:
+    """Test suite for per-connection warm context"""
+    
+    def test_retrieval_results_reused(self):
+        """Test a repeated retrieval is served from the connection until it expires"""
+        calls = []
+        now = [0.0]
+        
+        async def search(query):
+            calls.append(query)
+            return [query]
+        
+        context = ChatContext(ttl=10.0, clock=lambda: now[0])
+        cached = context.cached("search", search)
+        
+        async def run():
+            results = [await cached(query="trees"), await cached(query="trees")]
+            now[0] = 11.0
+            results.append(await cached(query="trees"))
+            return results
+        
+        assert asyncio.run(run()) == [["trees"]] * 3
+        assert calls == ["trees", "trees"]
+        assert (context.hits, context.misses) == (1, 2)
+
+
+class TestFrameOutbox:
+    """Test suite for backpressure on the connection writer"""
+    
+    def test_slow_reader_pauses_producer(self):
+        """Test put waits while the outbox is full and resumes as frames are sent"""
+        sent = []
+        
+        async def slow_send(frame):
+            await asyncio.sleep(0.02)
+            sent.append(frame)
+        
+        async def run():
+            outbox = FrameOutbox(slow_send, max_frames=2, timeout=1.0).start()
+            for number in range(6):
+                await outbox.put({"n": number})
+            queued_while_sending = len(sent)
+            await asyncio.sleep(0.1)
+            await outbox.close()
+            return queued_while_sending
+        
+        queued_while_sending = asyncio.run(run())
+        
+        assert queued_while_sending >= 3
+        assert [frame["n"] for frame in sent] == list(range(6))
+    
+    def test_stalled_reader_raises(self):
+        """Test a reader that stops reading is reported once the send timeout passes"""
+        async def stuck_send(frame):
+            await asyncio.sleep(5)
+        
+        async def run():
+            outbox = FrameOutbox(stuck_send, max_frames=1, timeout=0.05).start()
+            try:
+                with pytest.raises(SlowConsumerError):
+                    for number in range(5):
+                        await outbox.put({"n": number})
+            finally:
+                await outbox.close()
+        
+        asyncio.run(run())
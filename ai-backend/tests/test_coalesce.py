@@ -0,0 +1,135 @@
+"""
+Tests for single-flight coalescing of generation requests
+"""
+import asyncio
+
+import pytest
+
+from app.api.generate import GenerateRequest, generate_with_provider
+from app.config import Settings
+from app.generation.cache import get_generation_cache
+from app.generation.coalesce import SingleFlight
+from app.generation.provider import OpenAICompatibleProvider, create_http_client
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight"""
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Test identical concurrent keys run the computation once"""
+        flight = SingleFlight()
+        runs = []
+        
+        async def produce():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "content"
+        
+        async def run():
+            return await asyncio.gather(*(flight.do("key", produce) for _ in range(25)))
+        
+        results = asyncio.run(run())
+        
+        assert results == ["content"] * 25
+        assert len(runs) == 1
+        stats = flight.stats()
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 24
+        assert stats["max_fan_out"] == 25
+        assert stats["in_flight"] == 0
+    
+    def test_distinct_keys_run_separately(self):
+        """Test different keys are not coalesced"""
+        flight = SingleFlight()
+        
+        async def run():
+            return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+        
+        assert asyncio.run(run()) == ["a", "b"]
+        assert flight.executions == 2
+    
+    def test_finished_flight_is_not_reused(self):
+        """Test a call after completion starts a new computation"""
+        flight = SingleFlight()
+        runs = []
+        
+        async def produce():
+            runs.append(1)
+            return len(runs)
+        
+        async def run():
+            return await flight.do("key", produce), await flight.do("key", produce)
+        
+        assert asyncio.run(run()) == (1, 2)
+    
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test one waiter disconnecting leaves the shared computation running"""
+        flight = SingleFlight()
+        
+        async def produce():
+            await asyncio.sleep(0.05)
+            return "content"
+        
+        async def run():
+            leader = asyncio.ensure_future(flight.do("key", produce))
+            follower = asyncio.ensure_future(flight.do("key", produce))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await follower
+        
+        assert asyncio.run(run()) == "content"
+        assert flight.cancelled_waiters == 1
+        assert flight.executions == 1
+    
+    def test_errors_reach_every_waiter(self):
+        """Test a failed computation raises in every caller"""
+        flight = SingleFlight()
+        
+        async def produce():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+        
+        async def run():
+            return await asyncio.gather(*(flight.do("key", produce) for _ in range(3)), return_exceptions=True)
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.failures == 1
+        assert flight.in_flight == 0
+
+
+class TestCoalescedGeneration:
+    """Test suite for coalesced provider calls"""
+    
+    def test_identical_requests_make_one_provider_call(self, llm_stub):
+        """Test a burst of identical requests reaches the provider once"""
+        get_generation_cache().clear()
+        llm_stub.latency = 0.05
+        requests = llm_stub.requests
+        request = GenerateRequest(type="slides", prompt="Slides on graph algorithms")
+        
+        async def run():
+            provider = OpenAICompatibleProvider(create_http_client(Settings(), llm_stub.url), "stub-model")
+            try:
+                return await asyncio.gather(*(generate_with_provider(provider, request) for _ in range(50)))
+            finally:
+                await provider.close()
+        
+        try:
+            contents = asyncio.run(run())
+        finally:
+            llm_stub.latency = 0.0
+        
+        assert len(set(contents)) == 1
+        assert llm_stub.requests == requests + 1
+    
+    def test_coalescing_metrics_exposed(self, llm_client, api_prefix):
+        """Test fan-out counters are reported by /health/metrics"""
+        llm_client.post(f"{api_prefix}/generate", json={"type": "notes", "prompt": "heaps"})
+        
+        metrics = llm_client.get(f"{api_prefix}/health/metrics").json()["metrics"]["generation_coalescing"]
+        assert metrics["executions"] >= 1
+        assert "max_fan_out" in metrics
@@ -0,0 +1,116 @@
+"""
+Tests for token-budgeted context packing
+"""
+import time
+
+from app.generation.context import (
+    ContextChunk, deduplicate, estimate_tokens, knapsack, pack_context, score_passages,
+)
+from app.generation.theory_generator import build_messages
+
+
+PASSAGES = [
+    "A binary search tree keeps smaller keys in the left subtree and larger keys in the right subtree.",
+    "Hash tables map keys to buckets with a hash function; collisions are resolved by chaining or probing.",
+    "Search in a balanced binary search tree takes O(log n) time because each comparison halves the tree.",
+    "Linked lists store elements in nodes that point to the next node.",
+]
+
+
+class TestEstimateTokens:
+    """Test suite for the token estimator"""
+    
+    def test_counts_words_and_punctuation(self):
+        """Test short words and punctuation count one token each"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("The tree is full.") == 5
+        assert estimate_tokens("def insert(node, key):") == 8
+    
+    def test_long_words_cost_more(self):
+        """Test long identifiers count as several tokens"""
+        assert estimate_tokens("internationalization") == 4
+    
+    def test_close_to_characters_over_four(self):
+        """Test English prose lands near the usual four characters per token"""
+        text = " ".join(PASSAGES) * 10
+        assert 0.6 < estimate_tokens(text) / (len(text) / 4) < 1.4
+
+
+class TestPackContext:
+    """Test suite for pack_context"""
+    
+    def test_relevance_scoring(self):
+        """Test passages sharing query words score higher"""
+        chunks = score_passages("binary search tree", PASSAGES)
+        
+        assert chunks[0].score > chunks[1].score
+        assert chunks[2].score > chunks[3].score
+    
+    def test_duplicates_dropped(self):
+        """Test repeated and contained passages are kept once"""
+        packed = pack_context("binary search tree", [PASSAGES[0], PASSAGES[0], PASSAGES[0][:60] + " subtree"], 1000)
+        
+        assert packed.passages == [PASSAGES[0]]
+        assert packed.duplicates == 2
+    
+    def test_budget_respected(self):
+        """Test the chosen passages never exceed the budget"""
+        passages = [f"Passage {n} about trees, graphs and heaps with enough words to cost tokens." for n in range(200)]
+        for budget in (0, 10, 50, 300, 2000):
+            packed = pack_context("trees", passages, budget)
+            assert packed.tokens <= budget
+            assert sum(estimate_tokens(passage) for passage in packed.passages) <= budget
+    
+    def test_most_relevant_first(self):
+        """Test passages are ordered by relevance"""
+        packed = pack_context("binary search tree", PASSAGES, 1000)
+        
+        assert packed.passages[0] in (PASSAGES[0], PASSAGES[2])
+        assert packed.passages[-1] in (PASSAGES[1], PASSAGES[3])
+    
+    def test_knapsack_beats_greedy(self):
+        """Test two smaller passages are preferred to one large one worth less than both"""
+        chunks = [ContextChunk("big", 1.0, 0, tokens=100), ContextChunk("a", 0.6, 1, tokens=50), ContextChunk("b", 0.6, 2, tokens=50)]
+        
+        assert sorted(chunk.text for chunk in knapsack(chunks, 100)) == ["a", "b"]
+    
+    def test_oversized_passage_truncated(self):
+        """Test a passage larger than the whole budget contributes its head"""
+        packed = pack_context("trees", ["trees " * 500], 40)
+        
+        assert packed.passages
+        assert packed.tokens <= 40
+    
+    def test_large_inputs_stay_fast(self):
+        """Test packing thousands of passages is bounded in time and output"""
+        passages = [f"Section {n}: trees and graph traversal notes, part {n % 37}." for n in range(2000)]
+        started = time.perf_counter()
+        packed = pack_context("graph traversal", passages, 3000)
+        
+        assert time.perf_counter() - started < 2.0
+        assert packed.tokens <= 3000
+    
+    def test_deduplicate_keeps_better_copy(self):
+        """Test the higher-scoring copy of a duplicate survives"""
+        chunks = [ContextChunk("one two three four", 0.2, 0), ContextChunk("one two three four", 0.9, 1)]
+        
+        assert [chunk.position for chunk in deduplicate(chunks)] == [1]
+
+
+class TestGeneratorContext:
+    """Test suite for context in generator prompts"""
+    
+    def test_prompt_bounded_by_window(self):
+        """Test the prompt stays within the context window however much context is passed"""
+        context = [f"Fact {n} about binary search trees and their balancing rotations." for n in range(5000)]
+        messages = build_messages("binary search trees", "notes", context, max_tokens=1000)
+        
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        assert prompt_tokens <= 8192 - 1000
+        assert "Course context:" in messages[1]["content"]
+    
+    def test_no_room_for_context(self):
+        """Test context is left out when the reply uses the whole window"""
+        messages = build_messages("trees", "notes", PASSAGES, max_tokens=8192)
+        
+        assert "Course context:" not in messages[1]["content"]
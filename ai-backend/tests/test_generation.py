@@ -16,7 +16,9 @@ class TestGenerationRouter:
         
         assert "status" in data
         assert "message" in data
-        assert data["status"] == "not_configured"
+        assert data["status"] == "workers_stopped"
+        assert data["queue_depth"] == 0
+        assert data["utilization"] == 0.0
     
     def test_generation_generate_endpoint(self, client, api_prefix):
         """Test Generation generate endpoint is accessible"""
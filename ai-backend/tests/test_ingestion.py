@@ -0,0 +1,255 @@
+"""
+Tests for streaming document ingestion
+"""
+import asyncio
+import io
+import threading
+import tracemalloc
+import zipfile
+
+import pytest
+
+from app.api import rag
+from app.rag.chunking import StreamingChunker
+from app.rag.ingestion import IngestionJobRegistry, ingest_multipart
+from app.rag.ingestion.pipeline import DocumentIngestor
+from app.rag.retriever import MaterialIndex
+from app.rag.vector_store import SegmentStore
+
+
+LECTURE = (
+    "Merge sort divides the array into halves, sorts each half recursively and merges them. "
+    "The merge step walks both halves once, so merge sort runs in linearithmic time. "
+) * 40
+
+
+def multipart_body(files, boundary="testboundary"):
+    """Encode (filename, content_type, bytes) tuples as a multipart body"""
+    body = io.BytesIO()
+    for filename, content_type, data in files:
+        body.write(f"--{boundary}\r\n".encode())
+        body.write(f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'.encode())
+        body.write(f"Content-Type: {content_type}\r\n\r\n".encode())
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class TestStreamingChunker:
+    """Test suite for StreamingChunker"""
+    
+    def test_chunks_cover_document(self):
+        """Test chunk offsets map back onto the fed text"""
+        chunker = StreamingChunker(chunk_size=200, overlap=20)
+        chunks = []
+        for start in range(0, len(LECTURE), 37):
+            chunks.extend(chunker.feed(LECTURE[start:start + 37]))
+        chunks.extend(chunker.finish())
+        
+        assert chunks[0].start == 0
+        assert chunks[-1].end == len(LECTURE)
+        for chunk in chunks:
+            assert LECTURE[chunk.start:chunk.end] == chunk.text
+            assert len(chunk.text) <= 200
+    
+    def test_invalid_overlap(self):
+        """Test overlap must be smaller than the chunk size"""
+        with pytest.raises(ValueError):
+            StreamingChunker(chunk_size=10, overlap=10)
+
+
+class TestIngestionPipeline:
+    """Test suite for ingest_multipart"""
+    
+    def test_large_upload_memory_bounded(self, tmp_path):
+        """Test transient memory does not grow with the uploaded file size"""
+        data = LECTURE.encode() * 160  # ~1 MB
+        body, content_type = multipart_body([("lecture.txt", "text/plain", data)])
+        store = SegmentStore(tmp_path, dim=64, max_chunks=128)
+        job = IngestionJobRegistry().create()
+        
+        async def stream():
+            for start in range(0, len(body), 64 * 1024):
+                yield body[start:start + 64 * 1024]
+        
+        tracemalloc.start()
+        try:
+            asyncio.run(ingest_multipart(stream(), content_type, job, store, chunk_size=500, overlap=50))
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        assert job.documents == 1
+        assert len(store) == job.chunks
+        # Chunk metadata and embeddings are retained; working memory is not
+        assert peak - retained < len(data) / 4
+        assert store.read(f"upload-{job.id[:12]}-1:0") == LECTURE[:store.segments[0].lengths[0]]
+    
+    def test_chunks_are_processed_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test chunking, embedding and indexing of text and ZIP parts run in worker threads"""
+        bundle = io.BytesIO()
+        with zipfile.ZipFile(bundle, "w") as archive:
+            archive.writestr("sort.py", "def merge_sort(items):\n    return items\n")
+        body, content_type = multipart_body([
+            ("lecture.txt", "text/plain", LECTURE.encode()),
+            ("bundle.zip", "application/zip", bundle.getvalue()),
+        ])
+        threads = set()
+        original = DocumentIngestor._store
+        monkeypatch.setattr(DocumentIngestor, "_store", lambda self, chunk: threads.add(threading.get_ident()) or original(self, chunk))
+        index = MaterialIndex()
+        job = IngestionJobRegistry().create()
+        
+        async def stream():
+            yield body
+        
+        async def run():
+            await ingest_multipart(stream(), content_type, job, SegmentStore(tmp_path, dim=64), index=index, chunk_size=500, overlap=50)
+            return threading.get_ident()
+        
+        loop_thread = asyncio.run(run())
+        
+        assert job.documents == 2
+        assert threads and loop_thread not in threads
+        assert index.symbols.lookup("merge_sort")
+
+
+class TestIngestionJobRegistry:
+    """Test suite for ingestion job retention"""
+    
+    def test_pending_jobs_expire(self):
+        """Test a reserved job that never receives its upload is forgotten after the TTL"""
+        clock = [0.0]
+        jobs = IngestionJobRegistry(pending_ttl=60, clock=lambda: clock[0])
+        pending = jobs.create(status="pending")
+        running = jobs.create()
+        
+        clock[0] = 59
+        assert jobs.get(pending.id) is pending
+        clock[0] = 60
+        assert jobs.get(pending.id) is None
+        assert jobs.get(running.id) is running
+        assert len(jobs) == 1
+    
+    def test_expired_jobs_are_evicted_on_create(self):
+        """Test expired pending jobs are dropped without being polled"""
+        clock = [0.0]
+        jobs = IngestionJobRegistry(pending_ttl=60, clock=lambda: clock[0])
+        for _ in range(5):
+            jobs.create(status="pending")
+        
+        clock[0] = 120
+        jobs.create(status="pending")
+        
+        assert len(jobs) == 1
+    
+    def test_pending_jobs_count_toward_limit(self):
+        """Test reserving ids past the limit evicts finished jobs first, then the oldest pending ones"""
+        jobs = IngestionJobRegistry(max_jobs=3)
+        finished = jobs.create()
+        finished.complete()
+        running = jobs.create()
+        oldest = jobs.create(status="pending")
+        
+        for _ in range(3):
+            jobs.create(status="pending")
+        
+        assert len(jobs) == 3
+        assert jobs.get(finished.id) is None
+        assert jobs.get(oldest.id) is None
+        assert jobs.get(running.id) is running
+
+
+class TestIngestionRouter:
+    """Test suite for the upload endpoints"""
+    
+    def test_upload_text_file(self, client, api_prefix, material_index):
+        """Test a text upload is chunked, indexed and reported"""
+        body, content_type = multipart_body([("sorting.md", "text/markdown", LECTURE.encode())])
+        response = client.post(
+            f"{api_prefix}/rag/ingest/upload?type=theory",
+            content=body,
+            headers={"Content-Type": content_type}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "completed"
+        assert data["documents"] == 1
+        assert data["chunks"] > 1
+        assert data["bytes_received"] == len(body)
+        
+        hits = material_index.top_k("merge", 3, min_score=0.1)
+        assert hits.hit(0).record.title == "sorting.md"
+        assert hits.hit(0).record.type == "theory"
+        
+        poll = client.get(f"{api_prefix}/rag/ingest/jobs/{data['job_id']}")
+        assert poll.status_code == 200
+        assert poll.json()["chunks"] == data["chunks"]
+    
+    def test_upload_zip_bundle(self, client, api_prefix, material_index):
+        """Test text members of a ZIP bundle are ingested as documents"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as bundle:
+            bundle.writestr("lab/README.md", LECTURE)
+            bundle.writestr("lab/merge_sort.py", "def merge_sort(items):\n    return sorted(items)\n")
+            bundle.writestr("lab/diagram.png", b"\x89PNG")
+        body, content_type = multipart_body([("lab.zip", "application/zip", archive.getvalue())])
+        
+        response = client.post(f"{api_prefix}/rag/ingest/upload", content=body, headers={"Content-Type": content_type})
+        
+        assert response.status_code == 200
+        assert response.json()["documents"] == 2
+        types = {r.title: r.type for r in material_index.records if r.title.startswith("lab.zip/")}
+        assert types == {"lab.zip/lab/README.md": "notes", "lab.zip/lab/merge_sort.py": "code"}
+    
+    def test_upload_requires_multipart(self, client, api_prefix):
+        """Test non-multipart bodies are rejected"""
+        response = client.post(f"{api_prefix}/rag/ingest/upload", json={"text": "hello"})
+        
+        assert response.status_code == 415
+    
+    def test_upload_invalid_zip(self, client, api_prefix, material_index):
+        """Test a corrupt ZIP fails the job"""
+        body, content_type = multipart_body([("bad.zip", "application/zip", b"not a zip")])
+        response = client.post(f"{api_prefix}/rag/ingest/upload", content=body, headers={"Content-Type": content_type})
+        
+        assert response.status_code == 400
+    
+    def test_upload_into_created_job(self, client, api_prefix, material_index):
+        """Test a job created before the upload is pollable throughout and cannot take a second upload"""
+        created = client.post(f"{api_prefix}/rag/ingest/jobs")
+        assert created.status_code == 201
+        job_id = created.json()["job_id"]
+        assert client.get(f"{api_prefix}/rag/ingest/jobs/{job_id}").json()["status"] == "pending"
+        
+        body, content_type = multipart_body([("sorting.md", "text/markdown", LECTURE.encode())])
+        upload = f"{api_prefix}/rag/ingest/upload?job_id={job_id}"
+        response = client.post(upload, content=body, headers={"Content-Type": content_type})
+        
+        assert response.status_code == 200
+        assert response.json()["job_id"] == job_id
+        assert client.get(f"{api_prefix}/rag/ingest/jobs/{job_id}").json()["status"] == "completed"
+        assert client.post(upload, content=body, headers={"Content-Type": content_type}).status_code == 409
+    
+    def test_unexpected_error_fails_job(self, client, api_prefix, monkeypatch):
+        """Test an error other than a bad upload still marks the job failed"""
+        async def broken_ingest(*args, **kwargs):
+            raise OSError("disk full")
+        
+        monkeypatch.setattr(rag, "ingest_multipart", broken_ingest)
+        job_id = client.post(f"{api_prefix}/rag/ingest/jobs").json()["job_id"]
+        body, content_type = multipart_body([("sorting.md", "text/markdown", LECTURE.encode())])
+        
+        with pytest.raises(OSError):
+            client.post(f"{api_prefix}/rag/ingest/upload?job_id={job_id}", content=body, headers={"Content-Type": content_type})
+        
+        job = client.get(f"{api_prefix}/rag/ingest/jobs/{job_id}").json()
+        assert (job["status"], job["error"]) == ("failed", "disk full")
+    
+    def test_unknown_job(self, client, api_prefix):
+        """Test polling an unknown job returns 404"""
+        response = client.get(f"{api_prefix}/rag/ingest/jobs/missing")
+        
+        assert response.status_code == 404
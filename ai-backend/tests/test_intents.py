@@ -0,0 +1,109 @@
+"""
+Tests for the compiled chat intent matcher
+"""
+import random
+
+import pytest
+
+from app.api.chat import get_intent_matcher
+from app.chat.intents import AhoCorasick, IntentError, IntentMatcher, load_rules
+
+
+class TestAhoCorasick:
+    """Test suite for the Aho-Corasick automaton"""
+    
+    def test_overlapping_patterns(self):
+        """Test nested and overlapping patterns are all reported"""
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        found = sorted((automaton.patterns[pid], end) for pid, end in automaton.find_all("ushers"))
+        
+        assert found == [("he", 4), ("hers", 6), ("she", 4)]
+    
+    def test_matches_naive_search(self):
+        """Test every occurrence agrees with a brute-force scan"""
+        rng = random.Random(7)
+        patterns = ["".join(rng.choice("ab") for _ in range(rng.randint(1, 4))) for _ in range(12)]
+        automaton = AhoCorasick(dict.fromkeys(patterns))
+        text = "".join(rng.choice("ab") for _ in range(200))
+        
+        found = sorted((automaton.patterns[pid], end) for pid, end in automaton.find_all(text))
+        expected = sorted(
+            (pattern, i + len(pattern))
+            for pattern in automaton.patterns
+            for i in range(len(text))
+            if text.startswith(pattern, i)
+        )
+        assert found == expected
+
+
+class TestIntentMatcher:
+    """Test suite for IntentMatcher with the shipped rules"""
+    
+    @pytest.mark.parametrize("message, intent, rule", [
+        ("Hello!", "greeting", "greeting"),
+        ("thanks, that helped", "acknowledgment", "thanks"),
+        ("help", "help", "help"),
+        ("Search for binary trees", "search", "search_for"),
+        ("Generate notes on graphs", "generation", "generate"),
+        ("Explain recursion", "explanation", "explain"),
+        ("how does hashing work", "explanation", "how_does_it_work"),
+        ("Give me a recap of sorting", "summary", "summary"),
+        ("when is the exam", "question", "question"),
+        ("tell me a joke", "conversation", None),
+    ])
+    def test_classification(self, message, intent, rule):
+        """Test messages are classified by the expected rule"""
+        match = get_intent_matcher().classify(message)
+        
+        assert (match.intent, match.rule) == (intent, rule)
+    
+    def test_rule_order_wins(self):
+        """Test an earlier rule wins even when a later one matches earlier in the text"""
+        match = get_intent_matcher().classify("explain how to find a tree")
+        
+        assert match.rule == "find"
+        assert match.query == "a tree"
+        assert "question" in match.fired
+    
+    def test_keyword_boundaries(self):
+        """Test word keywords need whole words and length limits apply"""
+        matcher = get_intent_matcher()
+        
+        assert matcher.classify("is this stable?").intent != "greeting"
+        assert matcher.classify("hi, " + "x" * 40).intent != "greeting"
+        assert matcher.classify("show me the queue").intent == "conversation"
+    
+    def test_topic(self):
+        """Test the first knowledge-base topic mentioned is reported"""
+        assert get_intent_matcher().classify("Explain graph algorithms").topic == "algorithm"
+        assert get_intent_matcher().classify("Explain binary trees").topic == "tree"
+    
+    def test_unrelated_rules_cost_nothing(self):
+        """Test rules whose triggers are absent never run their patterns"""
+        extra = [
+            {"name": f"rule{n}", "intent": "search", "triggers": [f"zzword{n}"], "pattern": f"zzword{n} (.+)"}
+            for n in range(500)
+        ]
+        matcher = IntentMatcher(load_rules() + extra)
+        matcher.classify("Search for binary trees")
+        
+        assert matcher.regex_evaluations == 1
+        assert matcher.classify("zzword42 anything").rule == "rule42"
+    
+    def test_malformed_rules_rejected(self):
+        """Test rules without keywords or a triggered pattern are refused"""
+        with pytest.raises(IntentError):
+            IntentMatcher([{"name": "empty", "intent": "x"}])
+        with pytest.raises(IntentError):
+            IntentMatcher([{"name": "untriggered", "intent": "x", "pattern": "a+"}])
+
+
+class TestChatRule:
+    """Test suite for rule reporting in the chat endpoint"""
+    
+    def test_response_reports_rule(self, client, api_prefix):
+        """Test the chat response names the rule that fired"""
+        response = client.post(f"{api_prefix}/chat", json={"messages": [], "message": "Explain recursion"})
+        
+        assert response.json()["action_taken"] == "explanation"
+        assert response.json()["matched_rule"] == "explain"
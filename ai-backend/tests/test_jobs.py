@@ -0,0 +1,213 @@
+"""
+Tests for the generation job queue
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import Settings
+from app.generation.jobs import GenerationJobQueue, JobQueueError, JobStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def jobs_client(test_app, tmp_path, monkeypatch):
+    """
+    Test client whose lifespan starts the job workers with a temporary result store
+    """
+    settings = Settings(generation_jobs_path=str(tmp_path / "jobs.sqlite3"), generation_job_workers=2)
+    monkeypatch.setattr(main, "get_settings", lambda: settings)
+    with TestClient(test_app) as client:
+        yield client
+
+
+def wait_for_job(client, url, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(url).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job did not finish: {job}")
+
+
+class TestJobStore:
+    """Test suite for the SQLite job store"""
+    
+    def test_lifecycle(self, tmp_path):
+        """Test a job moves from queued to completed with its result"""
+        store = JobStore(str(tmp_path / "jobs.sqlite3"))
+        job_id = store.create({"prompt": "Trees"})
+        
+        assert store.get(job_id)["status"] == "queued"
+        store.mark_running(job_id)
+        assert store.get(job_id)["status"] == "running"
+        store.complete(job_id, {"content": "done"})
+        job = store.get(job_id)
+        assert job["status"] == "completed"
+        assert job["result"] == {"content": "done"}
+        assert job["expires_at"] is not None
+    
+    def test_results_expire(self, tmp_path):
+        """Test finished jobs disappear after the TTL and are purged"""
+        clock = FakeClock()
+        store = JobStore(str(tmp_path / "jobs.sqlite3"), ttl=60, clock=clock)
+        job_id = store.create({})
+        store.fail(job_id, "boom")
+        clock.now += 61
+        
+        assert store.get(job_id) is None
+        assert store.purge_expired() == 1
+    
+    def test_results_survive_reopen(self, tmp_path):
+        """Test results persist in the file and unfinished jobs are failed on restart"""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = JobStore(path)
+        done = store.create({})
+        store.complete(done, {"content": "kept"})
+        pending = store.create({})
+        store.close()
+        
+        reopened = JobStore(path)
+        assert reopened.fail_unfinished("Interrupted by a restart") == 1
+        assert reopened.get(done)["result"] == {"content": "kept"}
+        assert reopened.get(pending)["error"] == "Interrupted by a restart"
+
+
+class TestGenerationJobQueue:
+    """Test suite for the worker pool"""
+    
+    def test_concurrency_limit(self, tmp_path):
+        """Test no more jobs run at once than there are workers"""
+        running = []
+        peak = []
+        
+        async def runner(request):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return {"n": request["n"]}
+        
+        async def run():
+            queue = GenerationJobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), runner, workers=2)
+            queue.start()
+            ids = [await queue.submit({"n": n}) for n in range(6)]
+            assert queue.stats()["submitted"] == 6
+            await queue._queue.join()
+            await queue.stop()
+            return queue, ids
+        
+        queue, ids = asyncio.run(run())
+        
+        assert max(peak) == 2
+        assert [queue.store.get(job_id)["result"] for job_id in ids] == [{"n": n} for n in range(6)]
+        assert queue.completed == 6
+    
+    def test_failed_job_records_error(self, tmp_path):
+        """Test a runner exception fails only its job"""
+        async def runner(request):
+            raise ValueError("bad request")
+        
+        async def run():
+            queue = GenerationJobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), runner, workers=1)
+            queue.start()
+            job_id = await queue.submit({})
+            await queue._queue.join()
+            await queue.stop()
+            return queue.store.get(job_id)
+        
+        job = asyncio.run(run())
+        
+        assert job["status"] == "failed"
+        assert job["error"] == "bad request"
+    
+    def test_store_written_off_the_loop(self, tmp_path):
+        """Test job records are written from worker threads, not the event loop thread"""
+        threads = []
+        
+        class RecordingStore(JobStore):
+            def _execute(self, sql, params=()):
+                threads.append(threading.get_ident())
+                return super()._execute(sql, params)
+        
+        async def runner(request):
+            return {}
+        
+        async def run():
+            queue = GenerationJobQueue(RecordingStore(str(tmp_path / "jobs.sqlite3")), runner, workers=1)
+            queue.start()
+            await queue.submit({})
+            await queue._queue.join()
+            await queue.stop()
+        
+        asyncio.run(run())
+        
+        assert len(threads) == 4  # purge, create, running, completed
+        assert threading.get_ident() not in threads
+    
+    def test_full_queue_rejects(self, tmp_path):
+        """Test submissions beyond max_queued are refused"""
+        async def runner(request):
+            await asyncio.sleep(1)
+        
+        async def run():
+            queue = GenerationJobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), runner, workers=1, max_queued=1)
+            queue.start()
+            try:
+                await queue.submit({})
+                with pytest.raises(JobQueueError):
+                    await queue.submit({})
+            finally:
+                await queue.stop()
+        
+        asyncio.run(run())
+
+
+class TestGenerationJobsRouter:
+    """Test suite for the generation job endpoints"""
+    
+    def test_submit_and_poll(self, jobs_client, api_prefix):
+        """Test a submitted job completes with the generation response"""
+        response = jobs_client.post(
+            f"{api_prefix}/generation/jobs", json={"prompt": "Graphs", "generation_type": "theory"}
+        )
+        
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        job = wait_for_job(jobs_client, f"{api_prefix}/generation/jobs/{job_id}")
+        assert job["status"] == "completed"
+        assert job["result"]["generation_type"] == "theory"
+        assert "Graphs" in job["result"]["content"]
+    
+    def test_unknown_job(self, jobs_client, api_prefix):
+        """Test polling an unknown job returns 404"""
+        response = jobs_client.get(f"{api_prefix}/generation/jobs/missing")
+        
+        assert response.status_code == 404
+    
+    def test_status_reports_queue(self, jobs_client, api_prefix):
+        """Test /generation/status reports the worker pool"""
+        data = jobs_client.get(f"{api_prefix}/generation/status").json()
+        
+        assert data["status"] == "ready"
+        assert data["workers"] == 2
+        assert data["queue_depth"] == 0
+        assert 0.0 <= data["utilization"] <= 1.0
+    
+    def test_submit_without_workers(self, client, api_prefix):
+        """Test jobs are refused when the lifespan has not started the workers"""
+        response = client.post(f"{api_prefix}/generation/jobs", json={"prompt": "Graphs", "generation_type": "theory"})
+        
+        assert response.status_code == 503
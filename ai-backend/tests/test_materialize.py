@@ -0,0 +1,87 @@
+"""
+Tests for the artifact store and offline materialization
+"""
+import os
+
+from app.api import generate
+from app.config import Settings
+from app.generation.artifacts import ArtifactStore
+from app.generation.materialize import materialize, syllabus_topics
+
+
+BUCKET = ("generate", "notes", None)
+
+
+class TestArtifactStore:
+    """Test suite for ArtifactStore"""
+    
+    def test_round_trip(self, tmp_path):
+        """Test stored content is found again under an equivalent prompt"""
+        store = ArtifactStore(str(tmp_path))
+        store.put(BUCKET, "Binary Search Tree", "# BST notes")
+        
+        assert store.get(BUCKET, "binary search tree!") == "# BST notes"
+        assert store.get(("generate", "slides", None), "Binary Search Tree") is None
+        assert store.stats()["hits"] == 1
+    
+    def test_content_addressed(self, tmp_path):
+        """Test identical content is stored as one object"""
+        store = ArtifactStore(str(tmp_path))
+        first = store.put(BUCKET, "Recursion", "same text")
+        second = store.put(("generate", "summary", None), "Recursion", "same text")
+        
+        assert first == second
+        objects = [name for _, _, names in os.walk(tmp_path / "objects") for name in names]
+        assert objects == [first]
+    
+    def test_corrupt_object_ignored(self, tmp_path):
+        """Test an object whose bytes no longer match its digest is not served"""
+        store = ArtifactStore(str(tmp_path))
+        digest = store.put(BUCKET, "Sorting", "original")
+        (tmp_path / "objects" / digest[:2] / digest).write_text("tampered")
+        
+        assert store.get(BUCKET, "Sorting") is None
+
+
+class TestMaterialize:
+    """Test suite for the materialization job"""
+    
+    def test_syllabus_topics(self):
+        """Test topics come from every source once"""
+        topics = syllabus_topics()
+        
+        assert "recursion" in topics
+        assert "Implementing a Binary Search Tree" in topics
+        assert "Hash Tables" in topics
+        assert "What is a binary search tree?" not in topics  # Same as the "Binary Search Tree" suggestion
+        assert len({topic.lower() for topic in topics}) == len(topics)
+    
+    def test_materialize_and_serve(self, tmp_path, llm_stub, client, api_prefix, monkeypatch):
+        """Test the pool fills the store, reruns skip, and POST /generate serves artifacts first"""
+        settings = Settings(llm_base_url=llm_stub.url, llm_model="stub-model")
+        types = [generate.GenerateType.NOTES, generate.GenerateType.CODE]
+        summary = materialize(str(tmp_path), ["Binary Search Tree", "Recursion"], types, settings, workers=2)
+        
+        assert summary["generated"] == 4
+        assert summary["failed"] == 0
+        assert materialize(str(tmp_path), ["Binary Search Tree", "Recursion"], types, settings, workers=2)["skipped"] == 4
+        
+        store = ArtifactStore(str(tmp_path))
+        monkeypatch.setattr(generate, "active_artifact_store", lambda: store)
+        response = client.post(f"{api_prefix}/generate", json={"type": "notes", "prompt": "Binary search tree"})
+        
+        assert response.json()["content"] == store.get(BUCKET, "Binary Search Tree")
+        assert store.hits == 2
+    
+    def test_provider_failures_reported(self, tmp_path, llm_stub):
+        """Test failed generations are listed and not stored"""
+        settings = Settings(llm_base_url=llm_stub.url, llm_model="stub-model")
+        llm_stub.failure_rate = 1.0
+        try:
+            summary = materialize(str(tmp_path), ["Sorting"], [generate.GenerateType.SUMMARY], settings, workers=1)
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        assert summary["failed"] == 1
+        assert summary["errors"][0]["topic"] == "Sorting"
+        assert ArtifactStore(str(tmp_path)).get(("generate", "summary", None), "Sorting") is None
@@ -0,0 +1,24 @@
+"""
+Memory regression tests backed by the tracemalloc benchmark
+"""
+import pytest
+
+from benchmarks.memory import bytes_per_document, peak_request_allocation
+
+
+@pytest.mark.slow
+class TestMemoryBenchmark:
+    """Test suite guarding hot-path memory usage"""
+    
+    def test_records_smaller_than_dicts(self):
+        """Test compact records retain fewer bytes per document than dicts"""
+        report = bytes_per_document(500)
+        
+        assert report["record_bytes_per_doc"] < report["dict_bytes_per_doc"]
+    
+    def test_peak_request_allocation_bounded(self):
+        """Test a single search request stays within its allocation budget"""
+        report = peak_request_allocation(iterations=5)
+        
+        assert report["peak_bytes"]["search_materials"] < 64 * 1024
+        assert report["peak_bytes"]["perform_search"] < 64 * 1024
@@ -0,0 +1,90 @@
+"""
+Tests for outline-first notes and slides
+"""
+import pytest
+
+from app.generation.outline import get_outline_store, parse_outline, split_sections
+from benchmarks.llm_stub import echo_reply
+
+
+def outline_reply(messages):
+    """Stub reply: three titles for outline prompts, a section otherwise"""
+    prompt = messages[-1]["content"]
+    if prompt.startswith("List the sections"):
+        return "1. Overview\n2. Rotations\n- Rotations\n3. **Complexity**"
+    return f"## Section\n{prompt[:60]}"
+
+
+@pytest.fixture
+def outline_stub(llm_stub):
+    get_outline_store().clear()
+    llm_stub.reply = outline_reply
+    yield llm_stub
+    llm_stub.reply = echo_reply
+
+
+class TestOutlineParsing:
+    """Test suite for outline parsing"""
+    
+    def test_parse_outline(self):
+        """Test numbering, bullets, slide prefixes and duplicates are removed"""
+        text = "1. Overview\n- Key Ideas\n## Slide 3: Examples\n\n2) Overview\n* Summary"
+        
+        assert parse_outline(text, 10) == ["Overview", "Key Ideas", "Examples", "Summary"]
+        assert parse_outline(text, 2) == ["Overview", "Key Ideas"]
+    
+    def test_split_sections(self):
+        """Test slides split on separators and notes on level-2 headings"""
+        slides = "# Deck\n\n---\n\n## Slide 1: Title\nHello\n\n---\n\n## Slide 2: Next\n### Sub\nMore"
+        notes = "# Notes\n\n## Overview\nText\n\n### Detail\nMore\n\n## Summary\nEnd"
+        
+        assert [title for title, _ in split_sections(slides)] == ["Title", "Next"]
+        assert split_sections(slides)[0][1].startswith("# Deck")
+        assert [title for title, _ in split_sections(notes)] == ["Overview", "Summary"]
+        assert "### Detail" in split_sections(notes)[0][1]
+
+
+class TestOutlineEndpoints:
+    """Test suite for the outline and section endpoints"""
+    
+    def test_template_outline(self, client, api_prefix):
+        """Test without a provider every template section is ready at once"""
+        get_outline_store().clear()
+        outline = client.post(f"{api_prefix}/generate/outline", json={"type": "slides", "prompt": "Heaps"}).json()
+        
+        assert outline["source"] == "template"
+        assert outline["sections"][1]["title"] == "Learning Objectives"
+        assert all(section["ready"] for section in outline["sections"])
+        section = client.get(f"{api_prefix}/generate/{outline['doc_id']}/sections/2").json()
+        assert "Understand the fundamentals of Heaps" in section["content"]
+        assert section["total"] == len(outline["sections"])
+    
+    def test_sections_generated_on_demand(self, llm_client, outline_stub, api_prefix):
+        """Test only opened sections reach the provider, and each only once"""
+        requests = outline_stub.requests
+        outline = llm_client.post(f"{api_prefix}/generate/outline", json={"type": "notes", "prompt": "AVL trees"}).json()
+        
+        assert [section["title"] for section in outline["sections"]] == ["Overview", "Rotations", "Complexity"]
+        assert not any(section["ready"] for section in outline["sections"])
+        assert outline_stub.requests == requests + 1
+        
+        url = f"{api_prefix}/generate/{outline['doc_id']}/sections/2"
+        first = llm_client.get(url).json()
+        second = llm_client.get(url).json()
+        
+        assert "Write section 2, 'Rotations'" in first["content"]
+        assert second == first
+        assert outline_stub.requests == requests + 2
+        again = llm_client.post(f"{api_prefix}/generate/outline", json={"type": "notes", "prompt": "AVL trees"}).json()
+        assert again["doc_id"] == outline["doc_id"]
+        assert [section["ready"] for section in again["sections"]] == [False, True, False]
+        assert outline_stub.requests == requests + 2
+    
+    def test_outline_errors(self, client, api_prefix):
+        """Test unsupported types, unknown documents and sections are rejected"""
+        get_outline_store().clear()
+        assert client.post(f"{api_prefix}/generate/outline", json={"type": "code", "prompt": "Heaps"}).status_code == 422
+        assert client.get(f"{api_prefix}/generate/missing/sections/1").status_code == 404
+        doc_id = client.post(f"{api_prefix}/generate/outline", json={"type": "notes", "prompt": "Heaps"}).json()["doc_id"]
+        assert client.get(f"{api_prefix}/generate/{doc_id}/sections/99").status_code == 404
+        assert client.get(f"{api_prefix}/generate/{doc_id}/sections/0").status_code == 422
@@ -0,0 +1,185 @@
+"""
+Tests for speculative prefetch of chat follow-ups
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.api import chat
+from app.generation.coalesce import SingleFlight
+from app.generation.prefetch import Prefetcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+async def idle(seconds=0.0):
+    await asyncio.sleep(seconds)
+
+
+class TestPrefetcher:
+    """Test suite for Prefetcher"""
+    
+    def test_runs_in_background(self):
+        """Test scheduled work completes after the caller moves on"""
+        prefetcher = Prefetcher()
+        done = []
+        
+        async def work():
+            done.append(1)
+        
+        async def run():
+            assert prefetcher.schedule("a", work)
+            assert done == []
+            await asyncio.sleep(0.01)
+        
+        asyncio.run(run())
+        
+        assert done == [1]
+        assert prefetcher.completed == 1
+        assert prefetcher.in_flight == 0
+    
+    def test_same_key_not_doubled(self):
+        """Test a prediction already in flight is not scheduled again"""
+        prefetcher = Prefetcher()
+        
+        async def run():
+            first = prefetcher.schedule("a", lambda: idle(0.01))
+            second = prefetcher.schedule("a", lambda: idle(0.01))
+            await asyncio.sleep(0.02)
+            return first, second
+        
+        assert asyncio.run(run()) == (True, False)
+    
+    def test_concurrency_budget(self):
+        """Test no more than max_tasks run at once"""
+        prefetcher = Prefetcher(max_tasks=2)
+        
+        async def run():
+            scheduled = [prefetcher.schedule(n, lambda: idle(0.01)) for n in range(4)]
+            await asyncio.sleep(0.02)
+            return scheduled
+        
+        assert asyncio.run(run()) == [True, True, False, False]
+        assert prefetcher.skipped_budget == 2
+    
+    def test_rate_budget(self):
+        """Test the per-minute budget refills after a minute"""
+        clock = FakeClock()
+        prefetcher = Prefetcher(max_tasks=10, per_minute=2, clock=clock)
+        
+        async def run():
+            scheduled = [prefetcher.schedule(n, idle) for n in range(3)]
+            clock.now = 61
+            scheduled.append(prefetcher.schedule(3, idle))
+            await asyncio.sleep(0)
+            return scheduled
+        
+        assert asyncio.run(run()) == [True, True, False, True]
+    
+    def test_load_cancels_prefetch(self):
+        """Test reaching the load threshold cancels running work and refuses new work"""
+        prefetcher = Prefetcher(load_threshold=2)
+        
+        async def run():
+            prefetcher.schedule("slow", lambda: idle(1))
+            await asyncio.sleep(0)
+            with prefetcher.foreground_request():
+                assert prefetcher.in_flight == 1
+                with prefetcher.foreground_request():
+                    # The budget slot is held until the cancelled work has actually stopped
+                    assert prefetcher.in_flight == 1
+                    await asyncio.sleep(0.01)
+                    assert prefetcher.in_flight == 0
+                    assert not prefetcher.schedule("other", idle)
+            return prefetcher.schedule("after", idle)
+        
+        assert asyncio.run(run()) is True
+        assert prefetcher.cancelled == 1
+        assert prefetcher.skipped_load == 1
+
+
+    def test_cancel_stops_coalesced_work(self):
+        """Test cancelling a prefetch also stops the shared computation only it was waiting for"""
+        prefetcher = Prefetcher(load_threshold=1)
+        flight = SingleFlight()
+        provider_calls = []
+        
+        async def provider_call():
+            try:
+                await asyncio.sleep(0.2)
+                provider_calls.append("finished")
+            except asyncio.CancelledError:
+                provider_calls.append("cancelled")
+                raise
+        
+        async def run():
+            prefetcher.schedule("notes", lambda: flight.do("notes", provider_call))
+            await asyncio.sleep(0.01)
+            with prefetcher.foreground_request():
+                pass
+            await asyncio.sleep(0.3)
+        
+        asyncio.run(run())
+        
+        assert provider_calls == ["cancelled"]
+        assert prefetcher.cancelled == 1
+        assert flight.abandoned == 1
+        assert prefetcher.in_flight == 0
+    
+    def test_cancel_keeps_work_a_user_joined(self):
+        """Test a computation a user request also waits for survives the prefetch being cancelled"""
+        prefetcher = Prefetcher(load_threshold=1)
+        flight = SingleFlight()
+        
+        async def provider_call():
+            await asyncio.sleep(0.05)
+            return "content"
+        
+        async def run():
+            prefetcher.schedule("notes", lambda: flight.do("notes", provider_call))
+            await asyncio.sleep(0.01)
+            with prefetcher.foreground_request():
+                return await flight.do("notes", provider_call)
+        
+        assert asyncio.run(run()) == "content"
+        assert flight.executions == 1
+        assert flight.abandoned == 0
+
+
+class TestChatPrefetch:
+    """Test suite for prefetching in the chat router"""
+    
+    @pytest.fixture
+    def prefetcher(self, monkeypatch):
+        prefetcher = Prefetcher()
+        monkeypatch.setattr(chat, "active_prefetcher", lambda: prefetcher)
+        chat.SEARCH_CACHE.clear()
+        return prefetcher
+    
+    def test_explanation_warms_follow_ups(self, llm_client, llm_stub, prefetcher, api_prefix):
+        """Test notes and code requested after an explanation come from warm caches"""
+        llm_client.post(f"{api_prefix}/chat", json={"messages": [], "message": "Explain recursion"})
+        deadline = time.monotonic() + 5
+        while prefetcher.completed < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert prefetcher.completed == 3
+        assert len(chat.SEARCH_CACHE) == 1
+        requests = llm_stub.requests
+        notes = llm_client.post(f"{api_prefix}/chat", json={"messages": [], "message": "Generate notes on recursion"})
+        code = llm_client.post(f"{api_prefix}/chat", json={"messages": [], "message": "Generate code for recursion"})
+        
+        assert llm_stub.requests == requests
+        assert "recursion" in notes.json()["generated_content"]
+        assert "Code Example" in code.json()["generated_content"]
+    
+    def test_prefetch_off_by_default(self, client, api_prefix):
+        """Test nothing is prefetched unless enabled"""
+        assert chat.active_prefetcher() is None
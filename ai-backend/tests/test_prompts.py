@@ -0,0 +1,89 @@
+"""
+Tests for the file-based prompt template engine
+"""
+import os
+
+import pytest
+
+from app.generation.templates import CompiledTemplate, PromptRegistry, TemplateError, get_prompt_registry
+from benchmarks.prompt_render import render_cost
+
+
+class TestCompiledTemplate:
+    """Test suite for CompiledTemplate"""
+    
+    def test_render(self):
+        """Test placeholders are filled and braces elsewhere are kept"""
+        template = CompiledTemplate("t", "def f():\n    return {'x': 1}  # {{ name }} / {{name}}\n")
+        
+        assert template.variables == {"name"}
+        assert template.render(name="demo") == "def f():\n    return {'x': 1}  # demo / demo\n"
+    
+    def test_static_template(self):
+        """Test a template without placeholders renders its text"""
+        assert CompiledTemplate("t", "static").render() == "static"
+    
+    def test_missing_variable(self):
+        """Test a missing variable raises TemplateError"""
+        with pytest.raises(TemplateError):
+            CompiledTemplate("t", "Hello {{ who }}").render()
+
+
+class TestPromptRegistry:
+    """Test suite for PromptRegistry"""
+    
+    def test_loads_prompt_files(self):
+        """Test every shipped template is compiled at startup"""
+        names = get_prompt_registry().names()
+        
+        assert {"generate/notes", "generate/code_default", "theory/system", "lab_code/task", "context"} <= set(names)
+    
+    def test_unknown_template(self, tmp_path):
+        """Test unknown and path-like names are rejected"""
+        registry = PromptRegistry(tmp_path)
+        
+        with pytest.raises(TemplateError):
+            registry.get("missing")
+        with pytest.raises(TemplateError):
+            registry.get("../generation/prompts/context")
+    
+    def test_hot_reload(self, tmp_path):
+        """Test an edited file is recompiled once its mtime changes"""
+        path = tmp_path / "greeting.tmpl"
+        path.write_text("Hello {{ name }}")
+        registry = PromptRegistry(tmp_path, reload_interval=0)
+        assert registry.render("greeting", name="Ada") == "Hello Ada"
+        
+        path.write_text("Goodbye {{ name }}")
+        mtime = os.stat(path).st_mtime + 5
+        os.utime(path, (mtime, mtime))
+        
+        assert registry.render("greeting", name="Ada") == "Goodbye Ada"
+        assert registry.reloads == 1
+    
+    def test_reload_disabled(self, tmp_path):
+        """Test a negative interval keeps the first compiled version"""
+        path = tmp_path / "greeting.tmpl"
+        path.write_text("Hello")
+        registry = PromptRegistry(tmp_path, reload_interval=-1)
+        path.write_text("Goodbye")
+        os.utime(path, (os.stat(path).st_mtime + 5,) * 2)
+        
+        assert registry.render("greeting") == "Hello"
+    
+    def test_generate_renders_from_files(self, client, api_prefix):
+        """Test /generate template responses come from the prompt files"""
+        response = client.post(f"{api_prefix}/generate", json={"type": "code", "prompt": "Stack", "language": "Kotlin"})
+        
+        assert response.json()["content"].startswith("// Stack\n// Implementation in Kotlin\n")
+
+
+@pytest.mark.slow
+class TestPromptBenchmark:
+    """Test suite guarding prompt rendering cost"""
+    
+    def test_compiled_render_is_cheaper(self):
+        """Test precompiled rendering beats reading and substituting per request"""
+        for costs in render_cost(number=300).values():
+            assert costs["compiled_us"] < costs["uncompiled_us"]
+            assert costs["compiled_us"] < 100
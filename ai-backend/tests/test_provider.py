@@ -0,0 +1,149 @@
+"""
+Tests for the pooled LLM provider client, run against the local stub server
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import Settings
+from app.generation.lab_code_generator import CodeExtractor, extract_code
+from app.generation.provider import (
+    Completion, LLMProvider, OpenAICompatibleProvider, ProviderError, create_http_client, create_provider, get_provider,
+)
+
+
+MESSAGES = [{"role": "user", "content": "Explain recursion"}]
+
+
+def make_provider(url, **settings):
+    return OpenAICompatibleProvider(create_http_client(Settings(**settings), url), "stub-model")
+
+
+class TestProvider:
+    """Test suite for OpenAICompatibleProvider"""
+    
+    def test_complete(self, llm_stub):
+        """Test a completion round trip"""
+        async def run():
+            provider = make_provider(llm_stub.url)
+            try:
+                return await provider.complete(MESSAGES)
+            finally:
+                await provider.close()
+        
+        completion = asyncio.run(run())
+        
+        assert completion.text == "Stub completion for: Explain recursion"
+        assert completion.model == "stub-model"
+        assert completion.completion_tokens > 0
+    
+    def test_pool_limits_connections(self, llm_stub):
+        """Test concurrent requests share at most max_connections connections"""
+        llm_stub.connections.clear()
+        llm_stub.latency = 0.02
+        
+        async def run():
+            provider = make_provider(llm_stub.url, llm_max_connections=4, llm_max_keepalive_connections=4)
+            try:
+                return await asyncio.gather(*(provider.complete(MESSAGES) for _ in range(40)))
+            finally:
+                await provider.close()
+        
+        try:
+            completions = asyncio.run(run())
+        finally:
+            llm_stub.latency = 0.0
+        
+        assert len(completions) == 40
+        assert len(llm_stub.connections) <= 4
+    
+    def test_http_error_raises_provider_error(self, llm_stub):
+        """Test a failing provider raises ProviderError"""
+        llm_stub.failure_rate = 1.0
+        
+        async def run():
+            provider = make_provider(llm_stub.url)
+            try:
+                await provider.complete(MESSAGES)
+            finally:
+                await provider.close()
+        
+        try:
+            with pytest.raises(ProviderError):
+                asyncio.run(run())
+        finally:
+            llm_stub.failure_rate = 0.0
+    
+    def test_unconfigured_provider(self):
+        """Test no provider is created without a key or base URL"""
+        assert create_provider(Settings(openai_api_key=None, llm_base_url=None)) is None
+    
+    def test_provider_interface_is_abstract(self):
+        """Test a provider must implement both complete and stream"""
+        class CompleteOnly(LLMProvider):
+            async def complete(self, messages, max_tokens=1000, temperature=0.3):
+                return Completion("text", "model")
+        
+        with pytest.raises(TypeError):
+            LLMProvider()
+        with pytest.raises(TypeError):
+            CompleteOnly()
+    
+    def test_extract_code(self):
+        """Test fenced replies are reduced to their code"""
+        assert extract_code("Here:\n```python\nprint(1)\n```\nDone") == "print(1)\n"
+        assert extract_code("print(1)") == "print(1)\n"
+        assert extract_code("```python\nprint(1)\nprint(2") == "print(1)\nprint(2\n"
+    
+    def test_code_extractor_matches_extract_code(self):
+        """Test code extracted delta by delta equals extract_code of the whole reply"""
+        replies = ["Here:\n```python\nprint(1)\n\n  x = 2  \n```\nDone ```x\ny```", "print(1)", "```js\nlet a = `b`;\n```"]
+        for reply in replies:
+            for size in (1, 2, 5):
+                extractor = CodeExtractor()
+                code = "".join(extractor.feed(reply[i:i + size]) for i in range(0, len(reply), size)) + extractor.finish()
+                assert code == extract_code(reply)
+
+
+class TestProviderLifespan:
+    """Test suite for routers backed by the lifespan provider"""
+    
+    def test_generate_uses_provider(self, llm_client, api_prefix):
+        """Test /generate serves provider output when a provider is configured"""
+        response = llm_client.post(f"{api_prefix}/generate", json={"type": "notes", "prompt": "Recursion"})
+        
+        assert response.status_code == 200
+        assert response.json()["content"].startswith("Stub completion for: Write study notes on Recursion")
+    
+    def test_generation_uses_provider(self, llm_client, api_prefix):
+        """Test /generation/generate passes context to the provider"""
+        response = llm_client.post(
+            f"{api_prefix}/generation/generate",
+            json={"prompt": "Stacks", "generation_type": "theory", "context": ["LIFO order"]}
+        )
+        
+        assert "LIFO order" in response.json()["content"]
+        assert llm_client.get(f"{api_prefix}/generation/status").json()["models"] == ["stub-model"]
+    
+    def test_provider_failure_falls_back_to_template(self, llm_client, llm_stub, api_prefix):
+        """Test provider errors fall back to templates"""
+        llm_stub.failure_rate = 1.0
+        try:
+            response = llm_client.post(f"{api_prefix}/generate", json={"type": "summary", "prompt": "Queues"})
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        assert response.status_code == 200
+        assert response.json()["content"].startswith("## Summary: Queues")
+    
+    def test_provider_closed_at_shutdown(self, test_app, llm_stub, monkeypatch):
+        """Test the provider lives for the lifespan only"""
+        monkeypatch.setattr(main, "get_settings", lambda: Settings(llm_base_url=llm_stub.url))
+        with TestClient(test_app):
+            provider = get_provider()
+            assert provider is not None
+        
+        assert get_provider() is None
+        assert provider.client.is_closed
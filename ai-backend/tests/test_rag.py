@@ -3,6 +3,8 @@ Tests for RAG router endpoints
 """
 import pytest
 
+from tests.test_ingestion import LECTURE, multipart_body
+
 
 class TestRAGRouter:
     """Test suite for RAG router"""
@@ -41,3 +43,78 @@ class TestRAGRouter:
         response = client.post(f"{api_prefix}/rag/retrieve", json={})
         
         assert response.status_code == 422  # Validation error
+    
+    def test_rag_retrieve_ids_mode(self, client, api_prefix):
+        """Test ids mode returns only ids, scores and offsets"""
+        response = client.post(
+            f"{api_prefix}/rag/retrieve",
+            json={"query": "algorithms", "top_k": 3, "mode": "ids"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["mode"] == "ids"
+        assert 0 < len(data["documents"]) <= 3
+        for document in data["documents"]:
+            assert set(document) == {"id", "score", "doc_id", "start", "end"}
+    
+    def test_rag_retrieve_full_mode(self, client, api_prefix):
+        """Test full mode hydrates content for each hit"""
+        response = client.post(f"{api_prefix}/rag/retrieve", json={"query": "algorithms", "top_k": 3})
+        
+        documents = response.json()["documents"]
+        assert documents
+        assert all(document["content"] for document in documents)
+        scores = [document["score"] for document in documents]
+        assert scores == sorted(scores, reverse=True)
+
+
+class TestBatchGet:
+    """Test suite for documents:batchGet"""
+    
+    def test_batch_get_materials(self, client, api_prefix):
+        """Test materials come back in request order with missing ids reported"""
+        response = client.post(
+            f"{api_prefix}/rag/documents:batchGet",
+            json={"ids": ["lab-1", "unknown", "theory-1"]}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [d["id"] for d in data["documents"]] == ["lab-1", "theory-1"]
+        assert data["missing"] == ["unknown"]
+        assert data["documents"][0]["content"]
+    
+    def test_batch_get_without_content(self, client, api_prefix):
+        """Test content can be left out"""
+        response = client.post(
+            f"{api_prefix}/rag/documents:batchGet",
+            json={"ids": ["lab-1"], "include_content": False}
+        )
+        
+        assert "content" not in response.json()["documents"][0]
+    
+    def test_batch_get_uploaded_chunks_and_document(self, client, api_prefix, material_index):
+        """Test chunks resolve to their stored text and documents are reassembled"""
+        body, content_type = multipart_body([("sorting.md", "text/markdown", LECTURE.encode())])
+        client.post(f"{api_prefix}/rag/ingest/upload", content=body, headers={"Content-Type": content_type})
+        chunk_ids = [r.id for r in material_index.records if r.title == "sorting.md"]
+        doc_id = chunk_ids[0].split(":")[0]
+        
+        response = client.post(
+            f"{api_prefix}/rag/documents:batchGet",
+            json={"ids": [chunk_ids[1], doc_id]}
+        )
+        
+        chunk, document = response.json()["documents"]
+        assert chunk["kind"] == "chunk"
+        assert chunk["content"] == LECTURE[chunk["start"]:chunk["end"]]
+        assert document["kind"] == "document"
+        assert document["chunks"] == len(chunk_ids)
+        assert document["content"] == LECTURE
+    
+    def test_batch_get_validation(self, client, api_prefix):
+        """Test empty and oversized batches are rejected"""
+        assert client.post(f"{api_prefix}/rag/documents:batchGet", json={"ids": []}).status_code == 422
+        too_many = {"ids": [f"id-{i}" for i in range(101)]}
+        assert client.post(f"{api_prefix}/rag/documents:batchGet", json=too_many).status_code == 422
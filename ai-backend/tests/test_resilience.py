@@ -0,0 +1,208 @@
+"""
+Tests for hedged provider requests and the circuit breaker, run against the local stub server
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import Settings
+from app.generation.cache import get_generation_cache
+from app.generation.provider import Completion, LLMProvider, OpenAICompatibleProvider, ProviderError, create_http_client
+from app.generation.resilience import CircuitBreaker, CircuitOpenError, ResilientProvider
+
+
+MESSAGES = [{"role": "user", "content": "Explain recursion"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class ScriptedProvider(LLMProvider):
+    """Provider whose calls sleep and then succeed or fail in a scripted order"""
+    name = "scripted"
+    
+    def __init__(self, script):
+        self.script = list(script)
+    
+    async def complete(self, messages, max_tokens=1000, temperature=0.3):
+        delay, fails = self.script.pop(0) if self.script else (0.0, False)
+        await asyncio.sleep(delay)
+        if fails:
+            raise ProviderError("scripted failure")
+        return Completion("ok", self.model)
+    
+    async def stream(self, messages, max_tokens=1000, temperature=0.3):
+        yield "ok"
+
+
+def make_provider(url, **options):
+    inner = OpenAICompatibleProvider(create_http_client(Settings(), url), "stub-model")
+    return ResilientProvider(inner, **options)
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker"""
+    
+    def test_opens_on_error_spike(self):
+        """Test the breaker opens once enough recent calls failed"""
+        breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, window=10)
+        for success in (True, False, True):
+            breaker.record(success)
+        assert breaker.state == "closed"
+        breaker.record(False)
+        
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        assert breaker.stats()["rejected"] == 1
+    
+    def test_half_open_probe(self):
+        """Test after the cooldown one probe decides whether the circuit closes"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_requests=1, cooldown=30, clock=clock)
+        breaker.record(False)
+        clock.now = 31
+        
+        assert breaker.allow()
+        assert not breaker.allow()  # Only one probe at a time
+        breaker.record(False)
+        assert breaker.state == "open"
+        clock.now = 62
+        assert breaker.allow()
+        breaker.record(True)
+        assert breaker.state == "closed"
+        assert breaker.allow()
+    
+    def test_abandoned_probe_released(self):
+        """Test a probe cancelled without an outcome lets the next call probe"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(min_requests=1, cooldown=30, clock=clock)
+        breaker.record(False)
+        clock.now = 31
+        assert breaker.allow()
+        breaker.release()
+        
+        assert breaker.allow()
+
+
+class TestResilientProvider:
+    """Test suite for ResilientProvider against the stub"""
+    
+    def test_hedge_beats_slow_call(self, llm_stub):
+        """Test a slow call is hedged after the latency percentile and the fast duplicate wins"""
+        async def run():
+            provider = make_provider(llm_stub.url, hedge=True, hedge_min_delay=0.05)
+            try:
+                for _ in range(20):
+                    await provider.complete(MESSAGES)
+                llm_stub.latency = 1.0
+                slow = asyncio.ensure_future(provider.complete(MESSAGES))
+                await asyncio.sleep(0.02)  # The first call has reached the stub with the long delay
+                llm_stub.latency = 0.0
+                started = time.perf_counter()
+                completion = await slow
+                return provider, completion, time.perf_counter() - started
+            finally:
+                llm_stub.latency = 0.0
+                await provider.close()
+        
+        provider, completion, elapsed = asyncio.run(run())
+        
+        assert completion.text == "Stub completion for: Explain recursion"
+        assert elapsed < 0.5
+        assert provider.hedged == 1
+        assert provider.hedge_wins == 1
+        assert provider.stats()["hedge_rate"] == round(1 / 21, 4)
+    
+    def test_hedge_rate_capped(self, llm_stub):
+        """Test no more than hedge_max_rate of calls are hedged"""
+        async def run():
+            provider = make_provider(llm_stub.url, hedge=True, hedge_min_delay=0.0, hedge_max_rate=0.1)
+            try:
+                for _ in range(20):
+                    await provider.complete(MESSAGES)
+                llm_stub.latency = 0.05
+                await asyncio.gather(*(provider.complete(MESSAGES) for _ in range(20)))
+                return provider
+            finally:
+                llm_stub.latency = 0.0
+                await provider.close()
+        
+        provider = asyncio.run(run())
+        
+        assert 1 <= provider.hedged <= 0.1 * provider.requests
+    
+    def test_breaker_fails_fast(self, llm_stub):
+        """Test once the breaker opens calls fail without reaching the provider"""
+        async def run():
+            provider = make_provider(llm_stub.url, breaker=CircuitBreaker(min_requests=3))
+            try:
+                for _ in range(3):
+                    with pytest.raises(ProviderError):
+                        await provider.complete(MESSAGES)
+                requests = llm_stub.requests
+                with pytest.raises(CircuitOpenError):
+                    await provider.complete(MESSAGES)
+                return provider, llm_stub.requests - requests
+            finally:
+                await provider.close()
+        
+        llm_stub.failure_rate = 1.0
+        try:
+            provider, sent = asyncio.run(run())
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        assert sent == 0
+        assert provider.stats()["breaker"]["state"] == "open"
+    
+    @pytest.mark.parametrize("primary_fails,outcome", [(False, True), (True, False)])
+    def test_hedged_call_is_one_breaker_outcome(self, primary_fails, outcome):
+        """Test a hedged call counts once: as a success if any attempt succeeds, a failure only if both fail"""
+        async def run():
+            # Twenty fast successes set the hedge delay, then a slow primary is hedged by a failing duplicate
+            inner = ScriptedProvider([(0.0, False)] * 20 + [(0.1, primary_fails), (0.0, True)])
+            provider = ResilientProvider(inner, breaker=CircuitBreaker(min_requests=100, window=100), hedge=True, hedge_min_delay=0.02)
+            for _ in range(20):
+                await provider.complete(MESSAGES)
+            try:
+                await provider.complete(MESSAGES)
+            except ProviderError:
+                pass
+            return provider
+        
+        provider = asyncio.run(run())
+        
+        assert provider.hedged == 1
+        assert list(provider.breaker._outcomes) == [True] * 20 + [outcome]
+
+
+class TestBreakerFallback:
+    """Test suite for the breaker behind POST /generate"""
+    
+    def test_open_circuit_serves_templates(self, test_app, llm_stub, monkeypatch, api_prefix):
+        """Test an open circuit falls back to templates at once and shows in metrics"""
+        settings = Settings(llm_base_url=llm_stub.url, llm_model="stub-model", llm_breaker_min_requests=3)
+        monkeypatch.setattr(main, "get_settings", lambda: settings)
+        get_generation_cache().clear()
+        llm_stub.failure_rate = 1.0
+        try:
+            with TestClient(test_app) as client:
+                for topic in ("Queues", "Stacks", "Heaps"):
+                    client.post(f"{api_prefix}/generate", json={"type": "summary", "prompt": topic})
+                requests = llm_stub.requests
+                response = client.post(f"{api_prefix}/generate", json={"type": "summary", "prompt": "Tries"})
+                metrics = client.get(f"{api_prefix}/health/metrics").json()["metrics"]["llm_resilience"]
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        assert response.json()["content"].startswith("## Summary: Tries")
+        assert llm_stub.requests == requests
+        assert metrics["breaker"]["state"] == "open"
@@ -0,0 +1,248 @@
+"""
+Tests for the keyword index and pruned top-k retrieval
+"""
+import random
+import threading
+
+import pytest
+
+from app.api.search import MATERIAL_RECORDS
+from app.rag.records import load_records
+from app.rag.records import MaterialRecord
+from app.rag.retriever import MaterialIndex, score_record
+from app.rag.retriever import neighbors
+from app.rag.retriever.neighbors import NeighborGraph, record_features
+from app.rag.retriever.positions import ParsedQuery, min_span
+from benchmarks.memory import synthetic_materials
+
+
+QUERIES = [
+    "binary search tree",
+    "sort",
+    "what is the time complexity of merge sort compared to quick sort and heap sort",
+    "how do i implement a hash table with chaining and open addressing in python",
+    "graphs",
+    "introduction",
+    "a",
+    "zzzz",
+    "dynamic programming memoization tabulation optimization recursion backtracking",
+    '"binary search tree"',
+    '"merge sort" complexity',
+    'tree search binary',
+    '"no such phrase"',
+]
+
+
+def brute_force(records, query, k, min_score, keep_matched):
+    """Reference implementation: score everything, stable sort, truncate"""
+    results = []
+    for record in records:
+        score, matched = score_record(query, record)
+        if score > min_score or (keep_matched and matched):
+            results.append((record.id, round(score, 2), matched))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results[:k]
+
+
+class TestMaterialIndex:
+    """Test suite for MaterialIndex"""
+    
+    @pytest.mark.parametrize("query", QUERIES)
+    @pytest.mark.parametrize("k,min_score,keep_matched", [(10, 0.1, True), (5, 0.2, False), (1, 0.2, False)])
+    def test_top_k_matches_full_scan(self, monkeypatch, query, k, min_score, keep_matched):
+        """Test pruned top-k returns exactly what a full scan returns"""
+        monkeypatch.setattr(random, "uniform", lambda a, b: a)
+        records = load_records(synthetic_materials(200))
+        index = MaterialIndex(records)
+        
+        expected = brute_force(records, query, k, min_score, keep_matched)
+        actual = [(h.record.id, h.score, list(h.matched)) for h in index.top_k(query, k, min_score, keep_matched)]
+        
+        assert actual == expected
+        if keep_matched:
+            assert index.count_matches(query) == len(brute_force(records, query, len(records), min_score, keep_matched))
+    
+    def test_long_query_skips_documents(self, monkeypatch):
+        """Test documents that cannot enter the top-k are not scored"""
+        monkeypatch.setattr(random, "uniform", lambda a, b: a)
+        index = MaterialIndex(load_records(synthetic_materials(400)))
+        scored = []
+        original = index._score
+        monkeypatch.setattr(index, "_score", lambda o, *args: scored.append(o) or original(o, *args))
+        
+        hits = index.top_k(QUERIES[3], 5, min_score=0.2)
+        
+        assert len(hits) == 5
+        assert len(scored) < len(index)
+    
+    def test_count_matches(self):
+        """Test match count covers keyword and phrase matches"""
+        index = MaterialIndex(MATERIAL_RECORDS)
+        
+        assert index.count_matches("introduction") == 2
+        assert index.count_matches("zzzz") == 0
+        assert index.count_matches("algorithms") == 4
+    
+    def test_incremental_add(self):
+        """Test records added after construction are searchable"""
+        index = MaterialIndex(MATERIAL_RECORDS[:2])
+        index.add(MATERIAL_RECORDS[2])
+        
+        hits = index.top_k("bst", 5, min_score=0.1)
+        
+        assert [h.record.id for h in hits] == ["lab-1"]
+    
+    def test_zero_k(self):
+        """Test k of zero returns nothing"""
+        assert len(MaterialIndex(MATERIAL_RECORDS).top_k("sort", 0)) == 0
+    
+    def test_search_during_add(self):
+        """Test searches in other threads see whole records while records are added"""
+        records = load_records(synthetic_materials(300))
+        index = MaterialIndex(records[:50])
+        errors = []
+        done = threading.Event()
+        
+        def search():
+            try:
+                while not done.is_set():
+                    for query in QUERIES:
+                        hits = index.search(query, 5, min_score=0.1)
+                        assert all(hit.record is index.get(hit.record.id) for hit in hits.top(5))
+                        index.count_matches(query)
+            except Exception as exc:
+                errors.append(exc)
+        
+        threads = [threading.Thread(target=search) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        try:
+            for record in records[50:]:
+                index.add(record)
+        finally:
+            done.set()
+            for thread in threads:
+                thread.join()
+        
+        assert errors == []
+        assert len(index) == len(records)
+    
+    def test_reads_wait_for_writer(self):
+        """Test a search started while the index is being written waits for the write"""
+        index = MaterialIndex(MATERIAL_RECORDS)
+        finished = threading.Event()
+        
+        def search():
+            index.search("sort", 5)
+            finished.set()
+        
+        reader = threading.Thread(target=search)
+        
+        with index.lock.write():
+            reader.start()
+            assert not finished.wait(0.05)
+        reader.join()
+        
+        assert finished.is_set()
+
+
+class TestPositionalQueries:
+    """Test suite for phrase and proximity matching"""
+    
+    @staticmethod
+    def record(id, title, excerpt="", keywords=()):
+        return MaterialRecord(id=id, title=title, type="notes", excerpt=excerpt, source="Notes", keywords=keywords)
+    
+    def test_parse_query(self):
+        """Test quoted segments become phrases and quotes are stripped"""
+        parsed = ParsedQuery('"Binary Search Tree" insert')
+        
+        assert parsed.phrases == (("binary", "search", "tree"),)
+        assert parsed.terms == ("binary", "search", "tree", "insert")
+        assert '"' not in parsed.lower
+    
+    def test_min_span(self):
+        """Test the shortest window covering every term"""
+        assert min_span([[0, 9], [10], [4, 12]]) == 4
+        assert min_span([[3], [4]]) == 2
+    
+    def test_phrase_requires_token_boundaries(self):
+        """Test phrases match whole tokens, not substrings"""
+        index = MaterialIndex([self.record("a", "Sorting Algorithms"), self.record("b", "Sort Order")])
+        
+        assert index.positions.phrase("title", ("sort",)) == {1}
+    
+    def test_quoted_phrase_is_required(self, monkeypatch):
+        """Test records without a quoted phrase are excluded"""
+        monkeypatch.setattr(random, "uniform", lambda a, b: a)
+        index = MaterialIndex([
+            self.record("a", "Binary Search Tree Basics", keywords=["tree"]),
+            self.record("b", "Search in a Binary Tree", keywords=["tree"]),
+            self.record("c", "Heaps", excerpt="A heap is not a binary search tree.", keywords=["heap"]),
+        ])
+        
+        ids = {h.record.id for h in index.top_k('"binary search tree"', 10, keep_matched=True)}
+        
+        assert ids == {"a", "c"}
+        assert index.count_matches('"binary search tree"') == 2
+    
+    def test_proximity_ranks_closer_terms_higher(self, monkeypatch):
+        """Test records with the terms near each other score higher"""
+        monkeypatch.setattr(random, "uniform", lambda a, b: a)
+        index = MaterialIndex([
+            self.record("far", "Notes", excerpt="A tree appears often; a search over it comes next."),
+            self.record("near", "Notes", excerpt="Each search tree keeps its keys ordered."),
+        ])
+        
+        hits = index.top_k("tree search", 2)
+        
+        assert [h.record.id for h in hits] == ["near", "far"]
+        assert hits.hit(0).score == 0.1
+        assert hits.hit(1).score == 0.04
+
+
+class TestNeighborGraph:
+    """Test suite for the nearest-neighbour graph"""
+    
+    def test_incremental_matches_brute_force(self):
+        """Test neighbour lists built one record at a time equal an all-pairs computation"""
+        records = load_records(synthetic_materials(120))
+        graph = NeighborGraph(k=5)
+        for ordinal, record in enumerate(records):
+            graph.add(ordinal, record.title_lower, record.excerpt_lower, record.keywords_lower)
+        features = [record_features(r.title_lower, r.excerpt_lower, r.keywords_lower) for r in records]
+        
+        for ordinal, mine in enumerate(features):
+            similarities = []
+            for other, theirs in enumerate(features):
+                dot = sum(w * theirs.get(t, 0.0) for t, w in mine.items())
+                if other != ordinal and dot > 0:
+                    similarities.append(dot)
+            expected = sorted(similarities, reverse=True)[:5]
+            actual = [score for _, score in graph.neighbors(ordinal)]
+            assert actual == pytest.approx(expected, abs=1e-5)
+    
+    def test_candidates_are_bounded(self, monkeypatch):
+        """Test adding a record compares it with at most max_tokens * max_postings others"""
+        compared = []
+        similarity = neighbors._similarity
+        monkeypatch.setattr(neighbors, "_similarity", lambda a, b: compared.append(1) or similarity(a, b))
+        graph = NeighborGraph(k=3, max_tokens=2, max_postings=10)
+        for ordinal in range(200):
+            graph.add(ordinal, f"sorting lecture {ordinal}", "merge sort and quick sort", ["sorting"])
+            assert len(compared) <= 20
+            compared.clear()
+        
+        assert len(graph.neighbors(199)) == 3
+    
+    def test_similar_updates_on_add(self):
+        """Test a new record shows up as a neighbour of existing ones"""
+        index = MaterialIndex(MATERIAL_RECORDS)
+        index.add(MaterialRecord(
+            id="extra", title="Implementing a Binary Search Tree in Java", type="lab",
+            excerpt="Insert and delete nodes in a binary search tree.", source="Lab 9",
+            keywords=["binary search tree", "bst", "insert", "delete"],
+        ))
+        
+        assert index.similar("lab-1", 1)[0].record.id == "extra"
+        assert index.similar("missing", 3) is None
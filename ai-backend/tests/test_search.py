@@ -0,0 +1,98 @@
+"""
+Tests for Search router endpoints and compact material records
+"""
+import pytest
+
+from app.api.search import MATERIAL_RECORDS, MOCK_MATERIALS
+from app.rag.records import HitList, MaterialRecord
+
+
+class TestMaterialRecords:
+    """Test suite for compact material records"""
+    
+    def test_records_round_trip(self):
+        """Test records convert back to the original material dicts"""
+        for material, record in zip(MOCK_MATERIALS, MATERIAL_RECORDS):
+            assert record.to_dict() == material
+    
+    def test_records_are_slotted(self):
+        """Test records do not carry a per-instance __dict__"""
+        assert not hasattr(MATERIAL_RECORDS[0], "__dict__")
+    
+    def test_repeated_fields_are_interned(self):
+        """Test equal type and source strings share one object"""
+        first = MaterialRecord.from_dict({**MOCK_MATERIALS[0], "source": "".join("Week 1 - Notes")})
+        second = MaterialRecord.from_dict({**MOCK_MATERIALS[1], "source": "".join("Week 1 - Notes")})
+        
+        assert first.source is second.source
+        assert first.type is second.type
+    
+    def test_hit_list_sorts_stably(self):
+        """Test hit list orders by score and keeps insertion order on ties"""
+        hits = HitList(MATERIAL_RECORDS)
+        hits.append(0, 0.5)
+        hits.append(1, 0.9)
+        hits.append(2, 0.5)
+        hits.sort()
+        
+        assert [hit.record.id for hit in hits] == ["theory-2", "theory-1", "lab-1"]
+        assert len(hits.top(2)) == 2
+
+
+class TestSearchRouter:
+    """Test suite for Search router"""
+    
+    def test_search_endpoint(self, client, api_prefix):
+        """Test search returns relevant results"""
+        response = client.post(f"{api_prefix}/search", json={"query": "binary search tree"})
+        
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["query"] == "binary search tree"
+        assert data["results"][0]["id"] == "lab-1"
+        assert len(data["results"]) <= 10
+    
+    def test_search_results_sorted(self, client, api_prefix):
+        """Test search results are sorted by relevance"""
+        response = client.post(f"{api_prefix}/search", json={"query": "sorting algorithms"})
+        scores = [r["relevanceScore"] for r in response.json()["results"]]
+        
+        assert scores == sorted(scores, reverse=True)
+    
+    def test_search_quoted_phrase(self, client, api_prefix):
+        """Test a quoted phrase restricts results to materials containing it"""
+        response = client.post(f"{api_prefix}/search", json={"query": '"binary search tree"'})
+        
+        assert [r["id"] for r in response.json()["results"]] == ["lab-1"]
+    
+    def test_similar_materials(self, client, api_prefix):
+        """Test similar materials come from the neighbour graph, most similar first"""
+        response = client.get(f"{api_prefix}/search/similar/theory-1?limit=2")
+        
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert 0 < len(results) <= 2
+        assert "theory-1" not in [r["id"] for r in results]
+        scores = [r["relevanceScore"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+    
+    def test_similar_unknown_material(self, client, api_prefix):
+        """Test similar materials for an unknown id returns 404"""
+        response = client.get(f"{api_prefix}/search/similar/missing")
+        
+        assert response.status_code == 404
+    
+    def test_search_fallback_results(self, client, api_prefix):
+        """Test search falls back to default results when nothing matches"""
+        response = client.post(f"{api_prefix}/search", json={"query": "zzzz"})
+        data = response.json()
+        
+        assert len(data["results"]) == 3
+        assert data["results"][0]["matchedKeywords"] == ["zzzz"]
+    
+    def test_search_validation(self, client, api_prefix):
+        """Test search validates required fields"""
+        response = client.post(f"{api_prefix}/search", json={})
+        
+        assert response.status_code == 422
@@ -0,0 +1,178 @@
+"""
+Tests for the chat session store
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.chat.sessions import SessionHistory, SessionStore, get_session_store
+from app.config import Settings
+from tests.test_streaming import parse_events
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sessions_client(test_app, tmp_path, monkeypatch):
+    """
+    Test client whose lifespan opens a session store in a temporary file
+    """
+    settings = Settings(chat_sessions_path=str(tmp_path / "sessions.sqlite3"), chat_session_max_messages=6)
+    monkeypatch.setattr(main, "get_settings", lambda: settings)
+    with TestClient(test_app) as client:
+        yield client
+
+
+class TestSessionStore:
+    """Test suite for the SQLite-backed session LRU"""
+    
+    def test_history_is_bounded(self, tmp_path):
+        """Test only the last max_messages messages are kept, in memory and on disk"""
+        path = str(tmp_path / "sessions.sqlite3")
+        store = SessionStore(path, max_messages=3, batch_size=100)
+        assert store.history("s1") == []
+        for number in range(5):
+            store.append("s1", "user", f"message {number}")
+        
+        assert [item["content"] for item in store.history("s1")] == ["message 2", "message 3", "message 4"]
+        store.close()
+        
+        reopened = SessionStore(path, max_messages=10)
+        assert [item["content"] for item in reopened.history("s1")] == ["message 2", "message 3", "message 4"]
+        reopened.close()
+    
+    def test_writes_are_batched(self, tmp_path):
+        """Test appends are buffered until batch_size messages are pending"""
+        store = SessionStore(str(tmp_path / "sessions.sqlite3"), batch_size=4)
+        for number in range(3):
+            store.append("s1", "user", f"message {number}")
+        assert store.stats()["pending"] == 3
+        assert store.flushes == 0
+        
+        store.append("s2", "user", "message 3")
+        stats = store.stats()
+        assert stats["pending"] == 0
+        assert stats["flushes"] == 1
+        assert stats["rows_written"] == 4
+        store.close()
+    
+    def test_cold_session_sees_pending_writes(self, tmp_path):
+        """Test loading a session that is not in memory first flushes its buffered messages"""
+        store = SessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=1, batch_size=100)
+        store.history("s1")
+        store.append("s1", "user", "hello")
+        store.history("s2")  # Evicts s1 from memory
+        
+        assert store.evictions == 1
+        assert store.history("s1") == [{"role": "user", "content": "hello"}]
+        assert store.loads == 3
+        store.close()
+    
+    def test_hot_session_is_not_reloaded(self, tmp_path):
+        """Test a session in memory is served without reading the database"""
+        store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+        store.history("s1")
+        store.append("s1", "user", "hello")
+        store.append("s1", "assistant", "hi")
+        
+        assert len(store.history("s1")) == 2
+        assert store.hits == 1
+        assert store.loads == 1
+        store.close()
+    
+    def test_idle_sessions_expire(self, tmp_path):
+        """Test sessions idle for longer than ttl are purged"""
+        clock = FakeClock()
+        store = SessionStore(str(tmp_path / "sessions.sqlite3"), ttl=60.0, clock=clock)
+        store.append("old", "user", "hello")
+        clock.now += 120
+        store.append("new", "user", "hello")
+        store.flush()
+        
+        assert store.purge_expired() == 1
+        assert store.history("old") == []
+        assert len(store.history("new")) == 1
+        store.close()
+    
+    def test_history_is_lazy(self, tmp_path):
+        """Test a session history is not read until it is used"""
+        store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+        history = SessionHistory(store, "s1")
+        assert store.loads == 0
+        
+        assert len(history) == 0
+        assert store.loads == 1
+        list(history)
+        assert store.loads == 1
+        store.close()
+
+
+class TestChatSessions:
+    """Test suite for chat turns kept by session id"""
+    
+    def test_session_started_and_continued(self, sessions_client, api_prefix):
+        """Test a session id is returned and follow-up turns need only the message"""
+        first = sessions_client.post(f"{api_prefix}/chat", json={"message": "hello", "new_session": True}).json()
+        session_id = first["session_id"]
+        assert session_id
+        
+        second = sessions_client.post(
+            f"{api_prefix}/chat",
+            json={"message": "What is recursion?", "session_id": session_id, "enable_search": False},
+        ).json()
+        assert second["session_id"] == session_id
+        
+        history = get_session_store().history(session_id)
+        assert [item["role"] for item in history] == ["user", "assistant", "user", "assistant"]
+        assert history[2]["content"] == "What is recursion?"
+        assert history[3]["content"] == second["response"]
+    
+    def test_sent_history_seeds_session(self, sessions_client, api_prefix):
+        """Test history sent by an older client seeds a new session"""
+        response = sessions_client.post(f"{api_prefix}/chat", json={
+            "message": "hello",
+            "session_id": "legacy",
+            "messages": [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello!"}],
+        })
+        
+        history = get_session_store().history("legacy")
+        assert response.json()["session_id"] == "legacy"
+        assert [item["content"] for item in history[:2]] == ["hi", "Hello!"]
+        assert len(history) == 4
+    
+    def test_legacy_request_stays_stateless(self, sessions_client, api_prefix):
+        """Test a request with history but no session_id is answered from its messages without a session"""
+        store = get_session_store()
+        before = store.stats()
+        response = sessions_client.post(f"{api_prefix}/chat", json={
+            "message": "Explain that again",
+            "messages": [{"role": "user", "content": "Explain recursion"}, {"role": "assistant", "content": "..."}],
+        })
+        
+        assert response.status_code == 200
+        assert response.json()["session_id"] is None
+        after = store.stats()
+        assert (after["hot_sessions"], after["pending"]) == (before["hot_sessions"], before["pending"])
+    
+    def test_stream_records_turn(self, sessions_client, api_prefix):
+        """Test a streamed turn is added to its session and the done event carries the id"""
+        response = sessions_client.post(f"{api_prefix}/chat/stream", json={"message": "hello", "session_id": "streamed"})
+        events = parse_events(response.text)
+        done = events[-1][1]
+        text = "".join(data["text"] for name, data in events if name == "text")
+        
+        assert done["session_id"] == "streamed"
+        assert get_session_store().history("streamed")[-1] == {"role": "assistant", "content": text}
+    
+    def test_stateless_without_store(self, client, api_prefix):
+        """Test chat still works when the session store is not running"""
+        response = client.post(f"{api_prefix}/chat", json={"message": "hello", "messages": []})
+        
+        assert response.status_code == 200
+        assert response.json()["session_id"] is None
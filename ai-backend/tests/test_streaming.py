@@ -0,0 +1,124 @@
+"""
+Tests for SSE streaming generation
+"""
+import asyncio
+import json
+import time
+
+from app.api.generate import GenerateRequest, template_content
+from app.config import Settings
+from app.generation.cache import get_generation_cache
+from app.generation.provider import OpenAICompatibleProvider, create_http_client
+
+
+def parse_events(body):
+    """(event, data) pairs of an SSE body"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def joined_text(events):
+    return "".join(data["text"] for event, data in events if event == "delta")
+
+
+class TestStreamingProvider:
+    """Test suite for provider token streaming"""
+    
+    def test_stream_yields_deltas_before_completion(self, llm_stub):
+        """Test the first delta arrives well before the stream ends"""
+        llm_stub.chunk_delay = 0.02
+        messages = [{"role": "user", "content": "one two three four five six seven eight"}]
+        
+        async def run():
+            provider = OpenAICompatibleProvider(create_http_client(Settings(), llm_stub.url), "stub-model")
+            started = time.perf_counter()
+            arrivals = []
+            deltas = []
+            try:
+                async for delta in provider.stream(messages):
+                    arrivals.append(time.perf_counter() - started)
+                    deltas.append(delta)
+            finally:
+                await provider.close()
+            return deltas, arrivals
+        
+        try:
+            deltas, arrivals = asyncio.run(run())
+        finally:
+            llm_stub.chunk_delay = 0.0
+        
+        assert "".join(deltas) == "Stub completion for: one two three four five six seven eight"
+        assert len(deltas) > 5
+        assert arrivals[0] < arrivals[-1] / 2
+
+
+class TestStreamEndpoint:
+    """Test suite for POST /generate/stream"""
+    
+    def test_stream_without_provider_sends_template(self, client, api_prefix):
+        """Test template content is streamed in sections with a final done event"""
+        response = client.post(f"{api_prefix}/generate/stream", json={"type": "notes", "prompt": "Linked Lists"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.text)
+        assert events[0] == ("start", {"type": "notes"})
+        assert sum(1 for event, _ in events if event == "delta") > 1
+        assert joined_text(events) == template_content(GenerateRequest(type="notes", prompt="Linked Lists"))
+        event, done = events[-1]
+        assert event == "done"
+        assert done["source"] == "template"
+        assert done["format"] == "markdown"
+        assert done["sources"]
+        assert done["validation"]["status"] in ("pass", "warning", "fail")
+    
+    def test_stream_code_validates_syntax(self, client, api_prefix):
+        """Test code streams are validated with the syntax check"""
+        response = client.post(f"{api_prefix}/generate/stream", json={"type": "code", "prompt": "Stack"})
+        
+        done = parse_events(response.text)[-1][1]
+        assert [check["type"] for check in done["validation"]["checks"]] == ["syntax"]
+    
+    def test_stream_with_provider(self, llm_client, api_prefix):
+        """Test provider tokens are forwarded as deltas and then cached"""
+        body = {"type": "summary", "prompt": "Streaming trees"}
+        events = parse_events(llm_client.post(f"{api_prefix}/generate/stream", json=body).text)
+        
+        assert sum(1 for event, _ in events if event == "delta") > 3
+        assert "Streaming trees" in joined_text(events)
+        assert events[-1][1]["source"] == "provider"
+        assert events[-1][1]["complete"] is True
+        
+        again = parse_events(llm_client.post(f"{api_prefix}/generate/stream", json=body).text)
+        assert again[-1][1]["source"] == "cache"
+        assert joined_text(again) == joined_text(events).strip()
+    
+    def test_stream_code_without_fences(self, llm_client, llm_stub, monkeypatch, api_prefix):
+        """Test streamed code is the same bare source that is cached and served without streaming"""
+        monkeypatch.setattr(llm_stub, "reply", lambda messages: "Here it is:\n```python\ndef push(stack, item):\n    stack.append(item)\n```\nHope it helps")
+        body = {"type": "code", "prompt": "Stack push"}
+        events = parse_events(llm_client.post(f"{api_prefix}/generate/stream", json=body).text)
+        again = parse_events(llm_client.post(f"{api_prefix}/generate/stream", json=body).text)
+        
+        assert joined_text(events) == "def push(stack, item):\n    stack.append(item)\n"
+        assert sum(1 for event, _ in events if event == "delta") > 2
+        assert events[-1][1]["format"] == "code"
+        assert events[-1][1]["validation"]["status"] == "pass"
+        assert again[-1][1]["source"] == "cache"
+        assert joined_text(again) == joined_text(events)
+    
+    def test_stream_falls_back_when_provider_fails(self, llm_client, llm_stub, api_prefix):
+        """Test a provider failure before the first token streams the template"""
+        get_generation_cache().clear()
+        llm_stub.failure_rate = 1.0
+        try:
+            response = llm_client.post(f"{api_prefix}/generate/stream", json={"type": "slides", "prompt": "Heaps"})
+        finally:
+            llm_stub.failure_rate = 0.0
+        
+        events = parse_events(response.text)
+        assert events[-1][1]["source"] == "template"
+        assert joined_text(events) == template_content(GenerateRequest(type="slides", prompt="Heaps"))
@@ -0,0 +1,151 @@
+"""
+Tests for the code symbol index
+"""
+import pytest
+
+from app.rag.retriever import SymbolIndex, extract_symbols
+from tests.test_ingestion import multipart_body
+
+
+PYTHON_SOURCE = '''
+class BinarySearchTree:
+    def insert(self, value):
+        self.root = self._insert(self.root, value)
+    
+    def _insert(self, node, value):
+        return node
+
+
+def merge_sort(items):
+    if len(items) <= 1:
+        return items
+    middle = len(items) // 2
+    return merge(merge_sort(items[:middle]), merge_sort(items[middle:]))
+
+
+def merge(left, right):
+    return sorted(left + right)
+'''
+
+JAVA_SOURCE = '''
+public class QuickSort {
+    public static void quickSort(int[] items, int low, int high) {
+        int pivot = partition(items, low, high);
+    }
+    
+    private static int partition(int[] items, int low, int high) {
+        return low;
+    }
+}
+'''
+
+
+class TestSymbolExtraction:
+    """Test suite for extract_symbols"""
+    
+    def test_python_definitions_and_calls(self):
+        """Test Python sources are parsed with ast"""
+        definitions, calls, _ = extract_symbols(PYTHON_SOURCE, "python")
+        kinds = {name: kind for name, kind, _, _ in definitions}
+        
+        assert kinds["BinarySearchTree"] == "class"
+        assert kinds["insert"] == "method"
+        assert kinds["merge_sort"] == "function"
+        assert ("merge_sort", "merge") in calls
+        assert ("insert", "_insert") in calls
+    
+    def test_python_fragment_falls_back_to_lexer(self):
+        """Test a chunk cut mid-function is still indexed"""
+        definitions, _, _ = extract_symbols("def merge_sort(items):\n    if len(items", "python")
+        
+        assert [d[0] for d in definitions] == ["merge_sort"]
+    
+    def test_lexer_for_other_languages(self):
+        """Test Java definitions are found by the lexer"""
+        definitions, calls, _ = extract_symbols(JAVA_SOURCE)
+        names = {name: kind for name, kind, _, _ in definitions}
+        
+        assert names == {"QuickSort": "class", "quickSort": "function", "partition": "function"}
+        assert ("quickSort", "partition") in calls
+    
+    def test_lexer_skips_call_statements(self):
+        """Test statements that call a function are not read as C-style definitions"""
+        source = "int main(void) {\n    return merge(a, b);\n}\nvoid helper(int x)\nreturn merge(a, b)\nmergeSort(items, 0, n)\n"
+        definitions, calls, _ = extract_symbols(source)
+        
+        assert [d[0] for d in definitions] == ["main", "helper"]
+        assert ("main", "merge") in calls
+        assert ("helper", "mergeSort") in calls
+
+
+class TestSymbolIndex:
+    """Test suite for SymbolIndex"""
+    
+    def test_lookup_normalizes_spelling(self):
+        """Test snake_case and camelCase names share a key"""
+        index = SymbolIndex()
+        index.add_source("doc:0", "doc", PYTHON_SOURCE, "python")
+        
+        assert index.lookup("mergeSort")[0].name == "merge_sort"
+        assert index.lookup("merge_sort")[0].line == 10
+        assert index.callers("merge") == {"merge_sort"}
+    
+    def test_match_query(self):
+        """Test free-text queries find definitions"""
+        index = SymbolIndex()
+        index.add_source("doc:0", "doc", PYTHON_SOURCE, "python")
+        
+        assert [s.name for s in index.match_query("merge sort implementation")] == ["merge_sort"]
+        assert {s.name for s in index.match_query("where is insert defined")} == {"insert", "_insert"}
+    
+    def test_overlapping_chunks_deduplicated(self):
+        """Test a definition seen in two overlapping chunks is stored once"""
+        index = SymbolIndex()
+        index.add_source("doc:0", "doc", "def merge(a, b):\n    pass\n", "python", first_line=5)
+        index.add_source("doc:1", "doc", "def merge(a, b):\n    pass\n", "python", first_line=5)
+        
+        assert len(index.lookup("merge")) == 1
+
+
+class TestSymbolSearch:
+    """Test suite for symbol-aware search endpoints"""
+    
+    @pytest.fixture
+    def uploaded(self, client, api_prefix, material_index):
+        body, content_type = multipart_body([("sorting.py", "text/x-python", PYTHON_SOURCE.encode())])
+        response = client.post(f"{api_prefix}/rag/ingest/upload?type=lab", content=body, headers={"Content-Type": content_type})
+        assert response.status_code == 200
+        return material_index
+    
+    def test_search_returns_defining_chunk_first(self, client, api_prefix, uploaded):
+        """Test a symbol query ranks the defining chunk first"""
+        response = client.post(f"{api_prefix}/search", json={"query": "merge_sort implementation"})
+        result = response.json()["results"][0]
+        
+        assert result["title"] == "sorting.py"
+        assert result["matchedKeywords"] == ["merge_sort"]
+    
+    def test_variable_not_pinned(self, client, api_prefix, material_index):
+        """Test a module-level variable named by the query is ranked, not pinned to the top"""
+        body, content_type = multipart_body([("loader.py", "text/x-python", b"data = []\n")])
+        client.post(f"{api_prefix}/rag/ingest/upload?type=lab", content=body, headers={"Content-Type": content_type})
+        
+        results = client.post(f"{api_prefix}/search", json={"query": "data"}).json()["results"]
+        
+        assert all(result["relevanceScore"] < 1.0 for result in results if result["title"] == "loader.py")
+    
+    def test_lookup_symbol_endpoint(self, client, api_prefix, uploaded):
+        """Test the symbol endpoint reports definitions and callers"""
+        response = client.get(f"{api_prefix}/search/symbols/merge")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["definitions"][0]["kind"] == "function"
+        assert data["definitions"][0]["title"] == "sorting.py"
+        assert data["callers"] == ["merge_sort"]
+    
+    def test_lookup_unknown_symbol(self, client, api_prefix, material_index):
+        """Test unknown symbols return 404"""
+        response = client.get(f"{api_prefix}/search/symbols/does_not_exist")
+        
+        assert response.status_code == 404
@@ -0,0 +1,228 @@
+"""
+Tests for the DAG tool controller
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.generation.tool_controller import Ref, ToolCall, ToolController, ToolError
+from app.generation.tools import retrieve, validate
+
+
+async def slow_echo(value, delay=0.05):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def join(left, right):
+    return f"{left}+{right}"
+
+
+async def fail():
+    raise ValueError("tool broke")
+
+
+def run(calls, **options):
+    controller = ToolController(**options)
+    return asyncio.run(controller.run(calls))
+
+
+class TestToolController:
+    """Test suite for ToolController"""
+    
+    def test_independent_calls_run_concurrently(self):
+        """Test three independent calls take about as long as one"""
+        calls = [ToolCall(f"topic{n}", slow_echo, {"value": n, "delay": 0.1}) for n in range(3)]
+        
+        started = time.perf_counter()
+        outcome = run(calls)
+        elapsed = time.perf_counter() - started
+        
+        assert [outcome[f"topic{n}"] for n in range(3)] == [0, 1, 2]
+        assert elapsed < 0.25
+        assert all(stage.status == "ok" for stage in outcome.trace)
+    
+    def test_refs_pass_results_downstream(self):
+        """Test a call waits for its dependencies and receives their results"""
+        outcome = run([
+            ToolCall("joined", join, {"left": Ref("a"), "right": Ref("b")}),
+            ToolCall("a", slow_echo, {"value": "a", "delay": 0.02}),
+            ToolCall("b", slow_echo, {"value": "b", "delay": 0.04}),
+        ])
+        
+        assert outcome["joined"] == "a+b"
+        stages = {stage.name: stage for stage in outcome.trace}
+        assert stages["joined"].waited_ms >= 35
+    
+    def test_failure_skips_dependents(self):
+        """Test a failed call is recorded and its dependents are skipped"""
+        outcome = run([
+            ToolCall("broken", fail),
+            ToolCall("after", slow_echo, {"value": 1}, after=["broken"]),
+            ToolCall("other", slow_echo, {"value": 2, "delay": 0}),
+        ])
+        
+        assert outcome.errors == {"broken": "tool broke", "after": "Dependency failed: broken"}
+        assert outcome["other"] == 2
+        with pytest.raises(ToolError):
+            outcome["after"]
+    
+    def test_per_tool_timeout(self):
+        """Test a call over its own timeout fails without holding up the others"""
+        outcome = run([
+            ToolCall("slow", slow_echo, {"value": 1, "delay": 1}, timeout=0.05),
+            ToolCall("fast", slow_echo, {"value": 2, "delay": 0}),
+        ])
+        
+        assert outcome.errors["slow"] == "Timed out after 0.05s"
+        assert outcome["fast"] == 2
+        assert outcome.elapsed_ms < 500
+    
+    def test_overall_timeout(self):
+        """Test the overall timeout cancels whatever is still running"""
+        outcome = run(
+            [ToolCall("a", slow_echo, {"value": 1, "delay": 1}), ToolCall("b", slow_echo, {"value": 2, "delay": 0})],
+            overall_timeout=0.05,
+        )
+        
+        assert outcome["b"] == 2
+        assert {stage.name: stage.status for stage in outcome.trace}["a"] == "timeout"
+        assert outcome.elapsed_ms < 500
+    
+    def test_identical_calls_are_memoized(self):
+        """Test identical calls within a request run once"""
+        runs = []
+        
+        async def counted(value):
+            runs.append(value)
+            await asyncio.sleep(0.01)
+            return value
+        
+        async def two_runs():
+            controller = ToolController()
+            first = await controller.run([ToolCall("x", counted, {"value": 1}), ToolCall("y", counted, {"value": 1})])
+            second = await controller.run([ToolCall("z", counted, {"value": 1})])
+            return first, second
+        
+        first, second = asyncio.run(two_runs())
+        
+        assert runs == [1]
+        assert first["x"] == first["y"] == second["z"] == 1
+        assert [stage.status for stage in second.trace] == ["cached"]
+    
+    def test_timeout_leaves_shared_call_running(self):
+        """Test a memoized call one caller gave up on still finishes for the callers waiting on it"""
+        runs = []
+        
+        async def counted(value):
+            runs.append(value)
+            await asyncio.sleep(0.1)
+            return value
+        
+        outcome = run([
+            ToolCall("impatient", counted, {"value": 1}, timeout=0.02),
+            ToolCall("patient", counted, {"value": 1}, timeout=1),
+        ])
+        
+        assert runs == [1]
+        assert outcome.errors["impatient"] == "Timed out after 0.02s"
+        assert outcome["patient"] == 1
+    
+    def test_shared_call_cancelled_when_nobody_waits(self):
+        """Test a memoized call is cancelled once every caller waiting on it has timed out"""
+        finished = []
+        
+        async def slow(value):
+            await asyncio.sleep(0.2)
+            finished.append(value)
+            return value
+        
+        async def scenario():
+            controller = ToolController()
+            outcome = await controller.run([
+                ToolCall("a", slow, {"value": 1}, timeout=0.02),
+                ToolCall("b", slow, {"value": 1}, timeout=0.04),
+            ])
+            await asyncio.sleep(0.3)
+            return outcome
+        
+        outcome = asyncio.run(scenario())
+        
+        assert {stage.status for stage in outcome.trace} == {"timeout"}
+        assert finished == []
+    
+    def test_invalid_graphs_rejected(self):
+        """Test unknown dependencies and cycles are refused before anything runs"""
+        with pytest.raises(ToolError, match="unknown call"):
+            run([ToolCall("a", join, {"left": Ref("missing"), "right": 1})])
+        with pytest.raises(ToolError, match="cycle"):
+            run([ToolCall("a", slow_echo, {"value": Ref("b")}), ToolCall("b", slow_echo, {"value": Ref("a")})])
+    
+    def test_trace_dict(self):
+        """Test the trace serializes every stage"""
+        trace = run([ToolCall("a", slow_echo, {"value": 1, "delay": 0})]).trace_dict()
+        
+        assert trace["stages"][0]["name"] == "a"
+        assert trace["stages"][0]["tool"] == "slow_echo"
+        assert trace["elapsed_ms"] >= trace["stages"][0]["duration_ms"]
+    
+    def test_on_done_reports_each_call_as_it_settles(self):
+        """Test on_done sees fast results before slow calls finish, and timeouts with no result"""
+        settled = []
+        
+        async def observed():
+            controller = ToolController()
+            calls = [
+                ToolCall("slow", slow_echo, {"value": 1, "delay": 1}),
+                ToolCall("fast", slow_echo, {"value": 2, "delay": 0}),
+            ]
+            return await controller.run(
+                calls, overall_timeout=0.05, on_done=lambda stage, result: settled.append((stage.name, stage.status, result))
+            )
+        
+        asyncio.run(observed())
+        
+        assert settled == [("fast", "ok", 2), ("slow", "timeout", None)]
+
+
+class TestGenerationTools:
+    """Test suite for the built-in tools"""
+    
+    def test_retrieve_and_validate(self):
+        """Test retrieval and validation run as tools"""
+        outcome = run([
+            ToolCall("hits", retrieve, {"query": "binary search tree"}),
+            ToolCall("check", validate, {"content": "def f(:\n    pass", "content_type": "code"}),
+        ])
+        
+        assert outcome["hits"]
+        assert {"id", "title", "excerpt", "score"} <= set(outcome["hits"][0])
+        assert outcome["check"]["type"] == "syntax"
+    
+    def test_retrieve_waits_for_index_writes(self, material_index):
+        """Test retrieval in a worker thread does not read the index while it is being written"""
+        async def scenario():
+            with material_index.lock.write():
+                task = asyncio.create_task(retrieve("binary search tree"))
+                await asyncio.sleep(0.05)
+                assert not task.done()
+            return await task
+        
+        hits = asyncio.run(scenario())
+        
+        assert hits and hits[0]["id"] in {record.id for record in material_index.records}
+    
+    def test_generation_retrieves_topics(self, llm_client, api_prefix):
+        """Test topics are retrieved in parallel and reported in the trace"""
+        response = llm_client.post(f"{api_prefix}/generation/generate", json={
+            "prompt": "Compare these structures",
+            "generation_type": "theory",
+            "topics": ["binary search tree", "hash table", "linked list"],
+        })
+        
+        trace = response.json()["trace"]
+        assert [stage["name"] for stage in trace["stages"]] == [
+            "retrieve:binary search tree", "retrieve:hash table", "retrieve:linked list"
+        ]
+        assert all(stage["status"] == "ok" for stage in trace["stages"])